@@ -7,6 +7,7 @@ import ast
 import traceback
 import re
 from tools.esg_tool_register import register_one_agent_all_tools # register_all_tools
+from lib.session_resources import get_shared_resource, load_session_value
 
 
 GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", None)
@@ -15,7 +16,7 @@ if GEMINI_API_KEY is None:
     raise RuntimeError("GEMINI_API_KEY not found in secrets.toml")
 
 def get_agent_persona():
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = load_session_value("pdf_text", "")
     lang_setting = st.session_state.get("lang_setting", "English")
 
     if pdf_content:
@@ -61,12 +62,6 @@ gemini_config = LLMConfig(
     api_key=GEMINI_API_KEY, # Authentication
 )
 
-gemini_agent = ConversableAgent(
-    name="Gemini",
-    llm_config=gemini_config,
-    # max_consecutive_auto_reply=1, # user cannot interact with terminal if set max_consecutive_auto_reply
-    system_message=get_agent_persona()
-)
 # register_all_tools(gemini_agent)
 
 # assistant = AssistantAgent(
@@ -98,19 +93,34 @@ def is_terminated_custom(x):
         print("❌ Error in termination check:", e)
         return False
 
-user_proxy = UserProxyAgent(
-    "user_proxy",
-    human_input_mode="NEVER", # "TERMINATE"
-    code_execution_config=False,
-    # is_termination_msg=lambda x: content_str(x.get("content")).find("##ALL DONE##") >= 0, # for OpenAI
-    is_termination_msg=is_terminated_custom
-)
-register_one_agent_all_tools(agent=gemini_agent, proxy=user_proxy)
+# Tool agent 在第一次使用 Analyze Mode 時才建立並註冊工具（process 內共用），import 本模組不會建立 agent
+def _build_tool_agents():
+    gemini_agent = ConversableAgent(
+        name="Gemini",
+        llm_config=gemini_config,
+        # max_consecutive_auto_reply=1, # user cannot interact with terminal if set max_consecutive_auto_reply
+        system_message=get_agent_persona()
+    )
+    user_proxy = UserProxyAgent(
+        "user_proxy",
+        human_input_mode="NEVER", # "TERMINATE"
+        code_execution_config=False,
+        # is_termination_msg=lambda x: content_str(x.get("content")).find("##ALL DONE##") >= 0, # for OpenAI
+        is_termination_msg=is_terminated_custom
+    )
+    register_one_agent_all_tools(agent=gemini_agent, proxy=user_proxy)
+    return gemini_agent, user_proxy
+
+def get_tool_agents():
+    """
+    Returns:
+        tuple: (gemini_agent, user_proxy)
+    """
+    return get_shared_resource("gemini_tool_agents", _build_tool_agents)
 
 def chat_with_gemini(prompt: str, restrict = True) -> str:
-    lang_setting = st.session_state.get("lang_setting", "")
-
     if restrict:
+        lang_setting = st.session_state.get("lang_setting", "")
         prompt_template = f"""
         You are an ESG analysis assistant. Your role is to help users understand, interpret, and analyze ESG (Environmental, Social, Governance) reports and related topics.
 
@@ -267,7 +277,7 @@ def extract_final_response(chat_history, tag: str = "##ALL DONE##") -> str:
 
 # Use agent (gemini) with registered tools
 def chat_with_gemini_agent(prompt: str, restrict = True) -> str:
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = load_session_value("pdf_text", "")
     lang_setting = st.session_state.get("lang_setting", "English")
     message_history = st.session_state.get("messages", [])
 
@@ -324,6 +334,7 @@ def chat_with_gemini_agent(prompt: str, restrict = True) -> str:
         prompt_template = prompt
 
     try:
+        gemini_agent, user_proxy = get_tool_agents()
         result = user_proxy.initiate_chat(
             recipient=gemini_agent,
             message=prompt_template,
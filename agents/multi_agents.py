@@ -3,6 +3,7 @@ import autogen
 from autogen import ConversableAgent, LLMConfig, UserProxyAgent
 import traceback
 from tools.esg_tool_register import register_all_tools
+from lib.session_resources import load_session_value
 
 GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", None)
 if GEMINI_API_KEY is None:
@@ -15,7 +16,7 @@ gemini_config = LLMConfig(
 )
 
 def get_agent_persona(role_persona):
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = load_session_value("pdf_text", "")
     lang_setting = st.session_state.get("lang_setting", "English")
 
     if pdf_content:
@@ -4,6 +4,7 @@ from autogen import ConversableAgent, LLMConfig
 from autogen import AssistantAgent, UserProxyAgent
 import traceback
 from tools.esg_tool_register import register_all_tools
+from lib.session_resources import get_shared_resource, load_session_value
 
 
 GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", None)
@@ -18,7 +19,7 @@ gemini_config = LLMConfig(
 )
 
 def get_agent_persona(role_persona):
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = load_session_value("pdf_text", "")
     lang_setting = st.session_state.get("lang_setting", "English")
 
     if pdf_content:
@@ -104,30 +105,33 @@ def is_terminated_custom(x):
         print("❌ Error in termination check:", e)
         return False
 
-with gemini_config:
-    student_agent = ConversableAgent(
-        name="Student_Agent",
-        llm_config=gemini_config,
-        system_message=get_agent_persona("student_persona"),
-    )
-
-    teacher_agent = ConversableAgent(
-        name="Teacher_Agent",
-        llm_config=gemini_config,
-        system_message=get_agent_persona("teacher_persona"),
-        is_termination_msg=is_terminated_custom,
-        human_input_mode="NEVER",
-    )
-
-# register_all_tools(caller_agent=teacher_agent, executor_agent=student_agent)
-register_all_tools(caller_agent=student_agent, executor_agent=teacher_agent) # let student use tools and teacher inspect
-
-user_proxy = UserProxyAgent(
-    "user_proxy",
-    human_input_mode="NEVER",
-    code_execution_config=False,
-    is_termination_msg=is_terminated_custom
-)
+# Student / Teacher agent 在第一次使用 Multi-agent Mode 時才建立並註冊工具（process 內共用）
+def _build_two_agents():
+    with gemini_config:
+        student_agent = ConversableAgent(
+            name="Student_Agent",
+            llm_config=gemini_config,
+            system_message=get_agent_persona("student_persona"),
+        )
+
+        teacher_agent = ConversableAgent(
+            name="Teacher_Agent",
+            llm_config=gemini_config,
+            system_message=get_agent_persona("teacher_persona"),
+            is_termination_msg=is_terminated_custom,
+            human_input_mode="NEVER",
+        )
+
+    # register_all_tools(caller_agent=teacher_agent, executor_agent=student_agent)
+    register_all_tools(caller_agent=student_agent, executor_agent=teacher_agent) # let student use tools and teacher inspect
+    return student_agent, teacher_agent
+
+def get_two_agents():
+    """
+    Returns:
+        tuple: (student_agent, teacher_agent)
+    """
+    return get_shared_resource("gemini_two_agents", _build_two_agents)
 
 # Extract tool response from Gemini Assitant output
 def extract_final_response(chat_history, tag: str = "##ALL DONE##") -> str:
@@ -191,7 +195,7 @@ def extract_final_response(chat_history, tag: str = "##ALL DONE##") -> str:
 
 # Use gemini with registered tools
 def chat_with_two_gemini_agents(prompt: str, restrict = True) -> str:
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = load_session_value("pdf_text", "")
     lang_setting = st.session_state.get("lang_setting", "English")
 
     if pdf_content:
@@ -231,6 +235,7 @@ def chat_with_two_gemini_agents(prompt: str, restrict = True) -> str:
         prompt_template = prompt
 
     try:
+        student_agent, teacher_agent = get_two_agents()
         result = student_agent.initiate_chat(
             teacher_agent,
             message = prompt_template,
@@ -0,0 +1,137 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_TIMEOUT = 30.0
+
+class SQLiteConnectionPool:
+    """
+    固定大小的 SQLite 連線池，讓同一個 process 內的多個 Streamlit session 共用連線。
+
+    - 連線以 WAL 模式開啟：讀取不會被寫入擋住，寫入之間由 busy timeout 排隊
+    - 連線長駐，sqlite3 內建的 statement cache 會重複使用已 prepare 的 SQL
+    - transaction() 以 BEGIN IMMEDIATE 包住一個邏輯操作；同一 thread 內巢狀呼叫會沿用外層交易
+    """
+
+    def __init__(self, db_path, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, on_connect=None):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _create_connection(self):
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # isolation_level=None：交易由 transaction() 明確控制，不讓 sqlite3 模組自動 BEGIN
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=256
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"❌ No SQLite connection available for '{self.db_path}' after {self.timeout}s")
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """借出一條連線（autocommit）；若本 thread 正在交易中，直接沿用該交易的連線"""
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            yield active
+            return
+
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate=True):
+        """一個邏輯操作 = 一個交易；成功 COMMIT，例外 ROLLBACK"""
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            yield active
+            return
+
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._local.conn = conn
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                self._local.conn = None
+
+    def close_all(self):
+        """關閉所有閒置連線（主要給 CLI / 測試收尾使用）"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path, **kwargs):
+    """取得（必要時建立）指定資料庫路徑的共用連線池"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteConnectionPool(db_path, **kwargs)
+            _pools[key] = pool
+    return pool
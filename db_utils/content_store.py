@@ -0,0 +1,40 @@
+# ESG 報告全文的壓縮 / 解壓縮與預覽（ESG_Report_Content 使用）
+import hashlib
+import zlib
+
+DEFAULT_CODEC = "zlib"
+PREVIEW_LENGTH = 200
+
+def content_hash(text):
+    """報告全文的 SHA-256（用於去重）"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compress_content(text, codec=DEFAULT_CODEC):
+    """
+    壓縮報告全文
+
+    Returns:
+        tuple: (codec, blob, content_hash)
+    """
+    raw = text.encode("utf-8")
+    if codec == "zlib":
+        blob = zlib.compress(raw, 6)
+    elif codec == "raw":
+        blob = raw
+    else:
+        raise ValueError(f"Unsupported content codec: {codec}")
+    return codec, blob, hashlib.sha256(raw).hexdigest()
+
+def decompress_content(codec, blob):
+    if codec == "zlib":
+        return zlib.decompress(blob).decode("utf-8")
+    if codec == "raw":
+        return bytes(blob).decode("utf-8")
+    raise ValueError(f"Unsupported content codec: {codec}")
+
+def make_preview(text, length=PREVIEW_LENGTH):
+    """列表頁用的短預覽（壓縮空白後取前 length 個字）"""
+    preview = " ".join((text or "").split())
+    if len(preview) > length:
+        preview = preview[:length] + "..."
+    return preview
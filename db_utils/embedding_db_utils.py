@@ -0,0 +1,120 @@
+# Word2Vec embedding registry 的目錄表：model store（qa_utils/Word2vec/model_store.py）每存一個模型就登記一筆
+# 向量本身仍在磁碟上（db/word2vec_models/<key>/），這裡只存可查詢的描述：語料、參數、詞彙量、訓練時間
+import json
+import threading
+from db_utils.connection_pool import get_pool
+
+EMBEDDING_DB_PATH = "db/embeddings.db"
+
+_EMBEDDING_COLUMNS = (
+    "model_key", "source", "corpus_hash", "params", "vector_size", "vocab_size",
+    "sentences", "tokens", "train_seconds", "size_bytes", "path", "created_at", "last_used_at"
+)
+
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+def get_embedding_db_pool():
+    """embeddings.db 的共用連線池；第一次取用時建立資料表"""
+    pool = get_pool(EMBEDDING_DB_PATH)
+    if EMBEDDING_DB_PATH not in _initialized_paths:
+        with _init_lock:
+            if EMBEDDING_DB_PATH not in _initialized_paths:
+                init_embedding_db(pool)
+                _initialized_paths.add(EMBEDDING_DB_PATH)
+    return pool
+
+def init_embedding_db(pool):
+    with pool.transaction() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS Embedding (
+                model_key TEXT PRIMARY KEY,
+                source TEXT,
+                corpus_hash TEXT,
+                params TEXT NOT NULL,
+                vector_size INTEGER,
+                vocab_size INTEGER,
+                sentences INTEGER,
+                tokens INTEGER,
+                train_seconds REAL,
+                size_bytes INTEGER,
+                path TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+        """)
+        # 訓練前以「語料 + 參數」或「固定語料來源 + 參數」查詢是否已有模型；列表依最近使用排序
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_corpus_params ON Embedding (corpus_hash, params)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_source_params ON Embedding (source, params)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_last_used ON Embedding (last_used_at)")
+
+def encode_params(params):
+    """params 以排序過的 JSON 字串存放，才能直接以等號比對"""
+    return json.dumps(params, sort_keys=True)
+
+def _row_to_dict(row):
+    record = dict(zip(_EMBEDDING_COLUMNS, row))
+    record["params"] = json.loads(record["params"])
+    return record
+
+def upsert_embedding(record):
+    """
+    登記（或更新）一個模型
+
+    Args:
+        record (dict): 至少包含 model_key、params、path、created_at；其他欄位缺少時存 NULL
+    """
+    values = {column: record.get(column) for column in _EMBEDDING_COLUMNS}
+    values["params"] = encode_params(record["params"])
+    values["last_used_at"] = values["last_used_at"] or values["created_at"]
+    columns = ", ".join(_EMBEDDING_COLUMNS)
+    placeholders = ", ".join("?" for _ in _EMBEDDING_COLUMNS)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in _EMBEDDING_COLUMNS[1:])
+    with get_embedding_db_pool().transaction() as conn:
+        conn.execute(f"""
+            INSERT INTO Embedding ({columns}) VALUES ({placeholders})
+            ON CONFLICT(model_key) DO UPDATE SET {updates}
+        """, tuple(values[column] for column in _EMBEDDING_COLUMNS))
+
+def find_embedding(params, corpus_hash=None, source=None):
+    """
+    以語料 hash（或固定語料的來源名稱，例如 'brown'）+ 參數找已訓練的模型
+
+    Returns:
+        dict | None: 最近使用的一筆
+    """
+    if corpus_hash is None and source is None:
+        raise ValueError("find_embedding() needs corpus_hash or source")
+    column, value = ("corpus_hash", corpus_hash) if corpus_hash is not None else ("source", source)
+    with get_embedding_db_pool().connection() as conn:
+        row = conn.execute(f"""
+            SELECT {", ".join(_EMBEDDING_COLUMNS)} FROM Embedding
+            WHERE {column} = ? AND params = ?
+            ORDER BY last_used_at DESC
+            LIMIT 1
+        """, (value, encode_params(params))).fetchone()
+    return _row_to_dict(row) if row else None
+
+def list_embeddings(limit=None):
+    """所有登記的模型（最近使用的在前）"""
+    sql = f"SELECT {', '.join(_EMBEDDING_COLUMNS)} FROM Embedding ORDER BY last_used_at DESC"
+    params = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (int(limit),)
+    with get_embedding_db_pool().connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [_row_to_dict(row) for row in rows]
+
+def touch_embedding(model_key, last_used_at):
+    with get_embedding_db_pool().transaction() as conn:
+        conn.execute("UPDATE Embedding SET last_used_at = ? WHERE model_key = ?", (last_used_at, model_key))
+
+def delete_embeddings(model_keys):
+    model_keys = list(model_keys)
+    if not model_keys:
+        return 0
+    placeholders = ", ".join("?" for _ in model_keys)
+    with get_embedding_db_pool().transaction() as conn:
+        cursor = conn.execute(f"DELETE FROM Embedding WHERE model_key IN ({placeholders})", model_keys)
+        return cursor.rowcount
@@ -1,100 +1,113 @@
-import sqlite3
 import os
+import threading
+from functools import lru_cache
 import pandas as pd
+from db_utils.connection_pool import get_pool
+from db_utils.migrations import apply_migrations
+from db_utils.content_store import compress_content, content_hash, decompress_content, make_preview
+from db_utils.report_search import FTS_TABLE, build_fts_query, clean_snippet, index_report_pages
 
 ESG_DB_PATH = "db/esg_reports.db"
 
+_migrated_paths = set()
+_migration_lock = threading.Lock()
+
+def get_esg_db_pool():
+    """esg_reports.db 的共用連線池（WAL 模式）；第一次取用時自動套用 schema migrations"""
+    pool = get_pool(ESG_DB_PATH)
+    if ESG_DB_PATH not in _migrated_paths:
+        with _migration_lock:
+            if ESG_DB_PATH not in _migrated_paths:
+                apply_migrations(pool)
+                _migrated_paths.add(ESG_DB_PATH)
+    return pool
+
 def init_esg_report_db():
+    """建立 / 升級 esg_reports.db 到最新 schema 版本"""
     os.makedirs("db", exist_ok=True)
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Industry (
-            industry_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            industry_name_zh TEXT UNIQUE,
-            industry_name_en TEXT
-        );
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Company (
-            company_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            company_name_zh TEXT UNIQUE,
-            company_name_en TEXT,
-            industry_id INTEGER,
-            FOREIGN KEY (industry_id) REFERENCES Industry(industry_id)
-        );
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ESG_Report (
-            report_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            company_id INTEGER,
-            report_year INTEGER,
-            content TEXT,
-            FOREIGN KEY (company_id) REFERENCES Company(company_id)
-        );
-        """)
-        conn.commit()
+    return apply_migrations(get_esg_db_pool())
+
+# --- 交易內部 helper：一律接收 cursor，不自行開新連線 ---
+def _find_industry_id(cursor, industry_name_zh=None, industry_name_en=None):
+    # Try zh first, then fallback to en
+    if industry_name_zh:
+        cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_zh = ?", (industry_name_zh,))
+    elif industry_name_en:
+        cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_en = ?", (industry_name_en,))
+    else:
+        raise ValueError("Either industry_name_zh or industry_name_en must be provided.")
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def _insert_industry(cursor, industry_name_zh=None, industry_name_en=None):
+    cursor.execute("""
+        INSERT OR IGNORE INTO Industry (industry_name_zh, industry_name_en)
+        VALUES (?, ?)
+    """, (industry_name_zh, industry_name_en))
+
+def _insert_company(cursor, company_name_zh=None, industry_name_zh=None, company_name_en=None, industry_name_en=None):
+    industry_id = _find_industry_id(cursor, industry_name_zh, industry_name_en)
+    if industry_id is None:
+        _insert_industry(cursor, industry_name_zh or industry_name_en, industry_name_en)
+        industry_id = _find_industry_id(cursor, industry_name_zh, industry_name_en)
+
+    cursor.execute("""
+        INSERT OR IGNORE INTO Company (company_name_zh, company_name_en, industry_id)
+        VALUES (?, ?, ?)
+    """, (company_name_zh, company_name_en, industry_id))
 
 def insert_industry(industry_name_zh=None, industry_name_en=None):
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR IGNORE INTO Industry (industry_name_zh, industry_name_en)
-            VALUES (?, ?)
-        """, (industry_name_zh, industry_name_en))
-        conn.commit()
+    with get_esg_db_pool().transaction() as conn:
+        _insert_industry(conn.cursor(), industry_name_zh, industry_name_en)
 
 def insert_company(company_name_zh=None, industry_name_zh=None, company_name_en=None, industry_name_en=None):
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        cursor = conn.cursor()
-
-        # Try zh first, then fallback to en
-        if industry_name_zh:
-            cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_zh = ?", (industry_name_zh,))
-        elif industry_name_en:
-            cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_en = ?", (industry_name_en,))
-        else:
-            raise ValueError("Either industry_name_zh or industry_name_en must be provided.")
+    with get_esg_db_pool().transaction() as conn:
+        _insert_company(
+            conn.cursor(),
+            company_name_zh=company_name_zh,
+            industry_name_zh=industry_name_zh,
+            company_name_en=company_name_en,
+            industry_name_en=industry_name_en
+        )
 
-        row = cursor.fetchone()
+def _insert_esg_report(conn, company_id, report_year, content, pages=None):
+    """
+    在呼叫端的交易內寫入一份報告；(company_id, report_year) 已存在時回傳 None
 
-        if not row:
-            insert_industry(industry_name_zh or industry_name_en, industry_name_en)
-            if industry_name_zh:
-                cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_zh = ?", (industry_name_zh,))
-            else:
-                cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_en = ?", (industry_name_en,))
-            row = cursor.fetchone()
-
-        industry_id = row[0]
-        cursor.execute("""
-            INSERT OR IGNORE INTO Company (company_name_zh, company_name_en, industry_id)
-            VALUES (?, ?, ?)
-        """, (company_name_zh, company_name_en, industry_id))
-        conn.commit()
-
-def insert_esg_report_by_id(company_id, report_year, content):
-    with sqlite3.connect("db/esg_reports.db") as conn:
-        cursor = conn.cursor()
+    Args:
+        content (str): 各頁以 "\\n\\n" 串接的全文
+        pages (list[str] | None): 各頁內容（全文檢索的頁碼以此為準）；None 時由全文切回頁面
+    """
+    codec, blob, content_hash = compress_content(content)
+
+    # UNIQUE (company_id, report_year)：已存在就不插入
+    cursor = conn.execute("""
+        INSERT INTO ESG_Report (company_id, report_year, preview, content_size)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (company_id, report_year) DO NOTHING
+    """, (company_id, report_year, make_preview(content), len(content)))
+    if cursor.rowcount == 0:
+        return None
 
-        # 如果已存在，不插入
-        cursor.execute("""
-            SELECT 1 FROM ESG_Report
-            WHERE company_id = ? AND report_year = ?
-        """, (company_id, report_year))
-        if cursor.fetchone():
+    # 全文壓縮後另存，列表查詢不會讀到；同一個交易內建立全文檢索索引
+    report_id = cursor.lastrowid
+    conn.execute("""
+        INSERT INTO ESG_Report_Content (report_id, codec, content, content_hash)
+        VALUES (?, ?, ?, ?)
+    """, (report_id, codec, blob, content_hash))
+    index_report_pages(conn.cursor(), report_id, content, pages=pages)
+    return report_id
+
+def insert_esg_report_by_id(company_id, report_year, content, pages=None):
+    with get_esg_db_pool().transaction() as conn:
+        if _insert_esg_report(conn, company_id, report_year, content, pages=pages) is None:
             print("⚠️ Report already exists. Skipping insert.")
             return False
-
-        cursor.execute("""
-            INSERT INTO ESG_Report (company_id, report_year, content)
-            VALUES (?, ?, ?)
-        """, (company_id, report_year, content))
-        conn.commit()
         return True
 
 def get_all_esg_reports():
-    with sqlite3.connect(ESG_DB_PATH) as conn:
+    """列出所有報告的 metadata 與短預覽（不含全文，全文請用 get_esg_report_content）"""
+    with get_esg_db_pool().connection() as conn:
         df = pd.read_sql_query("""
             SELECT ESG_Report.report_id,
                    Company.company_name_en AS company,
@@ -102,7 +115,8 @@ def get_all_esg_reports():
                    Industry.industry_name_en AS industry,
                    Industry.industry_name_zh AS industry_zh,
                    ESG_Report.report_year AS year,
-                   ESG_Report.content
+                   ESG_Report.preview,
+                   ESG_Report.content_size
             FROM ESG_Report
             JOIN Company ON ESG_Report.company_id = Company.company_id
             JOIN Industry ON Company.industry_id = Industry.industry_id
@@ -110,31 +124,225 @@ def get_all_esg_reports():
         """, conn)
     return df
 
-def get_all_companies():
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        df = pd.read_sql_query("""
-            SELECT company_name_en, company_name_zh
-            FROM Company
-            WHERE company_name_en IS NOT NULL
-            GROUP BY company_name_en
-            ORDER BY company_name_en
-        """, conn)
+def _build_report_filters(company_en=None, industry_en=None, year=None):
+    conditions, params = [], []
+    if company_en:
+        conditions.append("Company.company_name_en = ?")
+        params.append(company_en)
+    if industry_en:
+        conditions.append("Industry.industry_name_en = ?")
+        params.append(industry_en)
+    if year not in (None, ""):
+        conditions.append("ESG_Report.report_year = ?")
+        params.append(int(year))
+    return conditions, params
+
+def query_esg_reports(company_en=None, industry_en=None, year=None, limit=20, offset=0, cursor=None):
+    """
+    在 DB 端篩選並分頁查詢 ESG 報告（依 report_year、report_id 由新到舊）
+
+    Args:
+        company_en (str): 公司英文名稱（None 表示不篩選）
+        industry_en (str): 產業英文名稱（None 表示不篩選）
+        year (int): 報告年度（None 表示不篩選）
+        limit (int): 每頁筆數
+        offset (int): 略過的筆數（LIMIT/OFFSET 分頁）
+        cursor (tuple): (report_year, report_id)，上一頁最後一筆；有給時改用 keyset 分頁並忽略 offset
+
+    Returns:
+        tuple: (DataFrame of one page, total count matching the filters)
+    """
+    conditions, params = _build_report_filters(company_en, industry_en, year)
+    from_clause = """
+        FROM ESG_Report
+        JOIN Company ON ESG_Report.company_id = Company.company_id
+        JOIN Industry ON Company.industry_id = Industry.industry_id
+    """
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    page_conditions, page_params = list(conditions), list(params)
+    if cursor is not None:
+        page_conditions.append("(ESG_Report.report_year, ESG_Report.report_id) < (?, ?)")
+        page_params.extend([cursor[0], cursor[1]])
+        offset = 0
+    page_where = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+
+    with get_esg_db_pool().connection() as conn:
+        total = conn.execute(f"SELECT COUNT(*) {from_clause} {where_clause}", params).fetchone()[0]
+        df = pd.read_sql_query(f"""
+            SELECT ESG_Report.report_id,
+                   Company.company_name_en AS company,
+                   Company.company_name_zh AS company_zh,
+                   Industry.industry_name_en AS industry,
+                   Industry.industry_name_zh AS industry_zh,
+                   ESG_Report.report_year AS year,
+                   ESG_Report.preview,
+                   ESG_Report.content_size
+            {from_clause}
+            {page_where}
+            ORDER BY ESG_Report.report_year DESC, ESG_Report.report_id DESC
+            LIMIT ? OFFSET ?
+        """, conn, params=page_params + [int(limit), int(offset)])
+    return df, total
+
+def get_esg_report_years():
+    """所有報告年度（由新到舊）"""
+    with get_esg_db_pool().connection() as conn:
+        rows = conn.execute("""
+            SELECT DISTINCT report_year FROM ESG_Report
+            WHERE report_year IS NOT NULL
+            ORDER BY report_year DESC
+        """).fetchall()
+    return [row[0] for row in rows]
+
+def search_esg_reports(query, limit=20):
+    """
+    以 FTS5 全文檢索所有已存報告，回傳依相關度排序的頁面片段
+
+    Args:
+        query (str): 搜尋字詞（中英文皆可，多個詞以空白分隔，需全部出現）
+        limit (int): 最多回傳幾筆頁面
+
+    Returns:
+        DataFrame: report_id, page, company, company_zh, industry, year, snippet, score（越小越相關）
+    """
+    fts_query = build_fts_query(query)
+    if not fts_query:
+        return pd.DataFrame(columns=["report_id", "page", "company", "company_zh", "industry", "year", "snippet", "score"])
+
+    with get_esg_db_pool().connection() as conn:
+        df = pd.read_sql_query(f"""
+            SELECT {FTS_TABLE}.report_id,
+                   {FTS_TABLE}.page,
+                   Company.company_name_en AS company,
+                   Company.company_name_zh AS company_zh,
+                   Industry.industry_name_en AS industry,
+                   ESG_Report.report_year AS year,
+                   snippet({FTS_TABLE}, 0, '**', '**', '…', 48) AS snippet,
+                   bm25({FTS_TABLE}) AS score
+            FROM {FTS_TABLE}
+            JOIN ESG_Report ON ESG_Report.report_id = {FTS_TABLE}.report_id
+            JOIN Company ON ESG_Report.company_id = Company.company_id
+            JOIN Industry ON Company.industry_id = Industry.industry_id
+            WHERE {FTS_TABLE} MATCH ?
+            ORDER BY score
+            LIMIT ?
+        """, conn, params=[fts_query, int(limit)])
+
+    df["snippet"] = df["snippet"].map(clean_snippet)
     return df
 
+@lru_cache(maxsize=16)
+def get_esg_report_content(report_id):
+    """
+    依 report_id 讀取並解壓縮報告全文（lazy loading，最近讀過的幾份會留在記憶體）
+
+    Args:
+        report_id (int): ESG_Report.report_id
+
+    Returns:
+        str | None: 報告全文，找不到時回傳 None
+    """
+    return read_esg_report_content(report_id)
+
+def read_esg_report_content(report_id):
+    """同 get_esg_report_content 但不經過 cache（批次掃過整個報告庫時使用，避免把 cache 洗掉）"""
+    with get_esg_db_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT codec, content FROM ESG_Report_Content WHERE report_id = ?",
+            (int(report_id),)
+        ).fetchone()
+    if not row:
+        return None
+    return decompress_content(row[0], row[1])
+
+def get_esg_report_hashes():
+    """
+    所有報告的 content_hash（不讀全文），用於判斷哪些報告還沒處理過
+
+    Returns:
+        list[tuple]: [(report_id, content_hash), ...]，依 report_id 排序
+    """
+    with get_esg_db_pool().connection() as conn:
+        rows = conn.execute("SELECT report_id, content_hash FROM ESG_Report_Content ORDER BY report_id").fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+# --- Company / Industry 維度表的 in-process read-through cache ---
+# 以 Dimension_Version（由 trigger 維護）判斷是否過期，其他 process 寫入時也會自動失效
+_dimension_cache = {}
+_dimension_cache_lock = threading.Lock()
+
+def invalidate_dimension_cache():
+    """清除 Company / Industry cache（TWSE 資料更新後呼叫）"""
+    with _dimension_cache_lock:
+        _dimension_cache.clear()
+
+def _get_dimension_version(conn):
+    row = conn.execute("SELECT version FROM Dimension_Version WHERE id = 1").fetchone()
+    return row[0] if row else 0
+
+def _load_dimension_cache(conn, version):
+    companies = pd.read_sql_query("""
+        SELECT company_name_en, company_name_zh
+        FROM Company
+        WHERE company_name_en IS NOT NULL
+        GROUP BY company_name_en
+        ORDER BY company_name_en
+    """, conn)
+
+    industries = pd.read_sql_query("""
+        SELECT industry_name_en, industry_name_zh
+        FROM Industry
+        WHERE industry_name_en IS NOT NULL
+        GROUP BY industry_name_en
+        ORDER BY industry_name_en
+    """, conn)
+
+    # 公司名稱（中文原字串 / 英文大寫）→ 產業名稱；同名時以 company_id 較小者為準
+    industry_by_company = {}
+    rows = conn.execute("""
+        SELECT Company.company_name_zh, Company.company_name_en,
+               Industry.industry_name_zh, Industry.industry_name_en
+        FROM Company
+        JOIN Industry ON Company.industry_id = Industry.industry_id
+        ORDER BY Company.company_id
+    """).fetchall()
+    for company_zh, company_en, industry_zh, industry_en in rows:
+        industry = {"industry_name_zh": industry_zh, "industry_name_en": industry_en}
+        if company_zh:
+            industry_by_company.setdefault(("zh", company_zh), industry)
+        if company_en:
+            industry_by_company.setdefault(("en", company_en.upper()), industry)
+
+    return {
+        "version": version,
+        "companies": companies,
+        "industries": industries,
+        "industry_by_company": industry_by_company
+    }
+
+def _get_dimension_cache():
+    with get_esg_db_pool().connection() as conn:
+        version = _get_dimension_version(conn)
+        with _dimension_cache_lock:
+            if _dimension_cache.get("version") == version:
+                return dict(_dimension_cache)
+        cache = _load_dimension_cache(conn, version)
+
+    with _dimension_cache_lock:
+        _dimension_cache.clear()
+        _dimension_cache.update(cache)
+    return cache
+
+def get_all_companies():
+    return _get_dimension_cache()["companies"].copy()
+
 def get_all_industries():
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        df = pd.read_sql_query("""
-            SELECT industry_name_en, industry_name_zh
-            FROM Industry
-            WHERE industry_name_en IS NOT NULL
-            GROUP BY industry_name_en
-            ORDER BY industry_name_en
-        """, conn)
-    return df
+    return _get_dimension_cache()["industries"].copy()
 
 def get_industry_by_company(company_name: str):
     """
-    根據公司名稱（中或英文）查找對應的產業名稱（中或英文）
+    根據公司名稱（中或英文）查找對應的產業名稱（中或英文），由 in-process cache 提供
 
     Args:
         company_name (str): 公司中文或英文名稱
@@ -142,41 +350,37 @@ def get_industry_by_company(company_name: str):
     Returns:
         dict: {"industry_name_zh": ..., "industry_name_en": ...} or None if not found
     """
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        company_df = pd.read_sql_query("""
-            SELECT *
-            FROM Company
-            GROUP BY company_id
-            ORDER BY company_id
-        """, conn)
+    if not company_name:
+        return None
 
-        industry_df = pd.read_sql_query("""
-            SELECT *
-            FROM Industry
-            GROUP BY industry_id
-            ORDER BY industry_id
-        """, conn)
+    industry_by_company = _get_dimension_cache()["industry_by_company"]
+    industry = industry_by_company.get(("zh", company_name)) or industry_by_company.get(("en", company_name.upper()))
+    return dict(industry) if industry else None
 
-    # 找出公司對應的 industry_id
-    matched = company_df[
-        (company_df["company_name_zh"] == company_name) |
-        (company_df["company_name_en"].str.upper() == company_name.upper())
-    ]
+def find_industry_by_company(company_name: str):
+    """
+    不經 cache，直接以 indexed JOIN 查詢公司對應的產業名稱（中文精確比對 / 英文不分大小寫）
 
-    if matched.empty:
-        return None
+    Args:
+        company_name (str): 公司中文或英文名稱
 
-    industry_id = matched.iloc[0]["industry_id"]
+    Returns:
+        dict: {"industry_name_zh": ..., "industry_name_en": ...} or None if not found
+    """
+    with get_esg_db_pool().connection() as conn:
+        row = conn.execute("""
+            SELECT Industry.industry_name_zh, Industry.industry_name_en
+            FROM Company
+            JOIN Industry ON Company.industry_id = Industry.industry_id
+            WHERE Company.company_id = COALESCE(
+                (SELECT company_id FROM Company WHERE company_name_zh = ?),
+                (SELECT MIN(company_id) FROM Company WHERE company_name_en = ? COLLATE NOCASE)
+            )
+        """, (company_name, company_name)).fetchone()
 
-    # 查找產業名稱
-    industry_row = industry_df[industry_df["industry_id"] == industry_id]
-    if industry_row.empty:
+    if not row:
         return None
-
-    return {
-        "industry_name_zh": industry_row.iloc[0]["industry_name_zh"],
-        "industry_name_en": industry_row.iloc[0]["industry_name_en"]
-    }
+    return {"industry_name_zh": row[0], "industry_name_en": row[1]}
 
 def insert_or_get_company_id(company_name, industry, language="en"):
     """
@@ -186,48 +390,34 @@ def insert_or_get_company_id(company_name, industry, language="en"):
     :param language: 'zh' 或 'en'
     :return: company_id
     """
-    with sqlite3.connect(ESG_DB_PATH) as conn:
+    industry_name_zh = industry if language == "zh" else None
+    industry_name_en = industry if language == "en" else None
+
+    # 查詢 + 必要時插入 都在同一個交易內完成
+    with get_esg_db_pool().transaction() as conn:
         cursor = conn.cursor()
 
         # 取得 industry_id，必要時插入
-        if language == "zh":
-            cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_zh = ?", (industry,))
-        else:
-            cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_en = ?", (industry,))
-        industry_row = cursor.fetchone()
-
-        if not industry_row:
-            insert_industry(
-                industry_name_zh=industry if language == "zh" else None,
-                industry_name_en=industry if language == "en" else None
-            )
-            # 再查一次
-            if language == "zh":
-                cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_zh = ?", (industry,))
-            else:
-                cursor.execute("SELECT industry_id FROM Industry WHERE industry_name_en = ?", (industry,))
-            industry_row = cursor.fetchone()
-
-        industry_id = industry_row[0]
+        if _find_industry_id(cursor, industry_name_zh, industry_name_en) is None:
+            _insert_industry(cursor, industry_name_zh=industry_name_zh, industry_name_en=industry_name_en)
 
         # 取得 company_id，必要時插入
         if language == "zh":
-            cursor.execute("SELECT company_id FROM Company WHERE company_name_zh = ?", (company_name,))
+            company_sql = "SELECT company_id FROM Company WHERE company_name_zh = ?"
         else:
-            cursor.execute("SELECT company_id FROM Company WHERE company_name_en = ?", (company_name,))
+            company_sql = "SELECT company_id FROM Company WHERE company_name_en = ?"
+        cursor.execute(company_sql, (company_name,))
         company_row = cursor.fetchone()
 
         if not company_row:
-            insert_company(
+            _insert_company(
+                cursor,
                 company_name_zh=company_name if language == "zh" else None,
                 company_name_en=company_name if language == "en" else None,
-                industry_name_zh=industry if language == "zh" else None,
-                industry_name_en=industry if language == "en" else None
+                industry_name_zh=industry_name_zh,
+                industry_name_en=industry_name_en
             )
-            if language == "zh":
-                cursor.execute("SELECT company_id FROM Company WHERE company_name_zh = ?", (company_name,))
-            else:
-                cursor.execute("SELECT company_id FROM Company WHERE company_name_en = ?", (company_name,))
+            cursor.execute(company_sql, (company_name,))
             company_row = cursor.fetchone()
 
         if not company_row:
@@ -237,30 +427,218 @@ def insert_or_get_company_id(company_name, industry, language="en"):
 
 def delete_esg_reports_by_ids(report_ids):
     """根據 report_id 列表刪除 ESG_Report 資料"""
-    with sqlite3.connect(ESG_DB_PATH) as conn:
-        cursor = conn.cursor()
-        cursor.executemany(
+    with get_esg_db_pool().transaction() as conn:
+        conn.executemany(
             "DELETE FROM ESG_Report WHERE report_id = ?",
             [(rid,) for rid in report_ids]
         )
-        conn.commit()
-
+    get_esg_report_content.cache_clear()
+
+
+def _clean_incomplete_company_and_industry(cursor):
+    # 刪除 Company 中任一欄為 NULL
+    cursor.execute("""
+        DELETE FROM Company
+        WHERE company_name_zh IS NULL
+           OR company_name_en IS NULL
+           OR industry_id IS NULL
+    """)
+    # 刪除 Industry 中任一欄為 NULL
+    cursor.execute("""
+        DELETE FROM Industry
+        WHERE industry_name_zh IS NULL
+           OR industry_name_en IS NULL
+    """)
 
 def clean_incomplete_company_and_industry():
     """刪除 Company 或 Industry 中欄位為 NULL 的不完整資料"""
-    with sqlite3.connect(ESG_DB_PATH) as conn:
+    with get_esg_db_pool().transaction() as conn:
+        _clean_incomplete_company_and_industry(conn.cursor())
+
+def get_twse_fetch_states():
+    """
+    各產業別頁面上次抓取的狀態
+
+    Returns:
+        dict: {(industry_code, lang): {"content_hash": ..., "etag": ..., "last_fetched": ...}}
+    """
+    with get_esg_db_pool().connection() as conn:
+        rows = conn.execute("""
+            SELECT industry_code, lang, content_hash, etag, last_fetched FROM TWSE_Fetch_State
+        """).fetchall()
+    return {
+        (industry_code, lang): {"content_hash": content_hash, "etag": etag, "last_fetched": last_fetched}
+        for industry_code, lang, content_hash, etag, last_fetched in rows
+    }
+
+def get_company_change_log(limit=50):
+    """最近的公司異動紀錄（新到舊）"""
+    with get_esg_db_pool().connection() as conn:
+        df = pd.read_sql_query("""
+            SELECT changed_at, change_type, stock_code, company_name_zh, company_name_en,
+                   industry_name_zh, industry_name_en
+            FROM Company_Change_Log
+            ORDER BY change_id DESC
+            LIMIT ?
+        """, conn, params=[int(limit)])
+    return df
+
+def upsert_twse_companies(rows, refreshed_industries=None, fetch_states=None):
+    """
+    在單一交易中以股票代號增量 upsert TWSE 公司與產業：只寫入新增或內容有變的公司，
+    記錄異動到 Company_Change_Log，最後清除不完整資料
+
+    Args:
+        rows (list[tuple]): [(stock_code, company_name_zh, company_name_en, industry_name_zh, industry_name_en), ...]
+        refreshed_industries (list): 本次完整抓取的產業中文名稱；這些產業中不在 rows 內的公司視為已下市
+        fetch_states (list[tuple]): [(industry_code, lang, content_hash, etag), ...]，與資料一起寫入
+
+    Returns:
+        dict: {"inserted": int, "updated": int, "removed": int, "unchanged": int}
+    """
+    with get_esg_db_pool().transaction() as conn:
         cursor = conn.cursor()
-        # 刪除 Company 中任一欄為 NULL
-        cursor.execute("""
+
+        # 舊資料沒有股票代號：以中文名稱補上，之後就能以代號比對
+        cursor.executemany("""
+            UPDATE Company SET stock_code = ?
+            WHERE company_name_zh = ? AND stock_code IS NULL
+              AND NOT EXISTS (SELECT 1 FROM Company WHERE stock_code = ?)
+        """, [(stock_code, company_zh, stock_code) for stock_code, company_zh, _, _, _ in rows])
+
+        existing = {
+            stock_code: (company_zh, company_en, industry_zh, industry_en)
+            for stock_code, company_zh, company_en, industry_zh, industry_en in cursor.execute("""
+                SELECT Company.stock_code, Company.company_name_zh, Company.company_name_en,
+                       Industry.industry_name_zh, Industry.industry_name_en
+                FROM Company
+                LEFT JOIN Industry ON Company.industry_id = Industry.industry_id
+                WHERE Company.stock_code IS NOT NULL
+            """)
+        }
+        changed = [row for row in rows if existing.get(row[0]) != tuple(row[1:])]
+
+        # 已重新抓取的產業中，頁面上已經沒有的公司
+        scraped_codes = {row[0] for row in rows}
+        refreshed_industries = set(refreshed_industries or [])
+        removed = [
+            (stock_code,) + values
+            for stock_code, values in existing.items()
+            if values[2] in refreshed_industries and stock_code not in scraped_codes
+        ]
+
+        industries = {(industry_zh, industry_en) for _, _, _, industry_zh, industry_en in changed if industry_zh}
+        cursor.executemany("""
+            INSERT INTO Industry (industry_name_zh, industry_name_en)
+            VALUES (?, ?)
+            ON CONFLICT (industry_name_zh) DO UPDATE SET industry_name_en = excluded.industry_name_en
+            WHERE Industry.industry_name_en IS NOT excluded.industry_name_en
+        """, sorted(industries))
+        cursor.executemany("""
+            INSERT INTO Company (stock_code, company_name_zh, company_name_en, industry_id)
+            VALUES (?, ?, ?, (SELECT industry_id FROM Industry WHERE industry_name_zh = ?))
+            ON CONFLICT (stock_code) DO UPDATE SET
+                company_name_zh = excluded.company_name_zh,
+                company_name_en = excluded.company_name_en,
+                industry_id = excluded.industry_id
+        """, [(stock_code, company_zh, company_en, industry_zh) for stock_code, company_zh, company_en, industry_zh, _ in changed])
+
+        # 下市公司：沒有報告引用就刪除，否則保留公司資料但移除股票代號
+        cursor.executemany("""
             DELETE FROM Company
-            WHERE company_name_zh IS NULL
-               OR company_name_en IS NULL
-               OR industry_id IS NULL
-        """)
-        # 刪除 Industry 中任一欄為 NULL
-        cursor.execute("""
-            DELETE FROM Industry
-            WHERE industry_name_zh IS NULL
-               OR industry_name_en IS NULL
-        """)
-        conn.commit()
+            WHERE stock_code = ?
+              AND NOT EXISTS (SELECT 1 FROM ESG_Report WHERE ESG_Report.company_id = Company.company_id)
+        """, [(row[0],) for row in removed])
+        cursor.executemany(
+            "UPDATE Company SET stock_code = NULL WHERE stock_code = ?",
+            [(row[0],) for row in removed]
+        )
+
+        change_log = [("added" if row[0] not in existing else "updated",) + tuple(row) for row in changed]
+        change_log += [("removed",) + row for row in removed]
+        cursor.executemany("""
+            INSERT INTO Company_Change_Log (
+                change_type, stock_code, company_name_zh, company_name_en, industry_name_zh, industry_name_en
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, change_log)
+
+        cursor.executemany("""
+            INSERT INTO TWSE_Fetch_State (industry_code, lang, content_hash, etag, last_fetched)
+            VALUES (?, ?, ?, ?, datetime('now'))
+            ON CONFLICT (industry_code, lang) DO UPDATE SET
+                content_hash = excluded.content_hash,
+                etag = excluded.etag,
+                last_fetched = excluded.last_fetched
+        """, fetch_states or [])
+
+        _clean_incomplete_company_and_industry(cursor)
+
+    return {
+        "inserted": sum(1 for row in changed if row[0] not in existing),
+        "updated": sum(1 for row in changed if row[0] in existing),
+        "removed": len(removed),
+        "unchanged": len(rows) - len(changed)
+    }
+
+def get_ingested_file_hashes():
+    """已成功匯入（或判定為重複）的 PDF 檔案 hash；失敗的檔案下次會重試"""
+    with get_esg_db_pool().connection() as conn:
+        rows = conn.execute("SELECT file_hash FROM PDF_Ingest_Log WHERE status != 'failed'").fetchall()
+    return {row[0] for row in rows}
+
+def ingest_esg_report_batch(items):
+    """
+    在單一交易中寫入一批解析好的 PDF 報告，並記錄到 PDF_Ingest_Log
+
+    Args:
+        items (list[dict]): 每筆包含 file_hash, source_path, company_name, industry, language ('zh' / 'en'),
+            report_year, content, page_texts（各頁內容，全文檢索的頁碼）；解析失敗的檔案改帶 error
+
+    Returns:
+        dict: {"ingested": int, "duplicate": int, "failed": int}
+    """
+    stats = {"ingested": 0, "duplicate": 0, "failed": 0}
+    log_rows = []
+
+    with get_esg_db_pool().transaction() as conn:
+        for item in items:
+            if item.get("error"):
+                log_rows.append((item["file_hash"], item["source_path"], "failed", None, None, item["error"]))
+                stats["failed"] += 1
+                continue
+
+            # 內容完全相同的報告（例如換了檔名）只保留一份
+            report_hash = content_hash(item["content"])
+            existing = conn.execute(
+                "SELECT report_id FROM ESG_Report_Content WHERE content_hash = ? LIMIT 1", (report_hash,)
+            ).fetchone()
+            if existing:
+                log_rows.append((item["file_hash"], item["source_path"], "duplicate", existing[0], report_hash, "Same content already stored"))
+                stats["duplicate"] += 1
+                continue
+
+            company_id = insert_or_get_company_id(item["company_name"], item["industry"], item["language"])
+            report_id = _insert_esg_report(conn, company_id, item["report_year"], item["content"], pages=item.get("page_texts"))
+            if report_id is None:
+                log_rows.append((item["file_hash"], item["source_path"], "duplicate", None, report_hash, "Report for this company and year already exists"))
+                stats["duplicate"] += 1
+            else:
+                log_rows.append((item["file_hash"], item["source_path"], "ingested", report_id, report_hash, None))
+                stats["ingested"] += 1
+
+        conn.executemany("""
+            INSERT INTO PDF_Ingest_Log (file_hash, source_path, status, report_id, content_hash, message)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_hash) DO UPDATE SET
+                source_path = excluded.source_path,
+                status = excluded.status,
+                report_id = excluded.report_id,
+                content_hash = excluded.content_hash,
+                message = excluded.message,
+                ingested_at = datetime('now')
+        """, log_rows)
+
+    if stats["ingested"]:
+        invalidate_dimension_cache()
+    return stats
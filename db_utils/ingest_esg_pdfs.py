@@ -0,0 +1,42 @@
+# 在 terminal 下 python db_utils/ingest_esg_pdfs.py <PDF 資料夾> 就會批次解析 PDF 並寫入 esg_reports.db
+# 例：python db_utils/ingest_esg_pdfs.py db/esg_report_templates/SASB --workers 4
+# 已匯入的檔案會自動跳過，中斷後重跑同一個指令即可續傳
+import argparse
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.esg_pdf_ingest import ingest_pdf_directory, DEFAULT_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of ESG report PDFs into esg_reports.db")
+    parser.add_argument("directory", help="Directory containing PDF files")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Reports written per transaction")
+    parser.add_argument("--manifest", default=None, help="CSV with columns file, company_name, industry, report_year")
+    parser.add_argument("--company", default=None, help="Company name used when no manifest entry is found")
+    parser.add_argument("--industry", default=None, help="Industry name used when no manifest entry is found")
+    parser.add_argument("--year", type=int, default=None, help="Report year used when no manifest entry is found")
+    parser.add_argument("--no-tables", action="store_true", help="Skip PyMuPDF table extraction (faster)")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--force", action="store_true", help="Reprocess files already recorded in PDF_Ingest_Log")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"Directory not found: {args.directory}")
+
+    ingest_pdf_directory(
+        args.directory,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        manifest_path=args.manifest,
+        defaults={"company_name": args.company, "industry": args.industry, "report_year": args.year},
+        include_tables=not args.no_tables,
+        recursive=not args.no_recursive,
+        force=args.force
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,51 @@
-# 在 terminal 下 python init_twse_data.py 就會執行爬蟲把 TWSE 的產業別和公司名稱存入 DB
-from tools.twse_webscraper import write_twse_example_to_db
-import sqlite3
-import pandas as pd
+# 在 terminal 下 python db_utils/init_twse_data.py 就會執行爬蟲把 TWSE 的產業別和公司名稱存入 DB
+# 預設為增量更新（只處理有變動的產業別頁面），加上 --full 會重新處理全部產業
+import argparse
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from tools.twse_webscraper import write_twse_example_to_db
+import pandas as pd
+
+from tools.twse_webscraper import refresh_twse_data, DEFAULT_MAX_WORKERS, DEFAULT_MIN_INTERVAL
+from db_utils.esg_report_db_utils import get_esg_db_pool, get_company_change_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh TWSE industries and companies in esg_reports.db")
+    parser.add_argument("--full", action="store_true", help="Ignore previous fetch state and reprocess every industry")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Concurrent requests to TWSE")
+    parser.add_argument("--interval", type=float, default=DEFAULT_MIN_INTERVAL, help="Minimum seconds between requests")
+    parser.add_argument("--show-changes", type=int, default=10, help="Number of recent company changes to print")
+    parser.add_argument("--quiet", action="store_true", help="Skip printing table samples")
+    args = parser.parse_args()
+
+    # Step 1: 增量更新（沒有變動的產業會直接跳過）
+    refresh_twse_data(full=args.full, max_workers=args.workers, min_interval=args.interval)
+
+    # Step 2: 顯示最近的公司異動
+    if args.show_changes > 0:
+        print("\n📝 Recent company changes:")
+        print(get_company_change_log(limit=args.show_changes))
+
+    if args.quiet:
+        return
 
+    # Step 3: 顯示資料表內容
+    with get_esg_db_pool().connection() as conn:
+        print("\n📦 Industry Table:")
+        industry_df = pd.read_sql_query("SELECT * FROM Industry LIMIT 10", conn)
+        print(industry_df)
 
-# Step 1: 呼叫寫入函式（已內建判斷是否已有資料）
-write_twse_example_to_db()
+        print("\n🏢 Company Table:")
+        company_df = pd.read_sql_query("""
+            SELECT Company.company_id, Company.stock_code, company_name_zh, company_name_en, Industry.industry_name_en
+            FROM Company
+            JOIN Industry ON Company.industry_id = Industry.industry_id
+            LIMIT 10
+        """, conn)
+        print(company_df)
 
-# Step 2: 顯示資料表內容
-db_path = "db/esg_reports.db"
-with sqlite3.connect(db_path) as conn:
-    print("\n📦 Industry Table:")
-    industry_df = pd.read_sql_query("SELECT * FROM Industry LIMIT 10", conn)
-    print(industry_df)
 
-    print("\n🏢 Company Table:")
-    company_df = pd.read_sql_query("""
-        SELECT Company.company_id, company_name_zh, company_name_en, Industry.industry_name_en
-        FROM Company
-        JOIN Industry ON Company.industry_id = Industry.industry_id
-        LIMIT 10
-    """, conn)
-    print(company_df)
+if __name__ == "__main__":
+    main()
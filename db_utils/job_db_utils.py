@@ -0,0 +1,166 @@
+# 背景工作（tools/job_queue.py）的狀態表：排隊 / 執行中 / 完成 / 失敗 / 取消、進度與取消旗標
+# jobs.db 由同一台機器上的所有 server process 共用，每筆工作記錄送出它的 process（owner_pid）
+import os
+import threading
+import pandas as pd
+from db_utils.connection_pool import get_pool
+
+JOB_DB_PATH = "db/jobs.db"
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+def get_job_db_pool():
+    """jobs.db 的共用連線池；第一次取用時建立資料表"""
+    pool = get_pool(JOB_DB_PATH)
+    if JOB_DB_PATH not in _initialized_paths:
+        with _init_lock:
+            if JOB_DB_PATH not in _initialized_paths:
+                init_job_db(pool)
+                _initialized_paths.add(JOB_DB_PATH)
+    return pool
+
+def init_job_db(pool):
+    with pool.transaction() as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS Job (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                job_key TEXT NOT NULL,
+                label TEXT,
+                status TEXT NOT NULL CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                started_at TEXT,
+                finished_at TEXT,
+                owner_pid INTEGER
+            )
+        """)
+        # 舊版 jobs.db 沒有 owner_pid 欄位
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(Job)")}
+        if "owner_pid" not in columns:
+            conn.execute("ALTER TABLE Job ADD COLUMN owner_pid INTEGER")
+        # 依 job_key 找相同的工作（去重）；依建立時間列出最近的工作
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_key_status ON Job (job_key, status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_created_at ON Job (created_at)")
+        # 已結束的 process 留下的未完成工作不可能繼續執行；其他仍在執行的 process 的工作不動
+        owners = conn.execute("""
+            SELECT DISTINCT owner_pid FROM Job WHERE status IN ('queued', 'running')
+        """).fetchall()
+        dead_owners = [pid for (pid,) in owners if pid is None or not _process_alive(pid)]
+        for pid in dead_owners:
+            conn.execute("""
+                UPDATE Job
+                SET status = 'failed', error = 'Interrupted by server restart', finished_at = datetime('now')
+                WHERE status IN ('queued', 'running') AND owner_pid IS ?
+            """, (pid,))
+
+def _process_alive(pid):
+    """同一台機器上 pid 是否仍在執行；自己的 pid 代表是之前用過同一個 pid 的 process（本 process 尚未送出任何工作）"""
+    if pid == os.getpid():
+        return False
+    if os.name == "nt":
+        return True  # Windows 的 os.kill(pid, 0) 會送出 CTRL_C_EVENT，無法用來探測，保守地視為仍在執行
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 存在但屬於其他使用者
+    except OSError:
+        return False
+    return True
+
+def insert_job(job_id, job_type, job_key, label=None):
+    with get_job_db_pool().transaction() as conn:
+        conn.execute("""
+            INSERT INTO Job (job_id, job_type, job_key, label, status, owner_pid)
+            VALUES (?, ?, ?, ?, 'queued', ?)
+        """, (job_id, job_type, job_key, label, os.getpid()))
+
+def find_jobs_by_key(job_key, statuses):
+    """相同 job_key 且狀態符合的工作（新到舊）"""
+    placeholders = ", ".join("?" for _ in statuses)
+    with get_job_db_pool().connection() as conn:
+        rows = conn.execute(f"""
+            SELECT job_id, status FROM Job
+            WHERE job_key = ? AND status IN ({placeholders})
+            ORDER BY created_at DESC, rowid DESC
+        """, (job_key, *statuses)).fetchall()
+    return [{"job_id": job_id, "status": status} for job_id, status in rows]
+
+def mark_job_running(job_id):
+    """queued → running；已被取消的工作回傳 False"""
+    with get_job_db_pool().transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE Job SET status = 'running', started_at = datetime('now')
+            WHERE job_id = ? AND status = 'queued' AND cancel_requested = 0
+        """, (job_id,))
+        return cursor.rowcount == 1
+
+def update_job_progress(job_id, progress, message=None):
+    with get_job_db_pool().transaction() as conn:
+        conn.execute("""
+            UPDATE Job SET progress = ?, message = COALESCE(?, message)
+            WHERE job_id = ? AND status = 'running'
+        """, (float(progress), message, job_id))
+
+def finish_job(job_id, status, message=None, error=None):
+    with get_job_db_pool().transaction() as conn:
+        conn.execute("""
+            UPDATE Job
+            SET status = ?,
+                progress = CASE WHEN ? = 'succeeded' THEN 1.0 ELSE progress END,
+                message = COALESCE(?, message),
+                error = ?,
+                finished_at = datetime('now')
+            WHERE job_id = ?
+        """, (status, status, message, error, job_id))
+
+def request_job_cancel(job_id):
+    """
+    設定取消旗標；還在排隊的工作直接標記為 cancelled
+
+    Returns:
+        bool: 工作仍在進行中（取消請求有效）
+    """
+    with get_job_db_pool().transaction() as conn:
+        cursor = conn.execute("""
+            UPDATE Job SET cancel_requested = 1
+            WHERE job_id = ? AND status IN ('queued', 'running')
+        """, (job_id,))
+        conn.execute("""
+            UPDATE Job SET status = 'cancelled', finished_at = datetime('now')
+            WHERE job_id = ? AND status = 'queued'
+        """, (job_id,))
+        return cursor.rowcount == 1
+
+def get_job_row(job_id):
+    with get_job_db_pool().connection() as conn:
+        row = conn.execute("""
+            SELECT job_id, job_type, label, status, progress, message, error, cancel_requested,
+                   created_at, started_at, finished_at
+            FROM Job WHERE job_id = ?
+        """, (job_id,)).fetchone()
+    if not row:
+        return None
+    keys = ["job_id", "job_type", "label", "status", "progress", "message", "error", "cancel_requested",
+            "created_at", "started_at", "finished_at"]
+    return dict(zip(keys, row))
+
+def list_jobs(limit=20, active_only=False):
+    """最近的工作（新到舊）"""
+    where = "WHERE status IN ('queued', 'running')" if active_only else ""
+    with get_job_db_pool().connection() as conn:
+        df = pd.read_sql_query(f"""
+            SELECT job_id, job_type, label, status, progress, message, error, created_at, finished_at
+            FROM Job {where}
+            ORDER BY created_at DESC, rowid DESC
+            LIMIT ?
+        """, conn, params=[int(limit)])
+    return df
@@ -0,0 +1,299 @@
+# esg_reports.db 的版本化 schema migration
+# 目前版本記錄在 SQLite 的 PRAGMA user_version；每個 migration 只會執行一次，且各自在一個交易中完成
+from db_utils.content_store import compress_content, decompress_content, make_preview
+from db_utils.report_search import FTS_TABLE, PAGE_ROWID_FACTOR, index_report_pages
+
+def _create_base_schema(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Industry (
+        industry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        industry_name_zh TEXT UNIQUE,
+        industry_name_en TEXT
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Company (
+        company_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company_name_zh TEXT UNIQUE,
+        company_name_en TEXT,
+        industry_id INTEGER,
+        FOREIGN KEY (industry_id) REFERENCES Industry(industry_id)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ESG_Report (
+        report_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        company_id INTEGER,
+        report_year INTEGER,
+        content TEXT,
+        FOREIGN KEY (company_id) REFERENCES Company(company_id)
+    );
+    """)
+
+def _add_indexes_and_report_uniqueness(cursor):
+    # 舊資料可能已有重複的 (company_id, report_year)，保留最早寫入的一筆
+    cursor.execute("""
+        DELETE FROM ESG_Report
+        WHERE report_id NOT IN (
+            SELECT MIN(report_id) FROM ESG_Report GROUP BY company_id, report_year
+        )
+    """)
+    # UNIQUE index 讓 INSERT ... ON CONFLICT(company_id, report_year) 可以直接去重
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_esg_report_company_year
+        ON ESG_Report (company_id, report_year)
+    """)
+    # 報告列表依年份排序，並帶出 company_id 做 JOIN（covering）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_esg_report_year_company
+        ON ESG_Report (report_year, company_id)
+    """)
+    # 公司：英文名精確比對 + 不分大小寫比對；依產業列出公司
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_company_name_en
+        ON Company (company_name_en)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_company_name_en_nocase
+        ON Company (company_name_en COLLATE NOCASE)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_company_industry
+        ON Company (industry_id, company_name_en, company_name_zh)
+    """)
+    # 產業：英文名查詢（中文名已有 UNIQUE 約束自帶 index）
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_industry_name_en
+        ON Industry (industry_name_en)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_industry_name_en_nocase
+        ON Industry (industry_name_en COLLATE NOCASE)
+    """)
+    cursor.execute("ANALYZE")
+
+def _add_dimension_version(cursor):
+    # Company / Industry 任何異動都會讓 version + 1，讓各 process 的 in-memory cache 知道要重新載入
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Dimension_Version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO Dimension_Version (id, version) VALUES (1, 0)")
+    for table in ["Company", "Industry"]:
+        for event in ["INSERT", "UPDATE", "DELETE"]:
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE Dimension_Version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+
+def _move_report_content_to_store(cursor):
+    # 報告全文改以 zlib 壓縮存放在獨立的 ESG_Report_Content，ESG_Report 只留 metadata + 預覽
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ESG_Report_Content (
+            report_id INTEGER PRIMARY KEY,
+            codec TEXT NOT NULL,
+            content BLOB NOT NULL,
+            content_hash TEXT NOT NULL,
+            FOREIGN KEY (report_id) REFERENCES ESG_Report(report_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_esg_report_content_hash
+        ON ESG_Report_Content (content_hash)
+    """)
+    cursor.execute("""
+        CREATE TABLE ESG_Report_New (
+            report_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER,
+            report_year INTEGER,
+            preview TEXT,
+            content_size INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (company_id) REFERENCES Company(company_id)
+        )
+    """)
+
+    rows = cursor.execute("SELECT report_id, company_id, report_year, content FROM ESG_Report").fetchall()
+    for report_id, company_id, report_year, content in rows:
+        content = content or ""
+        codec, blob, content_hash = compress_content(content)
+        cursor.execute("""
+            INSERT INTO ESG_Report_New (report_id, company_id, report_year, preview, content_size)
+            VALUES (?, ?, ?, ?, ?)
+        """, (report_id, company_id, report_year, make_preview(content), len(content)))
+        cursor.execute("""
+            INSERT INTO ESG_Report_Content (report_id, codec, content, content_hash)
+            VALUES (?, ?, ?, ?)
+        """, (report_id, codec, blob, content_hash))
+
+    cursor.execute("DROP TABLE ESG_Report")
+    cursor.execute("ALTER TABLE ESG_Report_New RENAME TO ESG_Report")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_esg_report_company_year
+        ON ESG_Report (company_id, report_year)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_esg_report_year_company
+        ON ESG_Report (report_year, company_id)
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_esg_report_delete_content
+        AFTER DELETE ON ESG_Report
+        BEGIN
+            DELETE FROM ESG_Report_Content WHERE report_id = old.report_id;
+        END
+    """)
+
+def _add_report_paging_index(cursor):
+    # 報告列表以 (report_year DESC, report_id DESC) 分頁；rowid 隱含在 index 最後一欄
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_esg_report_year
+        ON ESG_Report (report_year)
+    """)
+
+def _add_report_fulltext_index(cursor):
+    # 每一頁一列；中文在寫入前已逐字切分（見 db_utils/report_search.py）
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+            body,
+            report_id UNINDEXED,
+            page UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    # 刪除報告時同步刪除該報告所有頁面的索引
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_esg_report_delete_fts
+        AFTER DELETE ON ESG_Report
+        BEGIN
+            DELETE FROM {FTS_TABLE}
+            WHERE rowid BETWEEN old.report_id * {PAGE_ROWID_FACTOR}
+                            AND old.report_id * {PAGE_ROWID_FACTOR} + {PAGE_ROWID_FACTOR - 1};
+        END
+    """)
+    # 為既有報告建立索引
+    rows = cursor.execute("SELECT report_id, codec, content FROM ESG_Report_Content").fetchall()
+    for report_id, codec, blob in rows:
+        index_report_pages(cursor, report_id, decompress_content(codec, blob))
+
+def _add_company_stock_code(cursor):
+    # TWSE 股票代號是公司的自然鍵，中英文列表以此合併
+    cursor.execute("ALTER TABLE Company ADD COLUMN stock_code TEXT")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_company_stock_code
+        ON Company (stock_code)
+    """)
+
+def _add_twse_refresh_tracking(cursor):
+    # 每個產業別頁面（中 / 英）上次抓取的內容 hash、ETag 與時間，用來跳過沒有變動的產業
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS TWSE_Fetch_State (
+            industry_code TEXT NOT NULL,
+            lang TEXT NOT NULL,
+            content_hash TEXT,
+            etag TEXT,
+            last_fetched TEXT NOT NULL,
+            PRIMARY KEY (industry_code, lang)
+        )
+    """)
+    # 公司新增 / 更新 / 下市的異動紀錄
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Company_Change_Log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stock_code TEXT,
+            change_type TEXT NOT NULL CHECK (change_type IN ('added', 'updated', 'removed')),
+            company_name_zh TEXT,
+            company_name_en TEXT,
+            industry_name_zh TEXT,
+            industry_name_en TEXT,
+            changed_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_company_change_log_stock_code
+        ON Company_Change_Log (stock_code)
+    """)
+
+def _add_pdf_ingest_log(cursor):
+    # 批次匯入 PDF 的紀錄：以檔案 hash 為 key，重跑時跳過已處理的檔案（可中斷續跑）
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS PDF_Ingest_Log (
+            file_hash TEXT PRIMARY KEY,
+            source_path TEXT NOT NULL,
+            status TEXT NOT NULL CHECK (status IN ('ingested', 'duplicate', 'failed')),
+            report_id INTEGER,
+            content_hash TEXT,
+            message TEXT,
+            ingested_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    """)
+    # 報告被刪除後，對應的檔案可以重新匯入
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_esg_report_delete_ingest_log
+        AFTER DELETE ON ESG_Report
+        BEGIN
+            DELETE FROM PDF_Ingest_Log WHERE report_id = old.report_id;
+        END
+    """)
+
+def _reindex_report_pages(cursor):
+    # 舊版切頁會略過空白頁、把只有表格的頁面併進上一頁，之後每一頁的頁碼都往前移；以修正後的切頁重建索引
+    cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    rows = cursor.execute("SELECT report_id, codec, content FROM ESG_Report_Content").fetchall()
+    for report_id, codec, blob in rows:
+        index_report_pages(cursor, report_id, decompress_content(codec, blob))
+
+# (version, 說明, migration function)；只能往後新增，不可修改已發佈的版本
+MIGRATIONS = [
+    (1, "Base Industry / Company / ESG_Report schema", _create_base_schema),
+    (2, "Indexes and UNIQUE (company_id, report_year) on ESG_Report", _add_indexes_and_report_uniqueness),
+    (3, "Dimension_Version counter for Company / Industry cache invalidation", _add_dimension_version),
+    (4, "Move ESG_Report.content into compressed ESG_Report_Content", _move_report_content_to_store),
+    (5, "Paging index on ESG_Report (report_year, report_id)", _add_report_paging_index),
+    (6, "FTS5 full-text index over report pages", _add_report_fulltext_index),
+    (7, "Company.stock_code as a unique natural key", _add_company_stock_code),
+    (8, "TWSE fetch state and company change log for incremental refresh", _add_twse_refresh_tracking),
+    (9, "PDF_Ingest_Log for resumable batch PDF ingestion", _add_pdf_ingest_log),
+    (10, "Rebuild full-text index so blank and table-only pages keep their page numbers", _reindex_report_pages),
+]
+
+# 這些版本會搬移大量資料，完成後以 VACUUM 把釋放的空間還給檔案系統
+VACUUM_AFTER = {4}
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(pool):
+    """
+    將資料庫升級到最新版本。
+
+    Args:
+        pool (SQLiteConnectionPool): 目標資料庫的連線池
+
+    Returns:
+        int: 升級後的 schema 版本
+    """
+    with pool.connection() as conn:
+        current_version = get_schema_version(conn)
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        with pool.transaction() as conn:
+            # 另一個 process 可能已經先完成這個 migration
+            if get_schema_version(conn) >= version:
+                continue
+            migrate(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        print(f"🛠️ Applied ESG DB migration {version}: {description}")
+        current_version = version
+
+        if version in VACUUM_AFTER:
+            with pool.connection() as conn:
+                conn.execute("VACUUM")
+
+    return current_version
@@ -0,0 +1,77 @@
+# ESG 報告全文檢索（SQLite FTS5）用的文字處理
+# - 中文：每個 CJK 字元視為一個 token，查詢時以 phrase 比對連續字元（等同子字串搜尋，不需要 CKIP）
+# - 英文：交給 FTS5 unicode61 tokenizer（不分大小寫、去除重音）
+import re
+
+FTS_TABLE = "ESG_Report_FTS"
+# FTS rowid = report_id * PAGE_ROWID_FACTOR + page，刪除報告時可用 rowid 區間一次刪掉所有頁
+PAGE_ROWID_FACTOR = 100000
+
+CJK_CHAR = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+_cjk_char_re = re.compile(f"([{CJK_CHAR}])")
+_query_term_re = re.compile(f"[{CJK_CHAR}]+|[^\\s{CJK_CHAR}\"]+")
+_word_re = re.compile(r"\w", re.UNICODE)
+
+def segment_for_fts(text):
+    """在每個中文字前後加空白，讓 unicode61 tokenizer 逐字切分"""
+    text = _cjk_char_re.sub(r" \1 ", text or "")
+    return re.sub(r"[ \t]+", " ", text).strip()
+
+def split_report_pages(content):
+    """
+    將 ESG_Report 全文切回頁面（上傳時以 "\\n\\n" 串接各頁內容）。
+    寫入時請直接把頁面列表交給 index_report_pages；這裡只用於只剩全文的舊資料。
+    - 空白頁（封面、掃描頁、解析失敗存成 ""）仍佔一個頁碼，後面的頁碼不會往前移
+    - 頁面內的文字已壓成單行（lib/pdf_text.clean_text），頁內的空行只會出現在「表格結尾的換行 + 下一個表格」之間，
+      這時 chunk 直接以 "Table:" 開頭；只有表格的頁面前面是頁面分隔，chunk 以 "\\nTable:" 開頭，不會被併進上一頁
+
+    Returns:
+        list[tuple]: [(page_number, page_text), ...]
+    """
+    pages = []
+    for chunk in (content or "").split("\n\n"):
+        if pages and chunk.startswith("Table:"):
+            pages[-1] = pages[-1] + "\n\n" + chunk
+        else:
+            pages.append(chunk)
+    return list(enumerate(pages, start=1))
+
+def build_fts_query(query):
+    """
+    將使用者輸入轉為 FTS5 MATCH 語法：中文片段 → 逐字 phrase，其餘詞 → 加引號的單詞，全部以 AND 連接
+
+    Returns:
+        str | None: FTS5 查詢字串；沒有可搜尋的詞時回傳 None
+    """
+    terms = []
+    for term in _query_term_re.findall(query or ""):
+        if re.match(f"[{CJK_CHAR}]", term):
+            terms.append('"' + " ".join(term) + '"')
+        elif _word_re.search(term):
+            terms.append('"' + term + '"')
+    return " AND ".join(terms) if terms else None
+
+def clean_snippet(snippet):
+    """移除為了逐字索引而插入中文字之間的空白"""
+    snippet = re.sub(f"(?<=[{CJK_CHAR}]) (?=[{CJK_CHAR}])", "", snippet or "")
+    snippet = re.sub(f"(?<=[{CJK_CHAR}]) (?=\\*\\*[{CJK_CHAR}])", "", snippet)
+    snippet = re.sub(f"(?<=[{CJK_CHAR}]\\*\\*) (?=[{CJK_CHAR}])", "", snippet)
+    return snippet
+
+def index_report_pages(cursor, report_id, content, pages=None):
+    """
+    在呼叫端的交易內，把一份報告的每一頁寫進 FTS 索引
+
+    Args:
+        content (str): 報告全文；沒有 pages 時由全文切回頁面
+        pages (list[str] | None): 依頁序排列的各頁內容（第 i 個即第 i + 1 頁，空白頁也要保留）
+    """
+    numbered = enumerate(pages, start=1) if pages is not None else split_report_pages(content)
+    cursor.executemany(
+        f"INSERT INTO {FTS_TABLE} (rowid, body, report_id, page) VALUES (?, ?, ?, ?)",
+        [
+            (report_id * PAGE_ROWID_FACTOR + page, segment_for_fts(text), report_id, page)
+            for page, text in numbered
+            if page < PAGE_ROWID_FACTOR and text and text.strip()
+        ]
+    )
@@ -1,45 +1,24 @@
-from pdf_context import get_pdf_context, preprocess_pdf_sentences
-from agents.gemini_agent import chat_with_gemini
+from pdf_context import get_pdf_context, preprocess_pdf_sentences, lazy_init_ckip_ws_driver
+from db_utils.content_store import content_hash
+from tools.job_queue import submit_job
+from lib.session_resources import get_shared_resource
+from lib.nltk_resources import ensure_nltk_resources
+from ui_utils.job_section import render_job_status
 import json
 import streamlit as st
 import re
 import os
-import nltk
-import matplotlib.pyplot as plt
-from sklearn.feature_extraction.text import TfidfVectorizer
-from wordcloud import WordCloud
-from matplotlib import font_manager as fm
-from ckip_transformers.nlp import CkipPosTagger
-
-# 若部署在 Streamlit Cloud，自動加載這個路徑
-nltk_data_path = "/home/appuser/.nltk_data"
-if os.path.exists(nltk_data_path):
-    nltk.data.path.append(nltk_data_path)
-
-# 自動下載 NLTK 所需資源（避免雲端錯誤）
-try:
-    nltk.data.find("tokenizers/punkt")
-except LookupError:
-    nltk.download("punkt")
-
-try:
-    nltk.data.find("taggers/averaged_perceptron_tagger")
-except LookupError:
-    nltk.download("averaged_perceptron_tagger")
-
-from nltk import pos_tag
+
+# Gemini agent、sklearn、wordcloud、matplotlib、ckip_transformers、nltk 都在函式內 import：
+# 只有實際執行分析 / 文字雲時才載入，不影響 app 啟動時間
 
 def clean_chinese_markdown_spacing(text):
     text = text.replace("。\n", "。\n\n").replace("。", "。\n")
     text = re.sub(r"(?<!\n)- ", r"\n- ", text)
     return text
 
-def analyze_esg_from_pdf():
-    pdf_text = get_pdf_context(page="all")
-    # language = st.session_state.get("pdf_language", "english")
-    lang_setting = st.session_state.get("lang_setting", "English")
-
-    prompt = (
+def build_esg_analysis_prompt(pdf_text, lang_setting="English"):
+    return (
         "You are a professional ESG report analyst.\n\n"
         f"⚠️ Please output in {lang_setting}\n"
         "Please critically analyze the following ESG report and summarize findings into the **three official ESG dimensions**:\n"
@@ -57,8 +36,39 @@ def analyze_esg_from_pdf():
         f"{pdf_text}\n"
     )
 
+def run_esg_analysis(context, pdf_text, lang_setting="English"):
+    """背景工作：以 Gemini 分析 ESG 報告（不使用 session_state）"""
+    from agents.gemini_agent import chat_with_gemini
+
+    context.report(0.1, "🤖 Gemini is reading and analyzing...", force=True)
+    result = chat_with_gemini(build_esg_analysis_prompt(pdf_text, lang_setting), restrict=False)
+    context.check_cancelled()
+
+    if lang_setting == "繁體中文":
+        result = clean_chinese_markdown_spacing(result)
+    return result
+
+def submit_esg_analysis():
+    """把目前 PDF 的 ESG 分析送到背景執行；同一份 PDF + 語言設定不會重複分析"""
+    pdf_text = get_pdf_context(page="all")
+    lang_setting = st.session_state.get("lang_setting", "English")
+    return submit_job(
+        "esg_analysis",
+        run_esg_analysis,
+        kwargs={"pdf_text": pdf_text, "lang_setting": lang_setting},
+        dedup_payload={"pdf": content_hash(pdf_text), "lang_setting": lang_setting},
+        label="🌱 ESG analysis"
+    )
+
+def analyze_esg_from_pdf():
+    from agents.gemini_agent import chat_with_gemini
+
+    pdf_text = get_pdf_context(page="all")
+    # language = st.session_state.get("pdf_language", "english")
+    lang_setting = st.session_state.get("lang_setting", "English")
+
     with st.spinner("🤖 Gemini is reading and analyzing..."):
-        result = chat_with_gemini(prompt, restrict = False)
+        result = chat_with_gemini(build_esg_analysis_prompt(pdf_text, lang_setting), restrict = False)
 
     if lang_setting == "繁體中文":
         result = clean_chinese_markdown_spacing(result)
@@ -67,25 +77,20 @@ def analyze_esg_from_pdf():
     return result
 
 def get_english_noun_adj_tokens(tokens):
+    if ensure_nltk_resources("averaged_perceptron_tagger_eng"):
+        return list(tokens)  # 沒有詞性標註模型時不過濾
+    from nltk import pos_tag
+
     pos_tags = pos_tag(tokens)
     filtered = [word for word, pos in pos_tags if pos.startswith("NN") or pos.startswith("JJ")]
     return filtered
 
-def analyze_esg_for_wordcloud(filtered_keywords):
-    # 匯入 Gemini Agent
-    try:
-        from agents.gemini_agent import chat_with_gemini, extract_json_from_gemini_output
-        GEMINI_ENABLED = bool(st.secrets.get("GEMINI_API_KEY", None))
-    except Exception as e:
-        GEMINI_ENABLED = False
-        print(f"❌ Failed to import Gemini agent: {e}")
-        st.warning(f"Gemini Agent not available: {e}")
-
+def build_wordcloud_classification_prompt(filtered_keywords):
     # 將 keyword dict 轉成文字（如 "keyword1: 123, keyword2: 87, ..."）
     keyword_str = ", ".join([f"{k}: {v}" for k, v in filtered_keywords.items()])
 
     # prompt 結構
-    prompt = f"""
+    return f"""
     You are an ESG assistant. Please classify the following keywords into three categories: Environmental, Social, and Governance.
 
     Only use the keywords provided, and assign each keyword to **one and only one** category.
@@ -103,31 +108,94 @@ def analyze_esg_for_wordcloud(filtered_keywords):
     {keyword_str}
     """
 
-    # 呼叫 Gemini 並取得結果
-    with st.spinner("🤖 Gemini is classifying the keywords into ESG dimensions..."):
-        result = chat_with_gemini(prompt, restrict=False)
+def classify_keywords_by_esg(filtered_keywords):
+    """以 Gemini 將關鍵字分成 E / S / G 三類；回傳無法解析時丟出 json.JSONDecodeError"""
+    from agents.gemini_agent import chat_with_gemini, extract_json_from_gemini_output
+
+    result = chat_with_gemini(build_wordcloud_classification_prompt(filtered_keywords), restrict=False)
+    classification = json.loads(extract_json_from_gemini_output(result))
+    e_words = classification.get("Environmental", [])
+    s_words = classification.get("Social", [])
+    g_words = classification.get("Governance", [])
+    return e_words, s_words, g_words
+
+def compute_wordcloud_keywords(pdf_text, language, ws_driver=None):
+    """
+    TF-IDF + 詞性過濾（中文：CKIP POS 的 N / V / A；英文：NLTK 的名詞 / 形容詞）
+
+    Returns:
+        dict | None: {word: tf-idf score}；沒有有效句子時為 None
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    sentences = preprocess_pdf_sentences(pdf_text, tokenize=True, language=language, ws_driver=ws_driver)
+    if not sentences:
+        return None
+
+    tfidf = TfidfVectorizer()
+    tfidf_matrix = tfidf.fit_transform(sentences)
+    scores = tfidf_matrix.sum(axis=0).A1
+    tokens = tfidf.get_feature_names_out()
+    tfidf_dict = dict(zip(tokens, scores))
+
+    if language == "chinese":
+        from ckip_transformers.nlp import CkipPosTagger
+
+        words = list(tfidf_dict.keys())
+        pos_tagger = get_shared_resource("ckip_pos", CkipPosTagger)
+        pos_tags = pos_tagger([words])[0]
+        valid_pos_prefix = ("N", "V", "A")
+        filtered = {
+            w: tfidf_dict[w]
+            for w, pos in zip(words, pos_tags)
+            if any(pos.startswith(p) for p in valid_pos_prefix)
+        }
+    else:
+        filtered = tfidf_dict.copy()
+        filtered = {w: tfidf_dict[w] for w in get_english_noun_adj_tokens(list(tfidf_dict.keys()))}
+    return filtered
+
+def run_wordcloud_job(context, pdf_text, language, mode, ws_driver=None):
+    """
+    背景工作：計算文字雲用的關鍵字；mode == "esg" 時再以 Gemini 分成 E / S / G
 
-    # 嘗試將 Gemini 回傳的內容轉成 JSON
+    Returns:
+        dict: {"filtered": dict | None, "esg": (e_words, s_words, g_words) | None, "esg_error": str | None}
+    """
+    context.report(0.1, "🔤 Tokenizing and scoring keywords (TF-IDF + POS)...", force=True)
+    filtered = compute_wordcloud_keywords(pdf_text, language, ws_driver=ws_driver)
+    result = {"filtered": filtered, "esg": None, "esg_error": None}
+    if not filtered or mode != "esg":
+        return result
+
+    # Get Top 100 filtered words
+    context.report(0.6, "🤖 Gemini is classifying the keywords into ESG dimensions...", force=True)
+    filtered_keywords = dict(sorted(filtered.items(), key=lambda item: item[1], reverse=True)[:100])
     try:
-        cleaned = extract_json_from_gemini_output(result)
-        classification = json.loads(cleaned)
-        e_words = classification.get("Environmental", [])
-        s_words = classification.get("Social", [])
-        g_words = classification.get("Governance", [])
+        result["esg"] = classify_keywords_by_esg(filtered_keywords)
     except json.JSONDecodeError as e:
-        # st.error("❌ Failed to parse Gemini response as JSON.")
-        # st.text(result)
-        st.info("⚠️ Unable to classify keywords into ESG categories. Please check the response.")
-        raise e
+        result["esg_error"] = str(e)
+    return result
 
-    return e_words, s_words, g_words
+def submit_wordcloud_job(mode):
+    pdf_text = get_pdf_context(page="all")
+    language = st.session_state.get("pdf_language", "english")
+    if language == "chinese":
+        # 第一次使用時在 script thread 載入 CKIP 模型（顯示 spinner）；之後所有 session / 背景工作共用
+        lazy_init_ckip_ws_driver()
+    return submit_job(
+        "wordcloud",
+        run_wordcloud_job,
+        kwargs={"pdf_text": pdf_text, "language": language, "mode": mode},
+        dedup_payload={"pdf": content_hash(pdf_text), "language": language, "mode": mode},
+        label=f"☁️ Word cloud ({mode})"
+    )
 
 def show_wordcloud():
     if "pdf_text" not in st.session_state:
         st.warning("⚠️ Please upload a PDF for plotting word cloud.")
         return
 
-    pdf_text = get_pdf_context(page="all")
     language = st.session_state.get("pdf_language", "english")
 
     # --- 圖的標題（從 session 中撈公司資訊） ---
@@ -138,6 +206,10 @@ def show_wordcloud():
     full_title = f"{company} ({year})\n{industry} Sector"
 
     def plot_wordcloud(word_freq, title):
+        import matplotlib.pyplot as plt
+        from matplotlib import font_manager as fm
+        from wordcloud import WordCloud
+
         FONT_PATH = os.path.join("fonts", "TaipeiSansTCBeta-Regular.ttf")
         try:
             wc = WordCloud(
@@ -161,64 +233,50 @@ def show_wordcloud():
         ax.axis("off")
         st.pyplot(fig)
 
-    # --- TF-IDF + POS ---
-    sentences = preprocess_pdf_sentences(pdf_text, tokenize=True)
-    if not sentences:
-        st.warning("⚠️ No valid sentences extracted.")
-        return
-
-    tfidf = TfidfVectorizer()
-    tfidf_matrix = tfidf.fit_transform(sentences)
-    scores = tfidf_matrix.sum(axis=0).A1
-    tokens = tfidf.get_feature_names_out()
-    tfidf_dict = dict(zip(tokens, scores))
-
-    if language == "chinese":
-        words = list(tfidf_dict.keys())
-        pos_tagger = CkipPosTagger()
-        pos_tags = pos_tagger([words])[0]
-        valid_pos_prefix = ("N", "V", "A")
-        filtered = {
-            w: tfidf_dict[w]
-            for w, pos in zip(words, pos_tags)
-            if any(pos.startswith(p) for p in valid_pos_prefix)
-        }
-    else:
-        filtered = tfidf_dict.copy()
-        filtered = {w: tfidf_dict[w] for w in get_english_noun_adj_tokens(list(tfidf_dict.keys()))}
-
-    # --- 圖顯示邏輯 ---
+    # --- 圖顯示邏輯：TF-IDF + POS（與 Gemini 分類）在背景工作中計算 ---
     mode = st.session_state.get("wordcloud_mode", None)
 
-    if mode == "main":
-        st.subheader("☁️ Word Cloud (with POS)")
-        plot_wordcloud(filtered, title=full_title)
-
-    elif mode == "esg":
-        st.subheader("Word Clouds in ESG Dimensions")
-
-        e_worddict, s_worddict, g_worddict = {}, {}, {}
-
-        # Get Top 50 filtered words
-        filtered_keywords = dict(sorted(filtered.items(), key=lambda item: item[1], reverse=True)[:100])
-
-        e_words, s_words, g_words = analyze_esg_for_wordcloud(filtered_keywords)
-        for word, score in filtered_keywords.items():
-            if word in e_words:
-                e_worddict[word] = score
-            elif word in s_words:
-                s_worddict[word] = score
-            elif word in g_words:
-                g_worddict[word] = score
-
-        st.markdown("#### 🌿 Environmental")
-        plot_wordcloud(e_worddict, title="Environmental Word Cloud")
-
-        st.markdown("#### 🤝 Social")
-        plot_wordcloud(s_worddict, title="Social Word Cloud")
-
-        st.markdown("#### 🏛️ Governance")
-        plot_wordcloud(g_worddict, title="Governance Word Cloud")
+    if mode in ["main", "esg"]:
+        job_id = submit_wordcloud_job(mode)
+        job = render_job_status(job_id, title="☁️ Preparing word cloud...")
+        if job and job["status"] == "succeeded" and job.get("has_result"):
+            result = job["result"]
+            filtered = result["filtered"]
+            if not filtered:
+                st.warning("⚠️ No valid sentences extracted.")
+                return
+
+            if mode == "main":
+                st.subheader("☁️ Word Cloud (with POS)")
+                plot_wordcloud(filtered, title=full_title)
+
+            elif mode == "esg":
+                st.subheader("Word Clouds in ESG Dimensions")
+                if result["esg"] is None:
+                    st.info("⚠️ Unable to classify keywords into ESG categories. Please check the response.")
+                else:
+                    e_worddict, s_worddict, g_worddict = {}, {}, {}
+
+                    # Get Top 100 filtered words
+                    filtered_keywords = dict(sorted(filtered.items(), key=lambda item: item[1], reverse=True)[:100])
+
+                    e_words, s_words, g_words = result["esg"]
+                    for word, score in filtered_keywords.items():
+                        if word in e_words:
+                            e_worddict[word] = score
+                        elif word in s_words:
+                            s_worddict[word] = score
+                        elif word in g_words:
+                            g_worddict[word] = score
+
+                    st.markdown("#### 🌿 Environmental")
+                    plot_wordcloud(e_worddict, title="Environmental Word Cloud")
+
+                    st.markdown("#### 🤝 Social")
+                    plot_wordcloud(s_worddict, title="Social Word Cloud")
+
+                    st.markdown("#### 🏛️ Governance")
+                    plot_wordcloud(g_worddict, title="Governance Word Cloud")
 
     # --- 控制按鈕區塊 ---
     if "wordcloud_mode" in st.session_state or st.session_state["show_wordcloud_trigger"]:
@@ -1,7 +1,6 @@
 import json
 import streamlit as st
 from pdf_context import *
-from agents.gemini_agent import chat_with_gemini, extract_json_from_gemini_output
 from db_utils.esg_report_db_utils import get_all_companies, get_all_industries, get_industry_by_company
 
 def extract_esg_info_from_pdf(top_n_pages=[1, 2, 3, 4, 5]):
@@ -14,6 +13,8 @@ def extract_esg_info_from_pdf(top_n_pages=[1, 2, 3, 4, 5]):
     Returns:
         dict | None: Extracted fields or None if failed/incomplete.
     """
+    from agents.gemini_agent import chat_with_gemini, extract_json_from_gemini_output
+
     contents = ""
     for p in top_n_pages:
         contents += get_pdf_context(page=p)
@@ -89,6 +90,8 @@ def verify_esg_company_industry(company_name: str, industry: str, soft_matched:
     Returns:
         dict: {"matched_company": str, "matched_industry": str}
     """
+    from agents.gemini_agent import chat_with_gemini, extract_json_from_gemini_output
+
     pdf_language = st.session_state["pdf_language"]
 
     companies_df = get_all_companies()
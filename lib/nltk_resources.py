@@ -0,0 +1,116 @@
+# NLTK 資源管理：所有模組共用同一個資料目錄（repo 內的 nltk_data/），每個 process 只檢查一次
+# - 已存在的資源：只在本機查找，不連網（warm start 完全離線）
+# - 缺少的資源：NLTK_ALLOW_DOWNLOAD=1（預設）時下載到 nltk_data/ 一次；設為 0 則不連網，直接回報缺少（air-gapped 部署）
+# 預先把資源放進 nltk_data/：python lib/nltk_resources.py --download
+import argparse
+import os
+import threading
+import zipfile
+
+NLTK_DATA_DIR = os.environ.get(
+    "NLTK_DATA_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "nltk_data"))
+)
+NLTK_ALLOW_DOWNLOAD = os.environ.get("NLTK_ALLOW_DOWNLOAD", "1") != "0"
+
+# 套件名稱 → nltk.data.find 需要的完整路徑（只用套件名稱查找一定找不到）
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+    "brown": "corpora/brown",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+    "averaged_perceptron_tagger_eng": "taggers/averaged_perceptron_tagger_eng",
+}
+
+_status = {}  # 套件名稱 → 找到的路徑（None 表示缺少）
+_status_lock = threading.Lock()
+_path_configured = False
+
+def _configure_data_path():
+    global _path_configured
+    import nltk
+    if not _path_configured:
+        # bundled 目錄優先，避免先掃過其他位置
+        if NLTK_DATA_DIR in nltk.data.path:
+            nltk.data.path.remove(NLTK_DATA_DIR)
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+        _path_configured = True
+    return nltk
+
+def _repair_partial_bundle(package):
+    """
+    bundled 目錄中只解壓了一部分的資源（例如 averaged_perceptron_tagger_eng/ 缺少 weights.json）：
+    nltk 會優先使用目錄而找不到檔案，這裡從同名的 .zip 補齊（離線）
+    """
+    resource_dir = os.path.join(NLTK_DATA_DIR, *NLTK_RESOURCES[package].split("/"))
+    zip_path = f"{resource_dir}.zip"
+    if not (os.path.isdir(resource_dir) and os.path.isfile(zip_path)):
+        return
+    with zipfile.ZipFile(zip_path) as zf:
+        parent = os.path.dirname(resource_dir)
+        missing = [name for name in zf.namelist() if not name.endswith("/") and not os.path.exists(os.path.join(parent, name))]
+        if missing:
+            print(f"📦 Unpacking {len(missing)} missing file(s) of NLTK resource '{package}' from {zip_path}")
+            zf.extractall(parent, members=missing)
+
+def _find(nltk, package):
+    resource = NLTK_RESOURCES[package]
+    # zip 包裝的資源（例如 taggers/averaged_perceptron_tagger.zip）也要能找到
+    for name in [resource, f"{resource}.zip"]:
+        try:
+            return str(nltk.data.find(name))
+        except LookupError:
+            continue
+    return None
+
+def ensure_nltk_resources(*packages):
+    """
+    確認 NLTK 資源可用；每個套件在每個 process 只檢查（必要時下載）一次
+
+    Args:
+        *packages (str): NLTK_RESOURCES 的 key（例如 "punkt_tab", "stopwords"）
+
+    Returns:
+        list[str]: 仍然缺少的套件
+    """
+    with _status_lock:
+        nltk = _configure_data_path()
+        missing = []
+        for package in packages:
+            if package not in _status:
+                _repair_partial_bundle(package)
+                path = _find(nltk, package)
+                if path is None and NLTK_ALLOW_DOWNLOAD:
+                    print(f"⬇️ Downloading NLTK resource '{package}' to {NLTK_DATA_DIR}")
+                    os.makedirs(NLTK_DATA_DIR, exist_ok=True)
+                    if nltk.download(package, download_dir=NLTK_DATA_DIR, quiet=True, raise_on_error=False):
+                        path = _find(nltk, package)
+                if path is None:
+                    print(f"⚠️ NLTK resource '{package}' is not available (looked in {NLTK_DATA_DIR})")
+                _status[package] = path
+            if _status[package] is None:
+                missing.append(package)
+        return missing
+
+def get_nltk_resource_status():
+    """這個 process 已檢查過的資源與找到的路徑"""
+    return dict(_status)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check / pre-download NLTK resources into the bundled nltk_data directory")
+    parser.add_argument("packages", nargs="*", default=list(NLTK_RESOURCES), help="Packages to check (default: all)")
+    parser.add_argument("--download", action="store_true", help="Download missing packages into the bundled directory")
+    args = parser.parse_args()
+
+    global NLTK_ALLOW_DOWNLOAD
+    NLTK_ALLOW_DOWNLOAD = args.download
+    missing = ensure_nltk_resources(*args.packages)
+    for package in args.packages:
+        path = _status.get(package)
+        print(f"{'✅' if path else '❌'} {package:<32} {path or 'missing'}")
+    if missing:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# 不依賴 Streamlit 的 PDF 文字擷取（上傳頁面與批次匯入共用；可在 worker process 中執行）
+import re
+
+# --- 基礎清理 ---
+def clean_text(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'-\s+', '', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    return text.strip()
+
+# --- 檢測語言 (中文/英文) ---
+def detect_text_language(text):
+    chinese_chars = sum(1 for c in text if '\u4e00' <= c <= '\u9fff')
+    english_chars = sum(1 for c in text if c.isascii() and c.isalpha())
+
+    if chinese_chars > english_chars:
+        return "chinese"
+    elif english_chars > chinese_chars:
+        return "english"
+    else:
+        return "unknown"
+
+def sample_pdf_text(doc, max_pages=10):
+    """取前 max_pages 頁的原始文字，用於語言偵測與 metadata 擷取"""
+    sample_text = ""
+    for page_number, page in enumerate(doc):
+        if page_number >= max_pages:
+            break
+        try:
+            sample_text += page.get_text()
+        except:
+            continue
+    return sample_text
+
+# --- 擷取單頁內容（文字 + 表格） ---
+def extract_page_content(page, include_tables=True):
+    text = clean_text(page.get_text())
+    if include_tables:
+        for table in page.find_tables():
+            df = table.to_pandas()
+            text += "\nTable:\n" + df.to_string() + "\n"
+    return text
@@ -0,0 +1,323 @@
+# Session 記憶體管理
+# 1. process-wide 共用資源（CKIP 模型等）：所有 session 共用一份，不放在 st.session_state
+# 2. 每個 session 的大型物件（pdf_text、trained_model、對話紀錄...）：估算大小，超過預算時把最久沒用的寫到磁碟
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+SESSION_MEMORY_BUDGET_MB = float(os.environ.get("SESSION_MEMORY_BUDGET_MB", 200))
+SPILL_DIR = os.path.join("db", "session_spill")
+SPILL_TTL_SECONDS = 24 * 60 * 60
+MESSAGES_KEEP_IN_MEMORY = 50  # 對話只保留最近幾則在記憶體，較早的歸檔到磁碟
+
+# 可以寫到磁碟、需要時再載回的 session key（依 LRU 順序挑選）
+SPILLABLE_KEYS = ["pdf_text", "trained_model", "sgns_model", "input_sentences", "passage_index"]
+
+_META_KEY = "_session_resource_meta"
+_SPILLED_MESSAGES_KEY = "_archived_message_count"
+_spill_dirs_pruned = False
+
+# --- 1. process-wide 共用資源 ---
+_shared_resources = {}
+_shared_locks = {}
+_shared_lock = threading.Lock()
+
+def get_shared_resource(name, factory):
+    """
+    取得 process 內共用的資源；第一次使用時呼叫 factory() 建立（同一個 name 只會建立一次，執行緒安全）
+
+    Args:
+        name (str): 資源名稱（例如 "ckip_ws:models/ckip-models/bert-base"）
+        factory (callable): 建立資源的函式
+    """
+    resource = _shared_resources.get(name)
+    if resource is not None:
+        return resource["value"]
+
+    with _shared_lock:
+        lock = _shared_locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _shared_resources:
+            start = time.perf_counter()
+            value = factory()
+            _shared_resources[name] = {
+                "value": value,
+                "loaded_at": time.time(),
+                "load_seconds": time.perf_counter() - start
+            }
+    return _shared_resources[name]["value"]
+
+def has_shared_resource(name):
+    return name in _shared_resources
+
+def release_shared_resource(name):
+    _shared_resources.pop(name, None)
+
+def get_shared_resource_stats():
+    """process-wide 資源的大小與載入時間（debug 頁面用）"""
+    rows = []
+    for name, resource in list(_shared_resources.items()):
+        rows.append({
+            "name": name,
+            "type": type(resource["value"]).__name__,
+            "size_mb": estimate_size(resource["value"]) / 1e6,
+            "load_seconds": round(resource["load_seconds"], 2)
+        })
+    return pd.DataFrame(rows, columns=["name", "type", "size_mb", "load_seconds"])
+
+# --- 大小估算 ---
+def _torch_module_size(obj):
+    size = 0
+    for tensor in list(obj.parameters()) + list(obj.buffers()):
+        size += tensor.nelement() * tensor.element_size()
+    return size
+
+def estimate_size(obj, _seen=None, _depth=0):
+    """
+    估算物件佔用的位元組（近似值）：numpy / pandas / gensim / torch 模型以實際 buffer 計算，
+    容器遞迴累加，其他物件取 sys.getsizeof + __dict__
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, SpilledValue):
+        return sys.getsizeof(obj)
+    if isinstance(obj, np.memmap):
+        return 0  # 檔案映射（例如 model store 的詞向量）：由 OS page cache 管理，所有 session 共用
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=True))
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_size(k, _seen, _depth + 1) + estimate_size(v, _seen, _depth + 1) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(item, _seen, _depth + 1) for item in obj)
+
+    # gensim Word2Vec / KeyedVectors：向量矩陣佔絕大部分
+    if hasattr(obj, "wv") and hasattr(obj.wv, "vectors"):
+        size = estimate_size(obj.wv.vectors, _seen, _depth + 1)
+        for attr in ["syn1neg", "syn1"]:
+            array = getattr(obj, attr, None)
+            if isinstance(array, np.ndarray):
+                size += estimate_size(array, _seen, _depth + 1)
+        return size + estimate_size(obj.wv.index_to_key, _seen, _depth + 1)
+    if hasattr(obj, "vectors") and hasattr(obj, "index_to_key"):
+        return estimate_size(obj.vectors, _seen, _depth + 1) + estimate_size(obj.index_to_key, _seen, _depth + 1)
+
+    # torch 模型（CKIP）：參數 + buffer
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        try:
+            return _torch_module_size(obj)
+        except Exception:
+            pass
+    if hasattr(obj, "model") and hasattr(obj.model, "parameters"):
+        return estimate_size(obj.model, _seen, _depth + 1)
+
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__") and not callable(obj):
+        size += estimate_size(vars(obj), _seen, _depth + 1)
+    return size
+
+# --- 2. 每個 session 的資源 ---
+class SpilledValue:
+    """session_state 中代替已寫到磁碟的值（保持 key 存在，`"pdf_text" in st.session_state` 的判斷不變）"""
+
+    def __init__(self, path, size, type_name):
+        self.path = path
+        self.size = size
+        self.type_name = type_name
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"<spilled {self.type_name} {self.size / 1e6:.1f} MB>"
+
+def _get_session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else "local"
+    except Exception:
+        return "local"
+
+def _session_spill_dir():
+    return os.path.join(SPILL_DIR, _get_session_id())
+
+def _get_meta():
+    return st.session_state.setdefault(_META_KEY, {})
+
+def touch_session_value(key):
+    """記錄最後使用時間（LRU 依據）"""
+    _get_meta().setdefault(key, {})["last_access"] = time.time()
+
+def load_session_value(key, default=None):
+    """
+    讀取 session 值；若已寫到磁碟則載回記憶體
+
+    Returns:
+        session_state[key]（不存在時回傳 default）
+    """
+    value = st.session_state.get(key, default)
+    if isinstance(value, SpilledValue):
+        spilled = value
+        try:
+            with open(spilled.path, "rb") as f:
+                value = pickle.load(f)
+        except Exception as e:
+            print(f"❌ Failed to restore spilled session value '{key}': {e}")
+            st.session_state.pop(key, None)
+            return default
+        st.session_state[key] = value
+        try:
+            os.remove(spilled.path)
+        except OSError:
+            pass
+    if key in st.session_state:
+        touch_session_value(key)
+    return value
+
+def spill_session_value(key):
+    """把 session 值寫到磁碟，session_state 中只留 SpilledValue"""
+    value = st.session_state.get(key)
+    if value is None or isinstance(value, SpilledValue):
+        return 0
+    size = estimate_size(value)
+    os.makedirs(_session_spill_dir(), exist_ok=True)
+    path = os.path.join(_session_spill_dir(), f"{key}.pkl")
+    try:
+        with open(path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"⚠️ Session value '{key}' cannot be spilled to disk: {e}")
+        return 0
+    st.session_state[key] = SpilledValue(path, size, type(value).__name__)
+    return size
+
+def discard_session_value(key):
+    """刪除 session 值（含磁碟暫存）"""
+    value = st.session_state.pop(key, None)
+    _get_meta().pop(key, None)
+    if isinstance(value, SpilledValue):
+        try:
+            os.remove(value.path)
+        except OSError:
+            pass
+
+def _archive_path():
+    return os.path.join(_session_spill_dir(), "messages_archive.pkl")
+
+def archive_old_messages(keep=MESSAGES_KEEP_IN_MEMORY):
+    """較早的對話紀錄歸檔到磁碟，記憶體只保留最近 keep 則"""
+    messages = st.session_state.get("messages", [])
+    if len(messages) <= keep:
+        return 0
+
+    archived = load_archived_messages()
+    old, recent = messages[:-keep], messages[-keep:]
+    os.makedirs(_session_spill_dir(), exist_ok=True)
+    with open(_archive_path(), "wb") as f:
+        pickle.dump(archived + old, f, protocol=pickle.HIGHEST_PROTOCOL)
+    st.session_state.messages = recent
+    st.session_state[_SPILLED_MESSAGES_KEY] = len(archived) + len(old)
+    return estimate_size(old)
+
+def load_archived_messages():
+    path = _archive_path()
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def get_archived_message_count():
+    return st.session_state.get(_SPILLED_MESSAGES_KEY, 0)
+
+def get_session_memory_usage():
+    """
+    目前 session 各 key 的估計大小
+
+    Returns:
+        pd.DataFrame: key, type, size_mb, status（memory / spilled）, last_access
+    """
+    meta = _get_meta()
+    rows = []
+    for key in list(st.session_state.keys()):
+        if key == _META_KEY:
+            continue
+        value = st.session_state[key]
+        spilled = isinstance(value, SpilledValue)
+        size = value.size if spilled else estimate_size(value)
+        meta.setdefault(key, {})["size"] = size
+        rows.append({
+            "key": key,
+            "type": value.type_name if spilled else type(value).__name__,
+            "size_mb": size / 1e6,
+            "status": "spilled" if spilled else "memory",
+            "last_access": meta[key].get("last_access")
+        })
+    df = pd.DataFrame(rows, columns=["key", "type", "size_mb", "status", "last_access"])
+    return df.sort_values("size_mb", ascending=False).reset_index(drop=True)
+
+def enforce_session_budget(budget_mb=SESSION_MEMORY_BUDGET_MB):
+    """
+    每次 rerun 結束時呼叫：超過記憶體預算時，先歸檔舊對話，再依 LRU 把可寫出的大型物件寫到磁碟
+
+    Returns:
+        list[str]: 這次被寫到磁碟的 key
+    """
+    global _spill_dirs_pruned
+    if not _spill_dirs_pruned:
+        prune_stale_spill_dirs()
+        _spill_dirs_pruned = True
+
+    budget = budget_mb * 1e6
+    archive_old_messages()
+
+    usage = get_session_memory_usage()
+    in_memory = usage[usage["status"] == "memory"]
+    total = in_memory["size_mb"].sum() * 1e6
+    if total <= budget:
+        return []
+
+    candidates = in_memory[in_memory["key"].isin(SPILLABLE_KEYS)].copy()
+    candidates["last_access"] = candidates["last_access"].fillna(0)
+    spilled = []
+    for _, row in candidates.sort_values(["last_access", "size_mb"], ascending=[True, False]).iterrows():
+        if total <= budget:
+            break
+        freed = spill_session_value(row["key"])
+        if freed:
+            total -= freed
+            spilled.append(row["key"])
+    if spilled:
+        print(f"🧹 Session over {budget_mb:.0f} MB budget, spilled to disk: {', '.join(spilled)}")
+    return spilled
+
+def clear_session_spill():
+    """刪除本 session 的磁碟暫存"""
+    shutil.rmtree(_session_spill_dir(), ignore_errors=True)
+    st.session_state.pop(_SPILLED_MESSAGES_KEY, None)
+
+def prune_stale_spill_dirs(ttl_seconds=SPILL_TTL_SECONDS):
+    """清掉已結束的 session 留下的暫存（超過 ttl 沒有更新的資料夾）"""
+    if not os.path.isdir(SPILL_DIR):
+        return
+    now = time.time()
+    for name in os.listdir(SPILL_DIR):
+        path = os.path.join(SPILL_DIR, name)
+        if os.path.isdir(path) and now - os.path.getmtime(path) > ttl_seconds:
+            shutil.rmtree(path, ignore_errors=True)
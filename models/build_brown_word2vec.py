@@ -0,0 +1,23 @@
+# build_brown_word2vec.py
+# 預先訓練 Brown corpus 的 CBOW / Skip-gram 向量（存成 .npy，app 以 mmap 載入）
+# 用法：python models/build_brown_word2vec.py [--workers 4] [--force]
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from qa_utils.Word2vec.pretrained import build_brown_models, BROWN_VARIANTS
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-train Brown corpus Word2Vec vectors (CBOW + Skip-gram)")
+    parser.add_argument("--variant", choices=["all", *BROWN_VARIANTS.values()], default="all", help="Which model to build")
+    parser.add_argument("--workers", type=int, default=4, help="Word2Vec worker threads")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the model already exists")
+    args = parser.parse_args()
+
+    variants = [sg for sg, name in BROWN_VARIANTS.items() if args.variant in ("all", name)]
+    build_brown_models(variants=variants, workers=args.workers, force=args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# build_esg_word2vec.py
+# 以整個 ESG 報告庫（esg_reports.db）離線訓練 ESG 領域 Word2Vec，每次執行存成新版本
+# 有新報告時重跑即可（只以新報告增量訓練）；--full 則以全部報告從頭訓練
+# 用法：python models/build_esg_word2vec.py [--workers 4] [--full] [--ckip local|hf|none]
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from qa_utils.Word2vec.esg_embedding import train_esg_embedding, get_esg_manifest, ESG_PARAMS
+
+def main():
+    parser = argparse.ArgumentParser(description="Train / incrementally update the ESG-domain Word2Vec model from the whole report archive")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Word2Vec worker threads")
+    parser.add_argument("--full", action="store_true", help="Retrain from scratch instead of updating the current version")
+    parser.add_argument("--ckip", choices=["local", "hf", "none"], default="local", help="CKIP segmenter for Chinese reports ('none' skips them for now)")
+    for name, value in ESG_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value, help=f"Full-training parameter (default: {value})")
+    parser.add_argument("--list", action="store_true", help="List trained versions and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        manifest = get_esg_manifest()
+        for meta in manifest["versions"]:
+            marker = "*" if meta["version"] == manifest["current"] else " "
+            print(f"{marker} {meta['version']}  {meta['mode']:<11} reports={meta['reports']:<5} vocab={meta['vocab_size']:<7} trained_tokens={meta['tokens']}")
+        return
+
+    ws_driver = None
+    if args.ckip != "none":
+        try:
+            from pdf_context import get_ckip_ws_driver
+            ws_driver = get_ckip_ws_driver(local=args.ckip == "local")
+        except Exception as e:
+            print(f"⚠️ CKIP segmenter unavailable ({e}); Chinese reports will be skipped for now")
+
+    def progress(done, total, report_id):
+        print(f"📄 Corpus {done}/{total} (report {report_id})", end="\r" if done < total else "\n")
+
+    params = {name: getattr(args, name) for name in ESG_PARAMS}
+    train_esg_embedding(workers=args.workers, full=args.full, ws_driver=ws_driver, params=params, progress=progress)
+
+if __name__ == "__main__":
+    main()
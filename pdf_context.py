@@ -1,39 +1,43 @@
 import streamlit as st
 import re
 import os
-import nltk
-from nltk import word_tokenize
 import time
-from qa_utils.ckip_word_segmenter_local import LocalCkipWordSegmenter
+from lib.pdf_text import clean_text, detect_text_language, sample_pdf_text, extract_page_content
+from lib.session_resources import get_shared_resource, has_shared_resource, load_session_value
+from lib.nltk_resources import ensure_nltk_resources
 
-# --- 統一 NLTK 資料目錄為 Cloud 可用路徑 ---
-nltk_data_path = "/home/appuser/nltk_data"
-os.makedirs(nltk_data_path, exist_ok=True)
-nltk.data.path.append(nltk_data_path)
+# nltk（~1 秒）與 CKIP / transformers / torch 都在第一次用到時才 import，不拖慢 app 啟動
+# NLTK 資料統一由 lib/nltk_resources.py 管理（repo 內的 nltk_data/）
 
-# --- 確保 nltk 必要資源 ---
-nltk_packages = ['punkt', 'punkt_tab', 'stopwords', 'averaged_perceptron_tagger', 'averaged_perceptron_tagger_eng']
-for pkg in nltk_packages:
-    try:
-        nltk.data.find(pkg)
-    except LookupError:
-        print(f"Downloading NLTK resource: {pkg}")
-        nltk.download(pkg, download_dir=nltk_data_path, quiet=True)
+# --- CKIP word segmenter：整個 process 共用一份模型 (延遲初始化) ---
+CKIP_WS_LOCAL_MODEL_PATH = "models/ckip-models/bert-base"
+CKIP_WS_HF_MODEL_PATH = "ckiplab/bert-base-chinese-ws"
+
+def _ckip_ws_resource_name(local=False):
+    return f"ckip_ws:{CKIP_WS_LOCAL_MODEL_PATH if local else CKIP_WS_HF_MODEL_PATH}"
+
+def get_ckip_ws_driver(local=False):
+    """不經過 session_state，背景工作也可以直接使用"""
+    model_path = CKIP_WS_LOCAL_MODEL_PATH if local else CKIP_WS_HF_MODEL_PATH
+
+    def load_driver():
+        from qa_utils.ckip_word_segmenter_local import LocalCkipWordSegmenter
+        return LocalCkipWordSegmenter(model_path=model_path)
+
+    return get_shared_resource(_ckip_ws_resource_name(local), load_driver)
 
-# --- 本地載入 CKIP word segmenter (延遲初始化) ---
 def lazy_init_ckip_ws_driver(local=False):
-    if "ckip_ws_driver" not in st.session_state:
+    if not has_shared_resource(_ckip_ws_resource_name(local)):
         if local:
             with st.spinner("🔄 Loading local CKIP word segmenter..."):
 
                 # from ckip_transformers.nlp import CkipWordSegmenter, CkipPosTagger, CkipNerChunker
-                # st.session_state.ckip_ws_driver = CkipWordSegmenter(model="bert-base")
+                # ws_driver = CkipWordSegmenter(model="bert-base")
 
                 # 使用本地模型載入 CKIP Word Segmenter
-                st.session_state.ckip_ws_driver = LocalCkipWordSegmenter(model_path="models/ckip-models/bert-base")
+                ws_driver = get_ckip_ws_driver(local=True)
 
                 # Debug message
-                # ws_driver = st.session_state.ckip_ws_driver
                 # # 印 tokenizer 資訊
                 # print(f"Tokenizer vocab size: {len(ws_driver.tokenizer.vocab)}")
                 # print(f"Tokenizer special tokens: {ws_driver.tokenizer.special_tokens_map}")
@@ -46,8 +50,9 @@ def lazy_init_ckip_ws_driver(local=False):
                 st.success("✅ Local CKIP WS loaded successfully!")
         else:
             with st.spinner("🔄 Loading Huggging Face CKIP model..."):
-                st.session_state.ckip_ws_driver = LocalCkipWordSegmenter(model_path="ckiplab/bert-base-chinese-ws")
+                get_ckip_ws_driver(local=False)
                 st.success("✅ Huggingface CKIP WS loaded successfully!")
+    return get_ckip_ws_driver(local=local)
 
 # --- 停用詞表 (自定義 ESG report) ---
 def load_pdf_stopwords():
@@ -72,46 +77,23 @@ def load_chinese_stopwords(filepath='lib/chinese_stopwords.txt'):
 
 # --- 停用詞表 (English) ---
 def load_english_stopwords():
-    # --- 讀取英文停用詞 ---
+    # --- 讀取英文停用詞（缺少 NLTK stopwords 時回傳空集合） ---
+    if ensure_nltk_resources("stopwords"):
+        return set()
     from nltk.corpus import stopwords
     english_stopwords = set(stopwords.words('english'))
     return english_stopwords
 
-# --- 基礎清理 ---
-def clean_text(text):
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'-\s+', '', text)
-    text = re.sub(r'<[^>]+>', '', text)
-    return text.strip()
-
 # --- 檢測語言 (中文/英文) ---
 def detect_pdf_language(doc, max_pages=10):
     if not doc:
         return "unknown"
-
-    sample_text = ""
-    for page_number, page in enumerate(doc):
-        if page_number >= max_pages:
-            break
-        try:
-            sample_text += page.get_text()
-        except:
-            continue
-
-    chinese_chars = sum(1 for c in sample_text if '\u4e00' <= c <= '\u9fff')
-    english_chars = sum(1 for c in sample_text if c.isascii() and c.isalpha())
-
-    if chinese_chars > english_chars:
-        return "chinese"
-    elif english_chars > chinese_chars:
-        return "english"
-    else:
-        return "unknown"
+    return detect_text_language(sample_pdf_text(doc, max_pages=max_pages))
 
 # --- 中文專用 Preprocessing ---
-def preprocess_chinese_text(text):
-    lazy_init_ckip_ws_driver()
-    ws_driver = st.session_state.ckip_ws_driver
+def preprocess_chinese_text(text, ws_driver=None):
+    if ws_driver is None:
+        ws_driver = get_ckip_ws_driver()
 
     start_time = time.time()
 
@@ -154,7 +136,11 @@ def preprocess_english_text(text):
     text = re.sub(r'\s+', ' ', text).strip().lower()  # 去多餘空白並轉小寫
 
     # --- 分詞 ---
-    tokens = word_tokenize(text)
+    if ensure_nltk_resources("punkt_tab"):
+        tokens = text.split()  # 沒有 punkt 時：text 已只剩英文字母與空白，直接以空白切詞
+    else:
+        from nltk import word_tokenize
+        tokens = word_tokenize(text)
 
     # --- 停用詞 ---
     pdf_stopwords = load_pdf_stopwords()
@@ -194,12 +180,7 @@ def extract_text_by_page(doc, max_pages=40, skip_pages=[]):
             continue
 
         try:
-            text = clean_text(page.get_text())
-
-            tables = page.find_tables()
-            for table in tables:
-                df = table.to_pandas()
-                text += "\nTable:\n" + df.to_string() + "\n"
+            text = extract_page_content(page)
 
             print(f"Text length in page {page_number+1}: {len(text)}")
 
@@ -234,10 +215,12 @@ def extract_text_by_page(doc, max_pages=40, skip_pages=[]):
 def get_pdf_context(page="all") -> str:
     if "pdf_text" not in st.session_state:
         return ""
+    # pdf_text 可能因記憶體預算被暫存到磁碟，需要時再載回
+    pdf_pages = load_session_value("pdf_text", [])
 
     # 取得 PDF 指定頁數
     if page != "all":
-        for p in st.session_state["pdf_text"]:
+        for p in pdf_pages:
             if p["page"] == page:
                 content = p["content"]
                 if p["content"] in ["", None, "None", "none"]:
@@ -247,7 +230,7 @@ def get_pdf_context(page="all") -> str:
 
     # 取得 PDF 全文
     result = []
-    for p in st.session_state["pdf_text"]:
+    for p in pdf_pages:
         content = p["content"]
         if content in ["", None, "None", "none"]:
             content = "No contents have been extracted."
@@ -258,11 +241,12 @@ def get_pdf_context(page="all") -> str:
     return "\n\n".join(result)
 
 # --- PDF預處理（自動分中文/英文）---
-def preprocess_pdf_sentences(raw_text, tokenize=True):
+def preprocess_pdf_sentences(raw_text, tokenize=True, language=None, ws_driver=None):
     if not raw_text or not isinstance(raw_text, str):
         return []
 
-    language = st.session_state.get("pdf_language", "auto")
+    if language is None:
+        language = st.session_state.get("pdf_language", "auto")
     results = []
 
     page_paragraphs = raw_text.split("\n\n")
@@ -273,7 +257,7 @@ def preprocess_pdf_sentences(raw_text, tokenize=True):
             continue
 
         if language == "chinese":
-            tokens = preprocess_chinese_text(cleaned)
+            tokens = preprocess_chinese_text(cleaned, ws_driver=ws_driver)
             if tokens:
                 results.append(" ".join(tokens))
         else:
@@ -1,23 +1,20 @@
 import streamlit as st
-import nltk
 import pandas as pd
+from datetime import datetime
 import plotly.express as px
-from gensim.models import Word2Vec
-from gensim.utils import simple_preprocess
-from sklearn.decomposition import PCA
-from nltk.corpus import stopwords
+from gensim.models.callbacks import CallbackAny2Vec
 from pdf_context import preprocess_pdf_sentences
 from ui_utils.ui_utils import display_pretty_table
-
-# --- 確保 nltk 資料齊全 ---
-nltk_packages = ['punkt', 'brown', 'stopwords']
-for pkg in nltk_packages:
-    try:
-        nltk.data.find(f'corpora/{pkg}' if pkg != 'punkt' else f'tokenizers/{pkg}')
-    except LookupError:
-        nltk.download(pkg, quiet=True)
-
-EN_STOPWORDS = set(stopwords.words('english'))
+from ui_utils.job_section import render_job_status
+from tools.job_queue import submit_job
+from lib.session_resources import load_session_value
+from lib.nltk_resources import ensure_nltk_resources
+from qa_utils.Word2vec.model_store import find_registered_model, get_or_train_keyed_vectors, list_registered_models, load_keyed_vectors
+from qa_utils.Word2vec.corpus import TokenizedCorpus
+from qa_utils.Word2vec.pretrained import BrownCorpus, get_brown_meta, load_brown_keyed_vectors, matches_brown_params
+from qa_utils.Word2vec.esg_embedding import get_esg_model_meta, load_esg_keyed_vectors
+from qa_utils.Word2vec.similarity import get_similarity_index
+from qa_utils.Word2vec.projection import get_projection
 
 def init_session_state():
     defaults = {
@@ -29,50 +26,64 @@ def init_session_state():
         "user_sentences": "",
         "query_word": "",
         "trained_model": None,  # ⭐️ 加這個
+        "word2vec_job_id": None,
     }
     for key, value in defaults.items():
         st.session_state.setdefault(key, value)
 
-def clean_and_tokenize(sentences):
-    tokenized = []
-    for sentence in sentences:
-        if sentence.strip():
-            tokens = simple_preprocess(sentence)
-            filtered = [word for word in tokens if word not in EN_STOPWORDS]
-            if filtered:
-                tokenized.append(filtered)
-    return tokenized
-
-def train_word2vec(tokenized_sentences):
-    model = Word2Vec(
-        vector_size=st.session_state.vector_size,
-        window=st.session_state.window_size,
-        min_count=st.session_state.min_count,
-        workers=st.session_state.workers,
-        sg=st.session_state.sg
-    )
+def get_training_params():
+    return {
+        "vector_size": st.session_state.vector_size,
+        "window": st.session_state.window_size,
+        "min_count": st.session_state.min_count,
+        "workers": st.session_state.workers,
+        "sg": st.session_state.sg
+    }
 
-    model.build_vocab(tokenized_sentences)
-    if len(model.wv) == 0:
-        st.error(f"❌ Vocabulary is empty after applying Min Word Count = {st.session_state.min_count}.")
-        st.info("🔔 Try lowering 'Min Word Count' or adding more input sentences.")
-        st.stop()
+class JobProgressCallback(CallbackAny2Vec):
+    """每個 epoch 結束時回報進度；工作被取消時 context.report 會丟出 JobCancelled 中止訓練"""
+
+    def __init__(self, context):
+        self.context = context
+        self.epochs = 1
+        self.epoch = 0
+
+    def on_train_begin(self, model):
+        self.epochs = model.epochs
+
+    def on_epoch_end(self, model):
+        self.epoch += 1
+        self.context.report(self.epoch / self.epochs, f"Epoch {self.epoch}/{self.epochs}", force=True)
 
-    model.train(tokenized_sentences, total_examples=len(tokenized_sentences), epochs=model.epochs)
-    return model
+def run_word2vec_training(context, tokenized_sentences, params, source=None):
+    """
+    背景工作：訓練 Word2Vec（相同語料 + 參數已訓練過時直接從 model store 載入），並以 epoch 回報進度
 
-def plot_embeddings(model, query_words):
-    vectors, labels = [], []
-    for word in query_words:
-        if word in model.wv:
-            vectors.append(model.wv[word])
-            labels.append(word)
+    Returns:
+        KeyedVectors: 以 mmap 載入的詞向量
+    """
+    context.report(0.0, "Building vocabulary...", force=True)
+    params = dict(params)
+    workers = params.pop("workers", 4)
+    kv, cached = get_or_train_keyed_vectors(
+        tokenized_sentences, params, workers=workers, callbacks=[JobProgressCallback(context)], source=source
+    )
+    if cached:
+        context.report(1.0, "Loaded cached model", force=True)
+    return kv
+
+def plot_embeddings(kv, query_words):
+    labels = [word for word in query_words if word in kv]
 
-    if len(vectors) < 2:
+    if len(labels) < 2:
         st.warning("⚠️ Not enough words found in vocabulary for plotting.")
         return
+    if len(kv) < 3 or kv.vector_size < 3:
+        st.warning("⚠️ Not enough words in the model to perform PCA.")
+        return
 
-    reduced = PCA(n_components=2).fit_transform(vectors)
+    # 整個模型的 PCA 座標只算一次（快取），這裡只取查詢詞的那幾列
+    reduced = get_projection(kv)[[kv.key_to_index[word] for word in labels]]
 
     df = pd.DataFrame({
         'X': reduced[:, 0],
@@ -98,6 +109,46 @@ def plot_embeddings(model, query_words):
     fig.update_traces(marker=dict(size=10))  # 點點大一點
     st.plotly_chart(fig, use_container_width=True)
 
+def render_embedding_registry():
+    """列出 embedding registry 中所有 session 訓練過的模型，選一個以 mmap 載入（不需要重新訓練）"""
+    registered = list_registered_models()
+    if not registered:
+        return
+
+    with st.expander(f"🗂️ Embedding Registry ({len(registered)} trained models)", expanded=False):
+        df = pd.DataFrame([{
+            "Corpus": record["source"] or "-",
+            "Algorithm": "Skip-Gram" if record["params"].get("sg") else "CBOW",
+            "Vector Size": record["params"].get("vector_size"),
+            "Window": record["params"].get("window"),
+            "Min Count": record["params"].get("min_count"),
+            "Vocabulary": record["vocab_size"],
+            "Sentences": record["sentences"],
+            "Tokens": record["tokens"],
+            "Train Time (s)": record["train_seconds"],
+            "Size (MB)": round((record["size_bytes"] or 0) / 1e6, 1),
+            "Trained At": datetime.fromtimestamp(record["created_at"]).strftime("%Y-%m-%d %H:%M")
+        } for record in registered])
+        display_pretty_table(df)
+
+        labels = {
+            record["model_key"]: (
+                f"{record['source'] or '-'} | {'Skip-Gram' if record['params'].get('sg') else 'CBOW'} | "
+                f"dim {record['params'].get('vector_size')}, window {record['params'].get('window')}, "
+                f"min count {record['params'].get('min_count')} | {record['vocab_size']} words"
+            )
+            for record in registered
+        }
+        selected_key = st.selectbox("Choose a trained model:", options=list(labels), format_func=labels.get)
+        if st.button("📂 Load Selected Embedding"):
+            kv = load_keyed_vectors(selected_key)
+            if kv is None:
+                st.error("❌ This model is no longer on disk. Please train it again.")
+            else:
+                st.session_state.trained_model = kv
+                st.session_state.word2vec_job_id = None
+                st.success(f"✅ Loaded **{labels[selected_key]}** from the embedding registry!")
+
 def run(sentences=None, source="manual"):
     st.markdown("---")
 
@@ -111,18 +162,24 @@ def run(sentences=None, source="manual"):
             st.error("❌ No PDF sentences loaded.")
             st.stop()
     elif source == "manual":
-        if sentences:
-            processed_sentences = sentences
-        else:
-            processed_sentences = [" ".join(sent) for sent in nltk.corpus.brown.sents()]
+        # 沒有輸入句子時使用 Brown corpus：優先使用預訓練向量，需要重新訓練時才串流斷詞
+        processed_sentences = sentences or None
     else:
         st.error(f"❌ Unknown source '{source}'.")
         st.stop()
+    brown_mode = processed_sentences is None
 
-    tokenized_preview = clean_and_tokenize(processed_sentences)
-    total_sentences = len(tokenized_preview)
-    total_tokens = sum(len(tokens) for tokens in tokenized_preview)
-    st.info(f"📚 Prepared **{total_sentences}** tokenized sentences, total **{total_tokens}** tokens.")
+    if brown_mode:
+        brown_meta = get_brown_meta()
+        if brown_meta:
+            st.info(f"📚 Default `Brown` corpus: **{brown_meta['sentences']}** tokenized sentences, total **{brown_meta['tokens']}** tokens.")
+        else:
+            st.info("📚 Default `Brown` corpus. 💡 Run `python models/build_brown_word2vec.py` once to skip training for the default settings.")
+    else:
+        # 串流斷詞一次算出統計（與去重用的 hash）；訓練時 gensim 直接迭代同一個物件，不會產生整份 token list
+        corpus = TokenizedCorpus(processed_sentences)
+        corpus_stats = corpus.stats()
+        st.info(f"📚 Prepared **{corpus_stats['sentences']}** tokenized sentences, total **{corpus_stats['tokens']}** tokens, **{corpus_stats['vocab_size']}** unique words.")
 
     st.markdown("---")
     st.subheader("🧠 CBOW and Skip-Gram Word2Vec Trainer")
@@ -135,48 +192,109 @@ def run(sentences=None, source="manual"):
         model_type = st.radio("Training Algorithm", ["Skip-Gram", "CBOW"], index=0)
         st.session_state.sg = 1 if model_type == "Skip-Gram" else 0
 
-    if st.button("🚀 Train Word2Vec Model"):
-        tokenized_sentences = clean_and_tokenize(processed_sentences)
+    # Brown + 預設參數：直接使用預訓練向量（mmap，所有 session 共用），不需要訓練
+    pretrained_kv = None
+    if brown_mode and matches_brown_params(get_training_params()):
+        pretrained_kv = load_brown_keyed_vectors(st.session_state.sg)
+        if pretrained_kv is not None and st.session_state.get("trained_model") is None:
+            st.session_state.trained_model = pretrained_kv
+            st.session_state.word2vec_job_id = None
 
-        if not tokenized_sentences:
+    train_clicked = st.button("🚀 Train Word2Vec Model")
+    if train_clicked and pretrained_kv is not None:
+        st.session_state.trained_model = pretrained_kv
+        st.session_state.word2vec_job_id = None
+        st.success(f"⚡ Loaded pretrained **{model_type}** vectors for the default `Brown` corpus!")
+    elif train_clicked:
+        params = get_training_params()
+        if not brown_mode and corpus_stats["sentences"] == 0:
             st.error("❌ No valid tokenized sentences found after preprocessing.")
             st.stop()
 
-        model = train_word2vec(tokenized_sentences)
-
-        st.session_state.trained_model = model  # save model to session state
+        # 相同語料 + 參數已經在 embedding registry 裡（任何 session 訓練的都算）：直接 mmap 載入，不送出訓練工作
+        if brown_mode:
+            registered_key = find_registered_model(params, source="brown")
+        else:
+            registered_key = find_registered_model(params, corpus_digest=corpus_stats["digest"])
+        registered_kv = load_keyed_vectors(registered_key) if registered_key else None
 
-        if source == "pdf":
-            st.success("✅ Model trained successfully from **PDF content**!")
-        elif sentences:
-            st.success("✅ Model trained successfully from **manual input**!")
+        if registered_kv is not None:
+            st.session_state.trained_model = registered_kv
+            st.session_state.word2vec_job_id = None
+            st.success("♻️ This corpus was already trained with the same settings. Loaded the vectors from the **embedding registry**!")
         else:
-            st.success("✅ Model trained successfully from **default `Brown` corpus**!")
+            if brown_mode:
+                if ensure_nltk_resources("brown"):
+                    st.error("❌ NLTK Brown corpus is not available. Please enter sentences, or run `python lib/nltk_resources.py brown --download`.")
+                    st.stop()
+                corpus = BrownCorpus()
+                corpus_key = "brown"  # 固定語料，不必在 UI thread 先掃一次（hash 在背景工作中計算）
+            else:
+                corpus_key = corpus_stats["digest"]
+
+            job_source = "pdf" if source == "pdf" else ("manual" if sentences else "brown")
+            # 以句子內容 + 參數去重：同樣的設定重按不會重新訓練（訓練過的模型也會從 model store 直接載入）
+            st.session_state.word2vec_job_id = submit_job(
+                "word2vec_training",
+                run_word2vec_training,
+                kwargs={"tokenized_sentences": corpus, "params": params, "source": job_source},
+                dedup_payload={"corpus": corpus_key, "params": params},
+                label="🧠 Word2Vec training"
+            )
+            st.session_state.word2vec_job_source = job_source
+
+    # 以整個報告庫離線訓練的 ESG 向量（models/build_esg_word2vec.py）
+    esg_meta = get_esg_model_meta()
+    if esg_meta and st.button(f"📦 Use ESG archive embedding ({esg_meta['version']}, {esg_meta['reports']} reports)"):
+        st.session_state.trained_model = load_esg_keyed_vectors(esg_meta["version"])
+        st.session_state.word2vec_job_id = None
+        st.success(f"✅ Loaded ESG embedding **{esg_meta['version']}** ({esg_meta['vocab_size']} words)!")
+
+    render_embedding_registry()
+
+    job_id = st.session_state.get("word2vec_job_id")
+    if job_id:
+        job = render_job_status(job_id, title="🧠 Training Word2Vec...")
+        if job and job["status"] == "succeeded" and job.get("has_result"):
+            st.session_state.trained_model = job["result"]  # save model to session state
+            st.session_state.word2vec_job_id = None
+
+            job_source = st.session_state.get("word2vec_job_source")
+            if job_source == "pdf":
+                st.success("✅ Model trained successfully from **PDF content**!")
+            elif job_source == "manual":
+                st.success("✅ Model trained successfully from **manual input**!")
+            else:
+                st.success("✅ Model trained successfully from **default `Brown` corpus**!")
+        elif job and job["status"] == "failed" and "Vocabulary is empty" in (job["error"] or ""):
+            st.info("🔔 Try lowering 'Min Word Count' or adding more input sentences.")
 
     st.markdown("---")
 
     # --- 🔥 查詢模式 ---
-    model = st.session_state.get("trained_model", None)
+    kv = load_session_value("trained_model")  # KeyedVectors（mmap）
 
-    if model:
+    if kv:
         with st.expander("🔍 Query Word", expanded=True):
-            if model.wv.index_to_key:
+            if kv.index_to_key:
                 st.session_state.query_word = st.selectbox(
                     "Choose a word to find similar words:",
-                    options=model.wv.index_to_key
+                    options=kv.index_to_key
                 )
 
-                if st.session_state.query_word in model.wv:
+                # 正規化矩陣 + 結果 cache：同一個模型只建立一次，視覺化按鈕不會再掃一次詞彙表
+                similarity_index = get_similarity_index(kv)
+                similar_words = similarity_index.most_similar(st.session_state.query_word, topn=5)
+
+                if st.session_state.query_word in kv:
                     st.markdown(f"### 🔥 Similar Words to `{st.session_state.query_word}`:")
-                    similar_words = model.wv.most_similar(st.session_state.query_word, topn=5)
                     df = pd.DataFrame(similar_words, columns=["Word", "Similarity"]).reset_index(drop=True)
                     display_pretty_table(df)
 
                 if st.button("🔎 Show Embedding Visualization"):
-                    sample_words = [st.session_state.query_word] + [word for word, _ in model.wv.most_similar(st.session_state.query_word, topn=5)]
-                    plot_embeddings(model, sample_words)
+                    sample_words = [st.session_state.query_word] + [word for word, _ in similar_words]
+                    plot_embeddings(kv, sample_words)
             else:
                 st.warning("⚠️ No words available in the model vocabulary.")
     else:
         st.warning("⚠️ No trained model found. Please train the model first.")
-
@@ -0,0 +1,77 @@
+# Word2Vec 語料前處理：simple_preprocess 斷詞 + 英文停用詞過濾（cbow_skipgram 與預訓練模型共用）
+import hashlib
+
+from gensim.utils import simple_preprocess
+from pdf_context import load_english_stopwords
+
+_en_stopwords = None
+
+def get_en_stopwords():
+    global _en_stopwords
+    if _en_stopwords is None:
+        _en_stopwords = load_english_stopwords()
+    return _en_stopwords
+
+def tokenize_sentence(sentence, stopwords=None):
+    """Returns: list[str]（沒有有效詞時為空 list）"""
+    stopwords = get_en_stopwords() if stopwords is None else stopwords
+    return [word for word in simple_preprocess(sentence) if word not in stopwords]
+
+def clean_and_tokenize(sentences):
+    en_stopwords = get_en_stopwords()
+    tokenized = []
+    for sentence in sentences:
+        if sentence.strip():
+            filtered = tokenize_sentence(sentence, en_stopwords)
+            if filtered:
+                tokenized.append(filtered)
+    return tokenized
+
+class TokenizedCorpus:
+    """
+    可重複迭代的斷詞語料：每次迭代時才逐句斷詞，不會在記憶體中保留整份 token list
+    （gensim 每個 epoch 重新迭代一次；語料大時以 CPU 換記憶體）
+
+    Args:
+        sentences: 原始句子（str）的 list 或可重複迭代的物件
+        stopwords (set | None): None 時使用英文停用詞
+    """
+
+    def __init__(self, sentences, stopwords=None):
+        self.sentences = sentences
+        self.stopwords = stopwords
+        self._stats = None
+
+    def __iter__(self):
+        stopwords = get_en_stopwords() if self.stopwords is None else self.stopwords
+        for sentence in self.sentences:
+            if sentence.strip():
+                tokens = tokenize_sentence(sentence, stopwords)
+                if tokens:
+                    yield tokens
+
+    def stats(self):
+        """
+        單次串流計算（結果會保留，之後不再掃語料）
+
+        Returns:
+            dict: {"digest": str, "sentences": int, "tokens": int, "vocab_size": int}
+        """
+        if self._stats is None:
+            # digest 與 model_store.corpus_hash 的格式相同，model store 可直接使用
+            digest = hashlib.sha256()
+            sentences = tokens = 0
+            vocab = set()
+            for sentence in self:
+                digest.update(" ".join(sentence).encode("utf-8"))
+                digest.update(b"\n")
+                sentences += 1
+                tokens += len(sentence)
+                vocab.update(sentence)
+            self._stats = {"digest": digest.hexdigest(), "sentences": sentences, "tokens": tokens, "vocab_size": len(vocab)}
+        return self._stats
+
+    def fingerprint(self):
+        """同 model_store.corpus_hash 的回傳值：(hash, {"sentences", "tokens"})"""
+        stats = self.stats()
+        return stats["digest"], {"sentences": stats["sentences"], "tokens": stats["tokens"]}
@@ -0,0 +1,155 @@
+# ESG 報告庫的 Word2Vec 語料：每份報告斷詞一次，存成 LineSentence 格式（一行一句、以空白分隔）的文字檔，
+# 檔名是報告的 content_hash；訓練時逐檔串流讀取，記憶體用量與報告數量無關，而且可以重複迭代（每個 epoch 重讀一次）
+# - 中文句子：CKIP 斷詞（沒有 CKIP 時略過中文，之後有 CKIP 再跑一次就會補上）
+# - 英文段落：與 PDF 上傳相同的英文前處理；中英混合的報告兩種語言都會進到同一個詞彙表
+# 語料檔放在以斷詞設定（tokenizer_key）命名的子資料夾：缺少 NLTK 資源時斷出的語料不同，資源補齊後會重新斷詞
+import hashlib
+import json
+import os
+import re
+
+from gensim.models.word2vec import LineSentence
+
+from lib.pdf_text import detect_text_language
+from db_utils.report_search import split_report_pages
+
+ESG_CORPUS_DIR = os.path.join("models", "word2vec", "esg", "corpus")
+CKIP_MAX_CHARS = 400  # CKIP 每段最多 512 個 token，超過會被截斷
+CORPUS_FORMAT_VERSION = 1  # 斷詞規則改變時遞增，舊的語料檔就不再使用
+
+_zh_sentence_end_re = re.compile(r"(?<=[。！？；\n])")
+
+def tokenizer_config():
+    """影響斷詞結果的設定：英文停用詞與分詞都取決於 NLTK 資源是否可用"""
+    from lib.nltk_resources import ensure_nltk_resources
+
+    return {
+        "format": CORPUS_FORMAT_VERSION,
+        "nltk_stopwords": not ensure_nltk_resources("stopwords"),
+        "nltk_punkt_tab": not ensure_nltk_resources("punkt_tab"),
+    }
+
+def tokenizer_key():
+    raw = json.dumps(tokenizer_config(), sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+def corpus_path(content_hash):
+    return os.path.join(ESG_CORPUS_DIR, tokenizer_key(), f"{content_hash}.txt")
+
+def _split_chinese_sentences(text):
+    """依句尾標點切句，再把短句併成不超過 CKIP_MAX_CHARS 的片段（減少 CKIP 呼叫次數）"""
+    chunks, current = [], ""
+    for sentence in _zh_sentence_end_re.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        while len(sentence) > CKIP_MAX_CHARS:
+            chunks.append(sentence[:CKIP_MAX_CHARS])
+            sentence = sentence[CKIP_MAX_CHARS:]
+        if current and len(current) + len(sentence) > CKIP_MAX_CHARS:
+            chunks.append(current)
+            current = ""
+        current += sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def tokenize_report(content, ws_driver=None):
+    """
+    將一份報告全文斷詞成句子
+
+    Args:
+        content (str): ESG_Report 全文（各頁以 "\\n\\n" 串接）
+        ws_driver: CKIP word segmenter；None 時略過中文段落
+
+    Returns:
+        tuple[list[list[str]], int]: (斷詞後的句子, 因為沒有 CKIP 而略過的中文段落數)
+    """
+    from pdf_context import preprocess_chinese_text, preprocess_english_text
+
+    sentences, skipped = [], 0
+    for _, page in split_report_pages(content):
+        page = re.sub(r"\[Page\s*\d+\]:\s*", "", page).strip()
+        if not page:
+            continue
+        if detect_text_language(page) == "chinese":
+            if ws_driver is None:
+                skipped += 1
+                continue
+            for chunk in _split_chinese_sentences(page):
+                tokens = preprocess_chinese_text(chunk, ws_driver=ws_driver)
+                if tokens:
+                    sentences.append(tokens)
+        else:
+            tokens = preprocess_english_text(page)
+            if tokens:
+                sentences.append(tokens)
+    return sentences, skipped
+
+def write_corpus_file(content_hash, sentences):
+    """寫到暫存檔再 rename，中斷不會留下只寫了一半的語料"""
+    path = corpus_path(content_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        for tokens in sentences:
+            f.write(" ".join(tokens))
+            f.write("\n")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def prepare_report_corpus(report_hashes=None, ws_driver=None, progress=None):
+    """
+    為還沒斷詞過的報告建立語料檔（已存在的直接沿用）
+
+    Args:
+        report_hashes (list[tuple] | None): [(report_id, content_hash), ...]；None 表示整個報告庫
+        ws_driver: CKIP word segmenter（None 時只處理英文；含中文的報告不建檔，之後再補）
+        progress (callable | None): progress(done, total, report_id)
+
+    Returns:
+        list[str]: 語料檔已就緒的 content_hash（依 report_id 排序）
+    """
+    from db_utils.esg_report_db_utils import get_esg_report_hashes, read_esg_report_content
+
+    if report_hashes is None:
+        report_hashes = get_esg_report_hashes()
+
+    ready = []
+    for done, (report_id, content_hash) in enumerate(report_hashes, start=1):
+        if content_hash in ready:
+            continue
+        if not os.path.exists(corpus_path(content_hash)):
+            sentences, skipped = tokenize_report(read_esg_report_content(report_id) or "", ws_driver=ws_driver)
+            if skipped:
+                print(f"⚠️ Report {report_id}: {skipped} Chinese page(s) need CKIP; skipped until a segmenter is available")
+                if progress:
+                    progress(done, len(report_hashes), report_id)
+                continue
+            write_corpus_file(content_hash, sentences)
+        ready.append(content_hash)
+        if progress:
+            progress(done, len(report_hashes), report_id)
+    return ready
+
+class EsgArchiveCorpus:
+    """
+    多份報告語料檔的串流 iterator（LineSentence 逐行讀取），可重複迭代，gensim 每個 epoch 都會重新讀檔
+
+    Args:
+        content_hashes (list[str]): 要包含的報告
+    """
+
+    def __init__(self, content_hashes):
+        self.content_hashes = list(content_hashes)
+
+    def __iter__(self):
+        for content_hash in self.content_hashes:
+            yield from LineSentence(corpus_path(content_hash))
+
+    def stats(self):
+        """Returns: {"sentences": int, "tokens": int}（逐行計算，不載入整個語料）"""
+        sentences = tokens = 0
+        for sentence in self:
+            sentences += 1
+            tokens += len(sentence)
+        return {"sentences": sentences, "tokens": tokens}
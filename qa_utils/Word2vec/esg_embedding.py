@@ -0,0 +1,170 @@
+# ESG 領域 Word2Vec：以整個報告庫（ESG_Report）離線訓練，每次訓練存成一個新版本
+# - 第一次 / --full：從頭訓練
+# - 之後：只把新報告餵給上一版模型（build_vocab(update=True) + train），不用重跑整個報告庫
+# 每個版本存完整模型（word2vec.model，增量訓練用）與 vectors.kv（.npy，app 以 mmap 載入）
+# 用法：python models/build_esg_word2vec.py
+import json
+import os
+import shutil
+import time
+
+from gensim.models import KeyedVectors, Word2Vec
+
+from lib.session_resources import get_shared_resource
+from qa_utils.Word2vec.esg_corpus import EsgArchiveCorpus, prepare_report_corpus, tokenizer_key
+
+ESG_MODEL_DIR = os.path.join("models", "word2vec", "esg")
+ESG_PARAMS = {"vector_size": 200, "window": 5, "min_count": 3, "sg": 1, "epochs": 5}
+
+_MODEL_FILE = "word2vec.model"
+_KV_FILE = "vectors.kv"
+_META_FILE = "meta.json"
+
+_manifest_cache = (None, None)  # ((st_mtime_ns, st_size), manifest)
+
+def _manifest_path():
+    return os.path.join(ESG_MODEL_DIR, "manifest.json")
+
+def _version_dir(version):
+    return os.path.join(ESG_MODEL_DIR, "versions", version)
+
+def get_esg_manifest():
+    """
+    manifest 含每一版的 report hash 列表，每次 render 都會用到：依檔案 mtime / 大小快取在記憶體，檔案改變才重讀
+
+    Returns:
+        dict: {"current": str | None, "versions": [meta, ...]}（舊 → 新）；共用的快取物件，請勿修改
+    """
+    global _manifest_cache
+    path = _manifest_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"current": None, "versions": []}
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached_stamp, manifest = _manifest_cache
+    if cached_stamp == stamp:
+        return manifest
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"current": None, "versions": []}
+    _manifest_cache = (stamp, manifest)
+    return manifest
+
+def _write_manifest(manifest):
+    os.makedirs(ESG_MODEL_DIR, exist_ok=True)
+    path = _manifest_path()
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+def get_esg_model_meta(version=None):
+    """Returns: dict | None（version=None 表示目前版本）"""
+    manifest = get_esg_manifest()
+    version = version or manifest["current"]
+    return next((meta for meta in manifest["versions"] if meta["version"] == version), None)
+
+def load_esg_keyed_vectors(version=None):
+    """
+    ESG 向量（process 內共用、mmap 載入）
+
+    Returns:
+        KeyedVectors | None: 尚未訓練過時為 None
+    """
+    meta = get_esg_model_meta(version)
+    if meta is None:
+        return None
+    path = os.path.join(_version_dir(meta["version"]), _KV_FILE)
+    return get_shared_resource(f"esg_w2v:{meta['version']}", lambda: KeyedVectors.load(path, mmap="r"))
+
+def _save_version(model, meta):
+    """寫入暫存資料夾再 rename，最後才更新 manifest（讀取端只會看到完整的版本）"""
+    target_dir = _version_dir(meta["version"])
+    tmp_dir = f"{target_dir}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    model.save(os.path.join(tmp_dir, _MODEL_FILE))
+    model.wv.save(os.path.join(tmp_dir, _KV_FILE), sep_limit=0)
+    with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_dir, target_dir)
+
+    manifest = get_esg_manifest()
+    _write_manifest({"current": meta["version"], "versions": manifest["versions"] + [meta]})
+
+def train_esg_embedding(workers=4, full=False, ws_driver=None, params=None, progress=None):
+    """
+    以報告庫訓練（或增量更新）ESG 向量並存成新版本
+
+    Args:
+        workers (int): Word2Vec worker threads
+        full (bool): 忽略上一版，以全部報告從頭訓練
+        ws_driver: CKIP word segmenter（None 時含中文的報告會先略過）
+        params (dict | None): 覆寫 ESG_PARAMS（只在從頭訓練時有效；增量訓練沿用上一版的參數）
+        progress (callable | None): progress(done, total, report_id)，語料準備進度
+
+    Returns:
+        dict | None: 新版本的 meta；沒有新報告時為 None
+    """
+    content_hashes = prepare_report_corpus(ws_driver=ws_driver, progress=progress)
+    base = None if full else get_esg_model_meta()
+    if base is not None and base.get("tokenizer") != tokenizer_key():
+        # 上一版的語料以不同的斷詞設定產生（例如當時缺少 NLTK 停用詞），不能只補新報告
+        print(f"⚠️ Tokenizer settings changed since {base['version']}; retraining from scratch")
+        base = None
+
+    if base is None:
+        mode, new_hashes = "full", content_hashes
+    else:
+        trained = set(base["report_hashes"])
+        mode, new_hashes = "incremental", [h for h in content_hashes if h not in trained]
+
+    if not new_hashes:
+        print("✅ ESG embedding is up to date (no new reports)")
+        return None
+
+    corpus = EsgArchiveCorpus(new_hashes)
+    stats = corpus.stats()
+    if stats["tokens"] == 0:
+        print("⚠️ New reports contain no tokens; nothing to train")
+        return None
+
+    start = time.perf_counter()
+    if mode == "full":
+        params = {**ESG_PARAMS, **(params or {})}
+        print(f"🧠 Training ESG embedding from {len(new_hashes)} report(s) ({stats['sentences']} sentences, {stats['tokens']} tokens)...")
+        model = Word2Vec(workers=workers, **params)
+        model.build_vocab(corpus)
+        if len(model.wv) == 0:
+            raise ValueError(f"Vocabulary is empty after applying min_count = {params['min_count']}.")
+        report_hashes = new_hashes
+    else:
+        params = base["params"]
+        print(f"🔁 Updating {base['version']} with {len(new_hashes)} new report(s) ({stats['sentences']} sentences, {stats['tokens']} tokens)...")
+        model = Word2Vec.load(os.path.join(_version_dir(base["version"]), _MODEL_FILE))
+        model.workers = workers
+        model.build_vocab(corpus, update=True)
+        report_hashes = base["report_hashes"] + new_hashes
+
+    model.train(corpus, total_examples=model.corpus_count, epochs=model.epochs)
+
+    manifest = get_esg_manifest()
+    meta = {
+        "version": f"v{len(manifest['versions']) + 1:04d}",
+        "base_version": base["version"] if base else None,
+        "mode": mode,
+        "params": params,
+        "reports": len(report_hashes),
+        "new_reports": len(new_hashes),
+        "vocab_size": len(model.wv),
+        "train_seconds": round(time.perf_counter() - start, 2),
+        "created_at": time.time(),
+        "report_hashes": report_hashes,
+        "tokenizer": tokenizer_key(),
+        **stats
+    }
+    _save_version(model, meta)
+    print(f"✅ Saved ESG embedding {meta['version']} ({meta['vocab_size']} words) in {meta['train_seconds']}s")
+    return meta
@@ -0,0 +1,322 @@
+# Word2Vec 模型快取：以「斷詞後語料 + 訓練參數」的 hash 為 key，把 KeyedVectors 存成 .npy，
+# 之後以 mmap='r' 載入（毫秒級，而且所有 session 共用同一份 page cache），不用每次 rerun 重新訓練
+# 磁碟上超過上限時依最後使用時間（LRU）刪除
+# 每個存檔的模型也登記在 embedding registry（db/embeddings.db）：所有 session 都能列出並載入，訓練前可先查詢
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from gensim.models import KeyedVectors, Word2Vec
+
+from db_utils.embedding_db_utils import delete_embeddings, find_embedding, list_embeddings, touch_embedding, upsert_embedding
+
+MODEL_STORE_DIR = os.path.join("db", "word2vec_models")
+MODEL_STORE_MAX_MB = float(os.environ.get("WORD2VEC_STORE_MAX_MB", 500))
+MODEL_STORE_MAX_MODELS = int(os.environ.get("WORD2VEC_STORE_MAX_MODELS", 50))
+LOADED_MODELS_MAX = 8  # process 內保留的已載入模型數
+TOUCH_INTERVAL_SECONDS = 60  # last_used_at 最多每分鐘寫一次
+
+# 影響向量結果的參數（workers 只影響速度，不列入 key）
+KEY_PARAMS = ("vector_size", "window", "min_count", "sg", "epochs")
+DEFAULT_PARAMS = {"vector_size": 100, "window": 5, "min_count": 1, "sg": 0, "epochs": 5}
+
+_KV_FILE = "vectors.kv"
+_META_FILE = "meta.json"
+
+_loaded = OrderedDict()  # key → KeyedVectors（mmap）
+_store_lock = threading.RLock()
+_registry_synced = False
+
+def normalize_params(params):
+    """補上預設值，只留下會影響結果的參數"""
+    merged = {**DEFAULT_PARAMS, **(params or {})}
+    return {name: int(merged[name]) for name in KEY_PARAMS}
+
+def corpus_hash(tokenized_sentences):
+    """
+    斷詞後語料的 sha256（逐句串流計算，不需要把語料組成一個大字串）
+
+    Returns:
+        tuple[str, dict]: (hash, {"sentences": int, "tokens": int})
+    """
+    fingerprint = getattr(tokenized_sentences, "fingerprint", None)
+    if fingerprint is not None:
+        return fingerprint()  # TokenizedCorpus：串流統計時已經算過
+
+    digest = hashlib.sha256()
+    sentences = tokens = 0
+    for sentence in tokenized_sentences:
+        digest.update(" ".join(sentence).encode("utf-8"))
+        digest.update(b"\n")
+        sentences += 1
+        tokens += len(sentence)
+    return digest.hexdigest(), {"sentences": sentences, "tokens": tokens}
+
+def model_key(corpus_digest, params):
+    payload = json.dumps({"corpus": corpus_digest, "params": normalize_params(params)}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+def _model_dir(key):
+    return os.path.join(MODEL_STORE_DIR, key)
+
+def _read_meta(key):
+    try:
+        with open(os.path.join(_model_dir(key), _META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_meta(directory, meta):
+    path = os.path.join(directory, _META_FILE)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(f"{path}.tmp", path)
+
+def _touch(key, meta):
+    now = time.time()
+    if now - meta.get("last_used_at", 0) >= TOUCH_INTERVAL_SECONDS:
+        meta["last_used_at"] = now
+        try:
+            _write_meta(_model_dir(key), meta)
+        except OSError:
+            pass
+        try:
+            touch_embedding(key, now)
+        except sqlite3.Error:
+            pass
+
+def _register(key, meta):
+    """登記到 embedding registry；目錄表寫入失敗不影響模型本身（之後 sync_registry 會補上）"""
+    try:
+        upsert_embedding({
+            **meta,
+            "model_key": key,
+            "params": meta.get("params") or {},
+            "size_bytes": _dir_size(_model_dir(key)),
+            "path": _model_dir(key)
+        })
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not register Word2Vec model {key}: {e}")
+
+def _unregister(keys):
+    try:
+        delete_embeddings(keys)
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not remove Word2Vec model(s) from the registry: {e}")
+
+def _remember(key, kv):
+    _loaded[key] = kv
+    _loaded.move_to_end(key)
+    while len(_loaded) > LOADED_MODELS_MAX:
+        _loaded.popitem(last=False)
+
+def load_keyed_vectors(key):
+    """
+    以 mmap='r' 載入已存的向量；不存在時回傳 None
+
+    Returns:
+        KeyedVectors | None
+    """
+    with _store_lock:
+        if key in _loaded:
+            _loaded.move_to_end(key)
+            meta = _read_meta(key)
+            if meta:
+                _touch(key, meta)
+                return _loaded[key]
+            _loaded.pop(key)  # 已被其他 process 刪除
+
+        meta = _read_meta(key)
+        if meta is None:
+            return None
+        try:
+            kv = KeyedVectors.load(os.path.join(_model_dir(key), _KV_FILE), mmap="r")
+        except (OSError, ValueError, EOFError) as e:
+            print(f"⚠️ Word2Vec model {key} is unreadable, removing it: {e}")
+            shutil.rmtree(_model_dir(key), ignore_errors=True)
+            _unregister([key])
+            return None
+        _touch(key, meta)
+        _remember(key, kv)
+        return kv
+
+def save_keyed_vectors(key, kv, meta=None):
+    """
+    存成 vectors.kv + vectors.kv.vectors.npy（sep_limit=0：所有陣列都獨立存成 .npy 才能 mmap），
+    寫入暫存資料夾後再 rename，中斷不會留下半個模型
+
+    Returns:
+        KeyedVectors: 以 mmap 重新載入的向量
+    """
+    os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=MODEL_STORE_DIR)
+    try:
+        kv.save(os.path.join(tmp_dir, _KV_FILE), sep_limit=0)
+        now = time.time()
+        meta = {
+            **(meta or {}),
+            "key": key,
+            "vocab_size": len(kv.index_to_key),
+            "vector_size": int(kv.vector_size),
+            "created_at": now,
+            "last_used_at": now
+        }
+        _write_meta(tmp_dir, meta)
+        with _store_lock:
+            target = _model_dir(key)
+            if os.path.isdir(target):
+                shutil.rmtree(tmp_dir, ignore_errors=True)  # 其他工作已經存了同一個模型
+            else:
+                os.replace(tmp_dir, target)
+                _register(key, meta)
+            _loaded.pop(key, None)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    evict_models(keep=key)
+    return load_keyed_vectors(key)
+
+def train_word2vec(tokenized_sentences, vector_size=100, window=5, min_count=1, workers=4, sg=1, epochs=5, callbacks=()):
+    model = Word2Vec(
+        vector_size=vector_size,
+        window=window,
+        min_count=min_count,
+        workers=workers,
+        sg=sg,
+        epochs=epochs
+    )
+
+    model.build_vocab(tokenized_sentences)
+    if len(model.wv) == 0:
+        raise ValueError(f"Vocabulary is empty after applying Min Word Count = {min_count}.")
+
+    model.train(tokenized_sentences, total_examples=model.corpus_count, epochs=model.epochs, callbacks=list(callbacks))
+    return model
+
+def get_or_train_keyed_vectors(tokenized_sentences, params=None, workers=4, callbacks=(), source=None):
+    """
+    相同語料 + 參數已訓練過就直接載入，否則訓練後存檔
+
+    Args:
+        tokenized_sentences (list[list[str]]): 斷詞後的句子（可重複迭代）
+        params (dict): vector_size / window / min_count / sg / epochs（其他 key 會被忽略）
+        source (str): 語料來源（'brown' / 'manual' / 'pdf'，存在 meta 與 registry 裡）
+
+    Returns:
+        tuple[KeyedVectors, bool]: (向量, 是否來自快取)
+    """
+    digest, stats = corpus_hash(tokenized_sentences)
+    params = normalize_params(params)
+    key = model_key(digest, params)
+
+    kv = load_keyed_vectors(key)
+    if kv is not None:
+        return kv, True
+
+    start = time.perf_counter()
+    model = train_word2vec(tokenized_sentences, workers=workers, callbacks=callbacks, **params)
+    meta = {
+        "corpus_hash": digest,
+        "params": params,
+        "source": source,
+        "train_seconds": round(time.perf_counter() - start, 3),
+        **stats
+    }
+    return save_keyed_vectors(key, model.wv, meta), False
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def list_stored_models():
+    """磁碟上的模型（最近使用的在前）"""
+    if not os.path.isdir(MODEL_STORE_DIR):
+        return []
+    models = []
+    for key in os.listdir(MODEL_STORE_DIR):
+        if key.startswith("."):
+            continue
+        meta = _read_meta(key)
+        if meta is not None:
+            models.append({**meta, "key": key, "size_bytes": _dir_size(_model_dir(key))})
+    return sorted(models, key=lambda m: m.get("last_used_at", 0), reverse=True)
+
+def evict_models(max_mb=MODEL_STORE_MAX_MB, max_models=MODEL_STORE_MAX_MODELS, keep=None):
+    """
+    超過容量 / 數量上限時刪除最久沒用的模型
+
+    Returns:
+        list[str]: 被刪除的 key
+    """
+    with _store_lock:
+        models = list_stored_models()
+        total = sum(m["size_bytes"] for m in models)
+        evicted = []
+        for model in reversed(models):  # 最久沒用的先刪
+            if total <= max_mb * 1e6 and len(models) - len(evicted) <= max_models:
+                break
+            if model["key"] == keep:
+                continue
+            shutil.rmtree(_model_dir(model["key"]), ignore_errors=True)
+            _loaded.pop(model["key"], None)
+            total -= model["size_bytes"]
+            evicted.append(model["key"])
+        if evicted:
+            _unregister(evicted)
+            print(f"🧹 Evicted {len(evicted)} Word2Vec model(s) from {MODEL_STORE_DIR}")
+        return evicted
+
+def sync_registry():
+    """
+    以磁碟上的模型重建 registry：補登記 registry 建立前（或寫入失敗時）存的模型，刪除資料夾已不存在的項目
+
+    Returns:
+        tuple[int, int]: (登記的模型數, 刪除的項目數)
+    """
+    global _registry_synced
+    with _store_lock:
+        models = list_stored_models()
+        for model in models:
+            _register(model["key"], model)
+        on_disk = {model["key"] for model in models}
+        stale = [record["model_key"] for record in list_embeddings() if record["model_key"] not in on_disk]
+        _unregister(stale)
+        _registry_synced = True
+        return len(models), len(stale)
+
+def list_registered_models():
+    """
+    registry 中的模型（最近使用的在前）；process 內第一次呼叫時先與磁碟同步
+
+    Returns:
+        list[dict]: Embedding 資料表的欄位（params 已解析成 dict）
+    """
+    if not _registry_synced:
+        sync_registry()
+    return [record for record in list_embeddings() if os.path.isdir(record["path"])]
+
+def find_registered_model(params, corpus_digest=None, source=None):
+    """
+    訓練前先查 registry：相同語料（hash，或固定語料的來源名稱）+ 參數已經訓練過就回傳它的 key
+
+    Returns:
+        str | None
+    """
+    if not _registry_synced:
+        sync_registry()
+    record = find_embedding(normalize_params(params), corpus_hash=corpus_digest, source=source)
+    if record is None or not os.path.isdir(record["path"]):
+        return None
+    return record["model_key"]
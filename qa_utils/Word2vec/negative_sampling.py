@@ -0,0 +1,385 @@
+# Skip-gram with Negative Sampling（SGNS）的 NumPy 實作：教學用，但以向量化方式訓練，不是逐詞的 Python 迴圈
+# - 負樣本：unigram^0.75 的累積分佈表，以 searchsorted 一次抽整個 minibatch
+# - (center, context) pair：整個語料攤平成一個 int array，每個 window offset 一次產生所有 pair（dynamic window + 高頻詞 subsampling）
+# - 更新：每個 minibatch 一次計算所有梯度，排序後以 reduceat 分組寫回（同一個詞在 batch 中出現多次時梯度會累加）
+# - workers > 1：Hogwild（多個 process 共用 shared memory 的權重矩陣、不加鎖）
+# Benchmark（與 gensim 比較）：python test/bench_sgns.py
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from collections import Counter
+
+SGNS_DEFAULTS = {
+    "vector_size": 100,
+    "window": 5,
+    "negative": 5,
+    "min_count": 1,
+    "epochs": 5,
+    "batch_size": 1024,
+    "alpha": 0.025,
+    "min_alpha": 0.0001,
+    "sample": 1e-3,
+    "ns_exponent": 0.75,
+    "workers": 1,
+    "seed": 1,
+}
+
+# --- 1. 詞彙表 / 負樣本分佈 ---
+def build_vocab(tokenized_sentences, min_count=1):
+    """
+    Returns:
+        tuple[list[str], np.ndarray]: (依詞頻排序的詞, 對應的次數)
+    """
+    counts = Counter(word for sentence in tokenized_sentences for word in sentence)
+    vocab = sorted((word for word, count in counts.items() if count >= min_count), key=lambda word: (-counts[word], word))
+    return vocab, np.array([counts[word] for word in vocab], dtype=np.int64)
+
+def build_negative_table(counts, ns_exponent=0.75):
+    """unigram^0.75 的累積分佈（抽樣：np.searchsorted(table, uniform)）"""
+    weights = np.power(counts.astype(np.float64), ns_exponent)
+    table = np.cumsum(weights)
+    return table / table[-1]
+
+def sample_negatives(table, shape, rng):
+    return np.searchsorted(table, rng.random(shape)).astype(np.int32)
+
+def keep_probabilities(counts, sample=1e-3):
+    """word2vec 的高頻詞 subsampling：每個詞被保留的機率（sample=0 表示不做）"""
+    if not sample:
+        return None
+    frequency = counts / counts.sum()
+    return np.minimum(1.0, (np.sqrt(frequency / sample) + 1) * sample / frequency)
+
+def encode_corpus(tokenized_sentences, key_to_index):
+    """
+    語料攤平成 (tokens, sentence_ids) 兩個 int32 array（不在詞彙表中的詞略過）
+    """
+    tokens, sentence_ids = [], []
+    for sentence_id, sentence in enumerate(tokenized_sentences):
+        indices = [key_to_index[word] for word in sentence if word in key_to_index]
+        tokens.extend(indices)
+        sentence_ids.extend([sentence_id] * len(indices))
+    return np.array(tokens, dtype=np.int32), np.array(sentence_ids, dtype=np.int32)
+
+# --- 2. (center, context) pairs ---
+def generate_pairs(tokens, sentence_ids, window, keep_prob, rng):
+    """
+    一個 epoch 的所有 skip-gram pair（已打亂）。每個 center 的 window 在 1..window 之間隨機縮小（同 word2vec），
+    同一句內距離 <= 該 center 的 window 的詞才算 context
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (centers, contexts)
+    """
+    if keep_prob is not None:
+        mask = rng.random(len(tokens)) < keep_prob[tokens]
+        tokens, sentence_ids = tokens[mask], sentence_ids[mask]
+
+    reduced_window = rng.integers(1, window + 1, size=len(tokens))
+    centers, contexts = [], []
+    for offset in range(1, window + 1):
+        if offset >= len(tokens):
+            break
+        same_sentence = sentence_ids[:-offset] == sentence_ids[offset:]
+        forward = same_sentence & (offset <= reduced_window[:-offset])   # center 在左、context 在右
+        backward = same_sentence & (offset <= reduced_window[offset:])   # center 在右、context 在左
+        centers.extend([tokens[:-offset][forward], tokens[offset:][backward]])
+        contexts.extend([tokens[offset:][forward], tokens[:-offset][backward]])
+
+    if not centers:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+    centers, contexts = np.concatenate(centers), np.concatenate(contexts)
+    order = rng.permutation(len(centers))
+    return centers[order], contexts[order]
+
+# --- 3. minibatch 更新 ---
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -20, 20)))
+
+def scatter_add(matrix, indices, updates):
+    """
+    matrix[indices] += updates，重複的 index 會累加（同 np.add.at，但先排序再以 reduceat 分組加總，快約 3 倍）
+    """
+    order = np.argsort(indices, kind="stable")
+    sorted_indices = indices[order]
+    starts = np.flatnonzero(np.r_[True, sorted_indices[1:] != sorted_indices[:-1]])
+    matrix[sorted_indices[starts]] += np.add.reduceat(updates[order], starts, axis=0)
+
+def sgd_step(w_in, w_out, centers, contexts, negatives, lr):
+    """
+    一個 minibatch 的 SGNS 更新（in-place）
+
+    loss = -log σ(u_o·v_c) - Σ_k log σ(-u_k·v_c)
+
+    Returns:
+        float: batch 的 loss 總和
+    """
+    v = w_in[centers]           # (B, d)
+    u_pos = w_out[contexts]     # (B, d)
+    u_neg = w_out[negatives]    # (B, K, d)
+
+    pos = _sigmoid(np.einsum("bd,bd->b", v, u_pos))
+    neg = _sigmoid(np.einsum("bkd,bd->bk", u_neg, v))
+    g_pos = (pos - 1.0)[:, None]  # ∂loss/∂(u_o·v_c)
+    g_neg = neg                   # ∂loss/∂(u_k·v_c)
+
+    grad_v = g_pos * u_pos + np.einsum("bk,bkd->bd", g_neg, u_neg)
+    # context 與負樣本都更新 w_out，合併成一次 scatter
+    out_indices = np.concatenate([contexts, negatives.ravel()])
+    out_updates = np.concatenate([g_pos * v, (g_neg[..., None] * v[:, None, :]).reshape(-1, v.shape[1])])
+    scatter_add(w_out, out_indices, -lr * out_updates)
+    scatter_add(w_in, centers, -lr * grad_v)
+
+    return float(-np.log(pos + 1e-7).sum() - np.log(1.0 - neg + 1e-7).sum())
+
+def train_epochs(w_in, w_out, tokens, sentence_ids, table, keep_prob, params, rng, progress=None):
+    """
+    在 (tokens, sentence_ids) 上訓練 params["epochs"] 個 epoch；learning rate 由 alpha 線性降到 min_alpha
+
+    Args:
+        progress (callable | None): progress(fraction) → 回傳 False 時停止
+
+    Returns:
+        tuple[list[float], int]: (每個 epoch 的平均 pair loss, 總 pair 數)
+    """
+    epochs, batch_size = params["epochs"], params["batch_size"]
+    alpha, min_alpha = params["alpha"], params["min_alpha"]
+    losses, total_pairs = [], 0
+    for epoch in range(epochs):
+        centers, contexts = generate_pairs(tokens, sentence_ids, params["window"], keep_prob, rng)
+        epoch_loss = 0.0
+        for start in range(0, len(centers), batch_size):
+            done = (epoch + start / max(len(centers), 1)) / epochs
+            lr = alpha - (alpha - min_alpha) * done
+            batch_centers = centers[start:start + batch_size]
+            negatives = sample_negatives(table, (len(batch_centers), params["negative"]), rng)
+            epoch_loss += sgd_step(w_in, w_out, batch_centers, contexts[start:start + batch_size], negatives, lr)
+            if progress is not None and progress(done) is False:
+                return losses, total_pairs
+        total_pairs += len(centers)
+        losses.append(epoch_loss / max(len(centers), 1))
+    return losses, total_pairs
+
+# --- 4. Hogwild（多 process 共用權重，不加鎖）---
+def _hogwild_worker(shm_names, shape, tokens, sentence_ids, table, keep_prob, params, seed, progress_array, slot):
+    from multiprocessing import shared_memory
+    shm_in, shm_out = (shared_memory.SharedMemory(name=name) for name in shm_names)
+    try:
+        w_in = np.ndarray(shape, dtype=np.float32, buffer=shm_in.buf)
+        w_out = np.ndarray(shape, dtype=np.float32, buffer=shm_out.buf)
+
+        def progress(fraction):
+            progress_array[slot] = fraction
+
+        losses, pairs = train_epochs(w_in, w_out, tokens, sentence_ids, table, keep_prob, params, np.random.default_rng(seed), progress)
+        progress_array[slot] = 1.0
+        return losses, pairs
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+def _hogwild_entry(queue, *args):
+    queue.put(_hogwild_worker(*args))
+
+def _split_shards(tokens, sentence_ids, workers):
+    """依句子邊界把語料切成 workers 份（每份 token 數大致相同）"""
+    cut_points = [0]
+    for k in range(1, workers):
+        target = k * len(tokens) // workers
+        # 往後找到下一個句子的開頭
+        while target < len(tokens) and target > 0 and sentence_ids[target] == sentence_ids[target - 1]:
+            target += 1
+        cut_points.append(max(target, cut_points[-1]))
+    cut_points.append(len(tokens))
+    return [(tokens[a:b], sentence_ids[a:b]) for a, b in zip(cut_points, cut_points[1:]) if b > a]
+
+def _train_hogwild(w_in, w_out, tokens, sentence_ids, table, keep_prob, params, progress=None):
+    import multiprocessing as mp
+    from multiprocessing import shared_memory
+
+    ctx = mp.get_context("spawn")  # Streamlit 有多個 thread，不使用 fork
+    shards = _split_shards(tokens, sentence_ids, params["workers"])
+    shms = [shared_memory.SharedMemory(create=True, size=w.nbytes) for w in (w_in, w_out)]
+    processes = []
+    try:
+        shared = [np.ndarray(w.shape, dtype=np.float32, buffer=shm.buf) for w, shm in zip((w_in, w_out), shms)]
+        shared[0][:] = w_in
+        shared[1][:] = w_out
+        progress_array = ctx.Array("d", len(shards), lock=False)
+        queue = ctx.Queue()
+        for slot, (shard_tokens, shard_sentences) in enumerate(shards):
+            process = ctx.Process(
+                target=_hogwild_entry,
+                args=(queue, [shm.name for shm in shms], w_in.shape, shard_tokens, shard_sentences,
+                      table, keep_prob, params, params["seed"] + slot, progress_array, slot),
+                daemon=True
+            )
+            process.start()
+            processes.append(process)
+
+        results = []
+        while len(results) < len(processes):
+            try:
+                results.append(queue.get(timeout=0.5))
+            except Exception:
+                if not any(p.is_alive() for p in processes) and queue.empty():
+                    raise RuntimeError("Hogwild worker exited unexpectedly")
+            if progress is not None:
+                progress(sum(progress_array) / len(shards))  # 可能丟出 JobCancelled，finally 會結束 worker
+
+        w_in[:] = shared[0]
+        w_out[:] = shared[1]
+        # 各 worker 的 loss 以 pair 數加權平均
+        total_pairs = sum(pairs for _, pairs in results)
+        epochs = min(len(losses) for losses, _ in results)
+        losses = [
+            sum(worker_losses[e] * pairs for worker_losses, pairs in results) / max(total_pairs, 1)
+            for e in range(epochs)
+        ]
+        return losses, total_pairs
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join(timeout=1)
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+# --- 5. 對外介面 ---
+def train_sgns(tokenized_sentences, progress=None, **params):
+    """
+    以 NumPy SGNS 訓練詞向量
+
+    Args:
+        tokenized_sentences: 斷詞後的句子（list[list[str]] 或 TokenizedCorpus 等可重複迭代的物件；會迭代兩次）
+        progress (callable | None): progress(fraction)，0~1
+        **params: 覆寫 SGNS_DEFAULTS（vector_size, window, negative, epochs, batch_size, workers, ...）
+
+    Returns:
+        dict: {"kv": KeyedVectors, "losses": list[float], "pairs": int, "seconds": float, "params": dict}
+    """
+    from gensim.models import KeyedVectors
+
+    params = {**SGNS_DEFAULTS, **params}
+    vocab, counts = build_vocab(tokenized_sentences, params["min_count"])
+    if not vocab:
+        raise ValueError(f"Vocabulary is empty after applying Min Word Count = {params['min_count']}.")
+
+    tokens, sentence_ids = encode_corpus(tokenized_sentences, {word: i for i, word in enumerate(vocab)})
+    table = build_negative_table(counts, params["ns_exponent"])
+    keep_prob = keep_probabilities(counts, params["sample"])
+
+    rng = np.random.default_rng(params["seed"])
+    dim = params["vector_size"]
+    w_in = ((rng.random((len(vocab), dim), dtype=np.float32) - 0.5) / dim).astype(np.float32)
+    w_out = np.zeros((len(vocab), dim), dtype=np.float32)
+
+    start = time.perf_counter()
+    if params["workers"] > 1:
+        losses, pairs = _train_hogwild(w_in, w_out, tokens, sentence_ids, table, keep_prob, params, progress)
+    else:
+        losses, pairs = train_epochs(w_in, w_out, tokens, sentence_ids, table, keep_prob, params, rng, progress)
+    seconds = time.perf_counter() - start
+
+    kv = KeyedVectors(vector_size=dim, dtype=np.float32)
+    kv.add_vectors(vocab, w_in)
+    for word, count in zip(vocab, counts):
+        kv.set_vecattr(word, "count", int(count))
+    return {"kv": kv, "losses": losses, "pairs": pairs, "seconds": seconds, "params": params}
+
+def run_sgns_training(context, tokenized_sentences, params):
+    """背景工作：訓練 NumPy SGNS 並回報進度"""
+    context.report(0.0, "Sampling pairs...", force=True)
+
+    def progress(fraction):
+        context.report(fraction, f"{fraction * 100:.0f}% of {params['epochs']} epoch(s)")
+
+    return train_sgns(tokenized_sentences, progress=progress, **params)
+
+# --- 6. Streamlit UI（流程同 cbow_skipgram.run）---
+def run(sentences=None, source="manual"):
+    from pdf_context import preprocess_pdf_sentences
+    from lib.nltk_resources import ensure_nltk_resources
+    from lib.session_resources import load_session_value
+    from tools.job_queue import submit_job
+    from ui_utils.job_section import render_job_status
+    from ui_utils.ui_utils import display_pretty_table
+    from qa_utils.Word2vec.corpus import TokenizedCorpus
+    from qa_utils.Word2vec.pretrained import BrownCorpus
+    from qa_utils.Word2vec.similarity import get_similarity_index
+    from qa_utils.Word2vec.cbow_skipgram import plot_embeddings
+
+    st.markdown("---")
+    st.subheader("🎯 Skip-gram with Negative Sampling (NumPy)")
+    st.caption(
+        "For each (center, context) pair the model raises σ(u_context · v_center) and lowers σ(u_neg · v_center) "
+        "for K words sampled from the unigram^0.75 distribution, instead of a softmax over the whole vocabulary."
+    )
+    st.session_state.setdefault("sgns_model", None)
+    st.session_state.setdefault("sgns_job_id", None)
+
+    with st.expander("⚙️ Model Settings", expanded=True):
+        params = {
+            "vector_size": st.slider("Vector Size", 20, 300, 100, step=10, key="sgns_vector_size"),
+            "window": st.slider("Window Size", 1, 10, 5, key="sgns_window"),
+            "negative": st.slider("Negative Samples (K)", 1, 20, 5, key="sgns_negative"),
+            "epochs": st.slider("Epochs", 1, 20, 5, key="sgns_epochs"),
+            "min_count": st.slider("Min Word Count", 1, 5, 1, key="sgns_min_count"),
+            "batch_size": st.select_slider("Minibatch Size", [128, 256, 512, 1024, 2048, 4096], value=1024, key="sgns_batch_size"),
+            "workers": st.slider("Hogwild Processes", 1, 8, 1, key="sgns_workers"),
+        }
+
+    if st.button("🚀 Train with Negative Sampling"):
+        # 串流斷詞的語料：訓練時直接編碼成 int array，不會產生整份 token list
+        if source == "pdf":
+            corpus = TokenizedCorpus(preprocess_pdf_sentences(raw_text=sentences, tokenize=True))
+        elif sentences:
+            corpus = TokenizedCorpus(sentences)
+        else:
+            if ensure_nltk_resources("brown"):
+                st.error("❌ NLTK Brown corpus is not available. Please enter sentences, or run `python lib/nltk_resources.py brown --download`.")
+                st.stop()
+            corpus = BrownCorpus()
+
+        corpus_key = "brown" if isinstance(corpus, BrownCorpus) else corpus.stats()["digest"]
+        if corpus_key != "brown" and corpus.stats()["sentences"] == 0:
+            st.error("❌ No valid tokenized sentences found after preprocessing.")
+            st.stop()
+
+        st.session_state.sgns_job_id = submit_job(
+            "sgns_training",
+            run_sgns_training,
+            kwargs={"tokenized_sentences": corpus, "params": params},
+            dedup_payload={"corpus": corpus_key, "params": params},
+            label="🎯 Negative sampling training"
+        )
+
+    job_id = st.session_state.get("sgns_job_id")
+    if job_id:
+        job = render_job_status(job_id, title="🎯 Training SGNS...")
+        if job and job["status"] == "succeeded" and job.get("has_result"):
+            result = job["result"]
+            st.session_state.sgns_model = result["kv"]
+            st.session_state.sgns_stats = {key: result[key] for key in ("losses", "pairs", "seconds")}
+            st.session_state.sgns_job_id = None
+
+    kv = load_session_value("sgns_model")
+    if not kv:
+        st.warning("⚠️ No trained model found. Please train the model first.")
+        return
+
+    stats = st.session_state.get("sgns_stats") or {}
+    if stats:
+        st.success(
+            f"✅ Trained **{len(kv)}** words on **{stats['pairs']:,}** pairs in **{stats['seconds']:.1f}s** "
+            f"({stats['pairs'] / max(stats['seconds'], 1e-9):,.0f} pairs/s)"
+        )
+        st.line_chart(pd.DataFrame({"Loss per pair": stats["losses"]}, index=range(1, len(stats["losses"]) + 1)))
+
+    with st.expander("🔍 Query Word", expanded=True):
+        query_word = st.selectbox("Choose a word to find similar words:", options=kv.index_to_key, key="sgns_query_word")
+        similar_words = get_similarity_index(kv).most_similar(query_word, topn=5)
+        display_pretty_table(pd.DataFrame(similar_words, columns=["Word", "Similarity"]))
+        if st.button("🔎 Show Embedding Visualization", key="sgns_plot"):
+            plot_embeddings(kv, [query_word] + [word for word, _ in similar_words])
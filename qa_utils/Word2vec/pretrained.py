@@ -0,0 +1,114 @@
+# 預訓練的 Brown corpus Word2Vec（CBOW + Skip-gram）：由 models/build_brown_word2vec.py 訓練一次，
+# 存成 .npy 後以 mmap='r' 載入；整個 process（所有 session）共用同一份映射，預設 demo 不用現場訓練
+import json
+import os
+import shutil
+import time
+
+from gensim.models import KeyedVectors
+
+from lib.nltk_resources import ensure_nltk_resources
+from lib.session_resources import get_shared_resource, has_shared_resource
+from qa_utils.Word2vec.corpus import TokenizedCorpus
+from qa_utils.Word2vec.model_store import train_word2vec, normalize_params
+
+BROWN_MODEL_DIR = os.path.join("models", "word2vec", "brown")
+BROWN_PARAMS = {"vector_size": 100, "window": 5, "min_count": 1, "epochs": 5}
+BROWN_VARIANTS = {0: "cbow", 1: "skipgram"}
+
+class _BrownSentences:
+    def __iter__(self):
+        import nltk
+        for sent in nltk.corpus.brown.sents():
+            yield " ".join(sent)
+
+class BrownCorpus(TokenizedCorpus):
+    """Brown corpus 斷詞後的句子（可重複迭代，不會先把整個語料轉成字串 list）"""
+
+    def __init__(self):
+        super().__init__(_BrownSentences())
+
+def _variant_path(sg):
+    return os.path.join(BROWN_MODEL_DIR, BROWN_VARIANTS[sg], "vectors.kv")
+
+def _meta_path():
+    return os.path.join(BROWN_MODEL_DIR, "meta.json")
+
+def get_brown_meta():
+    """
+    Returns:
+        dict | None: 訓練參數與語料統計（尚未 build 時為 None）
+    """
+    try:
+        with open(_meta_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def brown_model_available(sg):
+    return os.path.exists(_variant_path(sg))
+
+def matches_brown_params(params):
+    """UI 的設定是否與預訓練模型相同（相同才能直接使用預訓練向量）"""
+    params = normalize_params(params)
+    return all(params[name] == value for name, value in BROWN_PARAMS.items())
+
+def load_brown_keyed_vectors(sg):
+    """
+    預訓練向量（process 內共用、mmap 載入）
+
+    Returns:
+        KeyedVectors | None: 尚未 build 時為 None
+    """
+    if not has_shared_resource(f"brown_w2v:{sg}") and not brown_model_available(sg):
+        return None
+    return get_shared_resource(f"brown_w2v:{sg}", lambda: KeyedVectors.load(_variant_path(sg), mmap="r"))
+
+def build_brown_models(variants=(0, 1), workers=4, force=False):
+    """
+    訓練並儲存 Brown corpus 的 CBOW / Skip-gram 向量
+
+    Returns:
+        dict: {variant_name: 訓練秒數}（已存在且未指定 force 的會略過）
+    """
+    if ensure_nltk_resources("brown", "stopwords"):
+        raise RuntimeError("NLTK brown / stopwords corpus not available; run `python lib/nltk_resources.py brown stopwords --download`")
+
+    corpus = BrownCorpus()
+    stats = corpus.stats()
+    sentences, tokens = stats["sentences"], stats["tokens"]
+
+    timings = {}
+    for sg in variants:
+        name = BROWN_VARIANTS[sg]
+        if brown_model_available(sg) and not force:
+            print(f"⏭️ {name} already built at {_variant_path(sg)}")
+            continue
+
+        print(f"🧠 Training Brown {name} ({sentences} sentences, {tokens} tokens)...")
+        start = time.perf_counter()
+        model = train_word2vec(corpus, workers=workers, sg=sg, **BROWN_PARAMS)
+        timings[name] = round(time.perf_counter() - start, 2)
+
+        # 寫到暫存資料夾再 rename，執行中的 app 不會讀到一半的檔案
+        target_dir = os.path.dirname(_variant_path(sg))
+        tmp_dir = f"{target_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        model.wv.save(os.path.join(tmp_dir, "vectors.kv"), sep_limit=0)
+        shutil.rmtree(target_dir, ignore_errors=True)
+        os.replace(tmp_dir, target_dir)
+        print(f"✅ Saved {name} ({len(model.wv)} words) in {timings[name]}s")
+
+    meta = get_brown_meta() or {}
+    meta.update({
+        "params": BROWN_PARAMS,
+        "sentences": sentences,
+        "tokens": tokens,
+        "built_at": time.time(),
+        "train_seconds": {**meta.get("train_seconds", {}), **timings}
+    })
+    os.makedirs(BROWN_MODEL_DIR, exist_ok=True)
+    with open(_meta_path(), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return timings
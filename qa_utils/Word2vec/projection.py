@@ -0,0 +1,59 @@
+# 詞向量的 PCA 投影快取：每個模型只 fit 一次，2D / 3D 視覺化與 rerun（例如 3D 換選句子）都重用同一份座標
+# - 同一個模型（相同 model store hash）在 process 內是同一個 KeyedVectors 物件，以它為 key 快取座標
+# - 詞彙量大時改用 randomized SVD；更大時以 IncrementalPCA 分批讀取（mmap 的向量不必整份載入記憶體）
+import threading
+import weakref
+
+import numpy as np
+
+PROJECTION_COMPONENTS = 3  # 一律算 3 維，2D 取前兩維（PCA 的成分依變異量排序，前兩維與 2 維 PCA 相同）
+RANDOMIZED_MIN_VOCAB = 20000
+INCREMENTAL_MIN_VOCAB = 200000
+INCREMENTAL_BATCH_SIZE = 20000
+
+_projections = weakref.WeakKeyDictionary()  # KeyedVectors → {n_components: np.ndarray}
+_projections_lock = threading.Lock()
+
+def fit_projection(vectors, n_components=PROJECTION_COMPONENTS):
+    """
+    Args:
+        vectors (np.ndarray): (vocab, dim)，可以是 np.memmap
+
+    Returns:
+        np.ndarray: (vocab, n_components) float32 座標
+    """
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    vocab = vectors.shape[0]
+    if vocab >= INCREMENTAL_MIN_VOCAB:
+        pca = IncrementalPCA(n_components=n_components, batch_size=INCREMENTAL_BATCH_SIZE)
+        for start in range(0, vocab, INCREMENTAL_BATCH_SIZE):
+            batch = np.asarray(vectors[start:start + INCREMENTAL_BATCH_SIZE], dtype=np.float32)
+            if len(batch) >= n_components:  # 最後一批太小時 partial_fit 會失敗，略過不影響結果
+                pca.partial_fit(batch)
+        reduced = np.empty((vocab, n_components), dtype=np.float32)
+        for start in range(0, vocab, INCREMENTAL_BATCH_SIZE):
+            reduced[start:start + INCREMENTAL_BATCH_SIZE] = pca.transform(np.asarray(vectors[start:start + INCREMENTAL_BATCH_SIZE], dtype=np.float32))
+        return reduced
+
+    solver = "randomized" if vocab >= RANDOMIZED_MIN_VOCAB else "full"
+    pca = PCA(n_components=n_components, svd_solver=solver, random_state=0)
+    return pca.fit_transform(np.asarray(vectors, dtype=np.float32)).astype(np.float32)
+
+def get_projection(kv, n_components=PROJECTION_COMPONENTS):
+    """
+    kv 所有詞的 PCA 座標（第一次呼叫時 fit，之後直接回傳快取）
+
+    Returns:
+        np.ndarray: (vocab, n_components)，列順序同 kv.index_to_key（唯讀，請勿修改）
+    """
+    with _projections_lock:
+        cached = _projections.get(kv, {}).get(n_components)
+    if cached is not None:
+        return cached
+
+    reduced = fit_projection(kv.vectors, n_components)
+    reduced.setflags(write=False)
+    with _projections_lock:
+        _projections.setdefault(kv, {})[n_components] = reduced
+    return reduced
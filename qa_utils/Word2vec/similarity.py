@@ -0,0 +1,183 @@
+# 詞向量相似度查詢服務：取代每次 rerun 都對整個詞彙表做 brute-force 的 kv.most_similar
+# - 建立一次 L2 正規化的 float32 矩陣，cosine similarity = 一次矩陣乘法；多個查詢詞合併成一次 matmul
+# - 詞彙量大（ESG 報告庫等級）時加上 random-projection LSH：只對候選詞做精確重排
+# - 查詢結果以 LRU cache 保存（同一個模型的 index 在所有 session 共用）
+# Benchmark：python test/bench_similarity.py
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+ANN_MIN_VOCAB = 50000  # 詞彙量超過這個數量才使用 LSH，較小的模型精確搜尋已經夠快
+LSH_TABLES = 12
+LSH_BITS = 12
+RESULT_CACHE_SIZE = 1024
+
+class RandomProjectionLSH:
+    """
+    Random hyperplane LSH（cosine）：每個 table 以 n_bits 個隨機超平面把向量編成整數 bucket code。
+    bucket 以排序後的陣列 + searchsorted 查找（純 NumPy，不建立 Python dict）
+
+    Args:
+        normed (np.ndarray): (vocab, dim) 已正規化的向量
+        n_tables (int): table 數，越多 recall 越高、候選越多
+        n_bits (int): 每個 table 的 bit 數，越多 bucket 越小
+        seed (int): 隨機超平面的 seed
+    """
+
+    def __init__(self, normed, n_tables=LSH_TABLES, n_bits=LSH_BITS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_bits = n_bits
+        self.planes = rng.standard_normal((n_tables, normed.shape[1], n_bits)).astype(np.float32)
+        self._weights = (1 << np.arange(n_bits, dtype=np.int64))
+        self.tables = []
+        for planes in self.planes:
+            codes = self._codes(normed, planes)
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            self.tables.append((sorted_codes, order))
+
+    def _codes(self, vectors, planes):
+        return ((vectors @ planes) > 0).astype(np.int64) @ self._weights
+
+    def candidates(self, vector, probes=1):
+        """
+        Args:
+            vector (np.ndarray): (dim,) 已正規化的查詢向量
+            probes (int): 0 只查同一個 bucket；1 另外查 hamming 距離 1 的 bucket（multi-probe，recall 較高）
+
+        Returns:
+            np.ndarray: 候選詞 index（不重複）
+        """
+        found = []
+        for planes, (sorted_codes, order) in zip(self.planes, self.tables):
+            code = int(self._codes(vector[None, :], planes)[0])
+            codes = [code]
+            if probes:
+                codes.extend(code ^ (1 << bit) for bit in range(self.n_bits))
+            codes = np.asarray(codes, dtype=np.int64)
+            starts = np.searchsorted(sorted_codes, codes, side="left")
+            ends = np.searchsorted(sorted_codes, codes, side="right")
+            for start, end in zip(starts, ends):
+                if end > start:
+                    found.append(order[start:end])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+class SimilarityIndex:
+    """
+    一個 KeyedVectors 的相似度 index（請用 get_similarity_index 取得，同一個模型只建立一次）
+
+    Args:
+        kv (KeyedVectors): 詞向量（mmap 也可以）
+        use_ann (bool | None): None 表示依詞彙量自動決定（>= ANN_MIN_VOCAB 才用 LSH）
+    """
+
+    def __init__(self, kv, use_ann=None):
+        self.keys = list(kv.index_to_key)
+        self.key_to_index = kv.key_to_index
+        vectors = np.asarray(kv.vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.normed = vectors / np.maximum(norms, 1e-12)
+        if use_ann is None:
+            use_ann = len(self.keys) >= ANN_MIN_VOCAB
+        self.lsh = RandomProjectionLSH(self.normed) if use_ann else None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _top_k(self, scores, topn, exclude):
+        """scores: (n,) 或 (batch, n)；回傳每一列前 topn 的 (index, score)，排除查詢詞本身"""
+        scores = np.atleast_2d(scores).copy()
+        for row, index in enumerate(exclude):
+            if index is not None and index < scores.shape[1]:
+                scores[row, index] = -np.inf
+        k = min(topn, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in range(scores.shape[0])]
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(part):
+            candidates = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(int(i), float(scores[row, i])) for i in candidates if np.isfinite(scores[row, i])])
+        return results
+
+    def _exact(self, indices, topn):
+        scores = self.normed[indices] @ self.normed.T
+        return self._top_k(scores, topn, indices)
+
+    def _approximate(self, index, topn, probes):
+        candidates = self.lsh.candidates(self.normed[index], probes=probes)
+        candidates = candidates[candidates != index]
+        if len(candidates) < topn:
+            return self._exact([index], topn)[0]
+        scores = self.normed[candidates] @ self.normed[index]
+        top = self._top_k(scores, topn, [None])[0]
+        return [(int(candidates[i]), score) for i, score in top]
+
+    def most_similar_batch(self, words, topn=10, exact=False, probes=1):
+        """
+        一次查詢多個詞（精確搜尋時合併成一次 matmul）
+
+        Args:
+            words (list[str]): 查詢詞（不在詞彙表中的詞回傳空 list）
+            topn (int): 每個詞回傳幾個結果
+            exact (bool): 強制精確搜尋（忽略 LSH）
+            probes (int): LSH multi-probe 層數（見 RandomProjectionLSH.candidates）
+
+        Returns:
+            list[list[tuple[str, float]]]: 與 words 對應的 [(word, cosine similarity), ...]
+        """
+        use_ann = self.lsh is not None and not exact
+        mode = ("ann", probes) if use_ann else ("exact",)
+        results = [None] * len(words)
+        pending = []
+        with self._lock:
+            for position, word in enumerate(words):
+                cached = self._cache.get((word, topn, mode))
+                if cached is not None:
+                    self._cache.move_to_end((word, topn, mode))
+                    results[position] = cached
+                elif word not in self.key_to_index:
+                    results[position] = []
+                else:
+                    pending.append(position)
+
+        if pending:
+            indices = [self.key_to_index[words[position]] for position in pending]
+            if use_ann:
+                found = [self._approximate(index, topn, probes) for index in indices]
+            else:
+                found = self._exact(indices, topn)
+            with self._lock:
+                for position, hits in zip(pending, found):
+                    results[position] = [(self.keys[i], score) for i, score in hits]
+                    self._cache[(words[position], topn, mode)] = results[position]
+                while len(self._cache) > RESULT_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return results
+
+    def most_similar(self, word, topn=10, exact=False, probes=1):
+        """同 kv.most_similar(word, topn)：Returns: list[tuple[str, float]]"""
+        return self.most_similar_batch([word], topn=topn, exact=exact, probes=probes)[0]
+
+_indexes = weakref.WeakKeyDictionary()  # KeyedVectors → SimilarityIndex（模型被釋放時 index 一起釋放）
+_indexes_lock = threading.Lock()
+
+def get_similarity_index(kv):
+    """
+    取得（必要時建立）kv 的相似度 index；同一個 KeyedVectors 物件在所有 session 共用一份
+
+    Returns:
+        SimilarityIndex
+    """
+    with _indexes_lock:
+        index = _indexes.get(kv)
+        if index is None:
+            index = SimilarityIndex(kv)
+            _indexes[kv] = index
+        return index
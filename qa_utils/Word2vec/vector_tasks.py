@@ -0,0 +1,22 @@
+# Word2Vec 子模組對應表：以名稱存在 session_state，第一次執行時才 import（gensim / sklearn / plotly 不影響 app 啟動）
+import importlib
+
+VECTOR_TASK_MODULES = {
+    "view_2d": "qa_utils.Word2vec.view_2d",
+    "view_3d": "qa_utils.Word2vec.view_3d",
+    "cbow_skipgram": "qa_utils.Word2vec.cbow_skipgram",
+    "negative_sampling": "qa_utils.Word2vec.negative_sampling",
+}
+
+# 沒有輸入句子時以 Brown corpus 訓練的子模組
+BROWN_DEFAULT_TASKS = ("cbow_skipgram", "negative_sampling")
+
+def get_vector_task(name):
+    """
+    Args:
+        name (str): VECTOR_TASK_MODULES 的 key
+
+    Returns:
+        callable: 該模組的 run(sentences, source)
+    """
+    return importlib.import_module(VECTOR_TASK_MODULES[name]).run
@@ -2,13 +2,15 @@ import time
 import numpy as np
 import plotly.express as px
 import plotly.graph_objs as go
-from sklearn.decomposition import PCA
 import streamlit as st
-from gensim.models import Word2Vec
 from gensim.utils import simple_preprocess
 import pandas as pd
 import matplotlib.pyplot as plt
 from pdf_context import preprocess_pdf_sentences
+from qa_utils.Word2vec.model_store import get_or_train_keyed_vectors
+from qa_utils.Word2vec.projection import get_projection
+
+VIEW_2D_PARAMS = {"vector_size": 100, "window": 5, "min_count": 1, "sg": 0}
 
 def run(sentences, source="manual"):
     st.markdown("---")
@@ -30,11 +32,11 @@ def run(sentences, source="manual"):
         st.error(f"❌ No valid words found in your input. Please enter meaningful sentences with actual words.\n{sentences}\n\n{tokenized_sentences}\n\n{flat_tokens}")
         return
 
-    # Train a Word2Vec model
-    model = Word2Vec(tokenized_sentences, vector_size=100, window=5, min_count=1, workers=4)
+    # Train a Word2Vec model（相同句子已訓練過時從 model store 以 mmap 載入）
+    kv, _ = get_or_train_keyed_vectors(tokenized_sentences, VIEW_2D_PARAMS, source=source)
 
     # Get the word vectors
-    word_vectors = np.array([model.wv[word] for word in model.wv.index_to_key])
+    word_vectors = np.asarray(kv.vectors)
 
     # 防止 PCA 出錯
     if word_vectors.shape[0] < 3 or word_vectors.shape[1] < 3:
@@ -45,14 +47,13 @@ def run(sentences, source="manual"):
         )
         return
 
-    # Reduce the dimensions to 3D using PCA
-    pca = PCA(n_components=3)
-    reduced_vectors = pca.fit_transform(word_vectors)
+    # Reduce the dimensions using PCA（每個模型只 fit 一次，與 3D view 共用）
+    reduced_vectors = get_projection(kv)
 
-    # print(model.wv.index_to_key)
-    # # try to display model.wv.index_to_key and its vector
-    # print(model.wv.index_to_key)
-    # for word in model.wv.index_to_key:
+    # print(kv.index_to_key)
+    # # try to display kv.index_to_key and its vector
+    # print(kv.index_to_key)
+    # for word in kv.index_to_key:
     #   print(word, model.wv[word])
 
     cmap = plt.get_cmap('tab20', len(tokenized_sentences))  # 安全使用 N 個顏色
@@ -63,21 +64,21 @@ def run(sentences, source="manual"):
 
     # 為每個 word 分配所屬句子的顏色
     word_colors = []
-    for word in model.wv.index_to_key:
+    for word in kv.index_to_key:
         for i, sentence in enumerate(tokenized_sentences):
             if word in sentence:
                 word_colors.append(hex_colors[i])
                 break
     color_map = hex_colors
 
-    word_ids = [f"word-{i}" for i in range(len(model.wv.index_to_key))]
+    word_ids = [f"word-{i}" for i in range(len(kv.index_to_key))]
 
     # Create a 2D scatter plot using Plotly
     scatter = go.Scatter(
         x=reduced_vectors[:, 0],
         y=reduced_vectors[:, 1],
         mode='markers+text',
-        text=model.wv.index_to_key,
+        text=kv.index_to_key,
         textposition='top center',
         marker=dict(color=word_colors, size=8),
         customdata=word_colors,
@@ -93,7 +94,7 @@ def run(sentences, source="manual"):
     line_traces = []
     for i, sentence in enumerate(tokenized_sentences):
         if display_array[i]:
-            line_vectors = [reduced_vectors[model.wv.key_to_index[word]] for word in sentence]
+            line_vectors = [reduced_vectors[kv.key_to_index[word]] for word in sentence]
             line_trace = go.Scatter(
                 x=[vector[0] for vector in line_vectors],
                 y=[vector[1] for vector in line_vectors],
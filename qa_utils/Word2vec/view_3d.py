@@ -1,12 +1,14 @@
 import time
 import numpy as np
 import plotly.graph_objs as go
-from sklearn.decomposition import PCA
 import streamlit as st
-from gensim.models import Word2Vec
 from gensim.utils import simple_preprocess
 import matplotlib.pyplot as plt
 from pdf_context import preprocess_pdf_sentences
+from qa_utils.Word2vec.model_store import get_or_train_keyed_vectors
+from qa_utils.Word2vec.projection import get_projection
+
+VIEW_3D_PARAMS = {"vector_size": 100, "window": 5, "min_count": 1, "sg": 0}
 
 def init_session_state(options):
     st.session_state.setdefault("selected_indices_3d", [0, 1])
@@ -18,34 +20,94 @@ def multiselect_changed(key, new_value):
         st.session_state[key] = new_value
         st.session_state["trigger_plot_3d"] = False
 
-def _draw_scatter(reduced_vectors, model, word_colors):
-    return go.Scatter3d(
-        x=reduced_vectors[:, 0],
-        y=reduced_vectors[:, 1],
-        z=reduced_vectors[:, 2],
-        mode='markers+text',
-        text=model.wv.index_to_key,
-        marker=dict(color=word_colors, size=3),
-        hovertemplate="Word: %{text}",
+# 詞彙量大（PDF 等級）時只畫前 MAX_POINTS 個高頻詞 + 選取句子的詞，文字標籤只標前 LABEL_TOP_N 個
+MAX_POINTS = 20000
+LABEL_TOP_N = 200
+
+def _sentence_index_arrays(kv, tokenized_sentences):
+    """每一句轉成 kv index 的 array（不在詞彙表中的詞略過）；只在建立圖表時算一次"""
+    key_to_index = kv.key_to_index
+    return [
+        np.fromiter((key_to_index[word] for word in sentence if word in key_to_index), dtype=np.int64)
+        for sentence in tokenized_sentences
+    ]
+
+def _word_colors(vocab_size, sentence_indices, hex_colors):
+    """每個詞第一次出現的句子的顏色（反向指定，較前面的句子最後寫入）"""
+    first_sentence = np.full(vocab_size, -1, dtype=np.int64)
+    for i in range(len(sentence_indices) - 1, -1, -1):
+        first_sentence[sentence_indices[i]] = i
+    colors = np.array(hex_colors + ["#999999"], dtype=object)
+    return colors[first_sentence]  # -1 → 最後一個（灰色）
+
+def _draw_scatter(reduced_vectors, words, word_colors, highlighted):
+    """
+    Args:
+        words (np.ndarray): kv.index_to_key（object array，依詞頻排序）
+        highlighted (np.ndarray): 選取句子的詞 index（一定會畫出並加上標籤）
+    """
+    vocab_size = len(words)
+    shown = np.arange(vocab_size) if vocab_size <= MAX_POINTS else np.union1d(np.arange(MAX_POINTS), highlighted)
+    labeled = np.union1d(np.arange(min(LABEL_TOP_N, vocab_size)), highlighted)
+
+    points = go.Scatter3d(
+        x=reduced_vectors[shown, 0],
+        y=reduced_vectors[shown, 1],
+        z=reduced_vectors[shown, 2],
+        mode='markers',
+        hovertext=words[shown],
+        marker=dict(color=word_colors[shown], size=3),
+        hovertemplate="Word: %{hovertext}<extra></extra>",
         name="Words"
     )
-
-def _draw_lines(reduced_vectors, model, tokenized_sentences, hex_colors):
-    traces = []
-    for i in st.session_state["selected_indices_3d"]:
-        if i >= len(tokenized_sentences):
-            continue
-        line_vectors = [reduced_vectors[model.wv.key_to_index[word]] for word in tokenized_sentences[i] if word in model.wv.key_to_index]
-        if len(line_vectors) > 1:
-            traces.append(go.Scatter3d(
-                x=[v[0] for v in line_vectors],
-                y=[v[1] for v in line_vectors],
-                z=[v[2] for v in line_vectors],
-                mode='lines',
-                line=dict(color=hex_colors[i], width=2),
-                name=f"Sentence {i+1}",
-                showlegend=True
-            ))
+    labels = go.Scatter3d(
+        x=reduced_vectors[labeled, 0],
+        y=reduced_vectors[labeled, 1],
+        z=reduced_vectors[labeled, 2],
+        mode='text',
+        text=words[labeled],
+        hoverinfo='skip',
+        showlegend=False
+    )
+    return [points, labels]
+
+def _draw_lines(reduced_vectors, sentence_indices, selected, hex_colors):
+    """所有選取的句子合併成一條 trace（句子之間以 NaN 斷開），每句另外加一個只有 legend 的空 trace"""
+    selected = [i for i in selected if i < len(sentence_indices) and len(sentence_indices[i]) > 1]
+    if not selected:
+        return []
+
+    # -1 是句子之間的分隔點
+    path = np.concatenate([np.append(sentence_indices[i], -1) for i in selected])
+    color_values = np.concatenate([np.full(len(sentence_indices[i]) + 1, position) for position, i in enumerate(selected)])
+    coords = reduced_vectors[path].astype(float)
+    coords[path < 0] = np.nan
+
+    last = max(len(selected) - 1, 1)
+    colorscale = []
+    for position, i in enumerate(selected):
+        colorscale.append([position / last, hex_colors[i]])
+    if len(selected) == 1:
+        colorscale.append([1.0, hex_colors[selected[0]]])
+
+    traces = [go.Scatter3d(
+        x=coords[:, 0],
+        y=coords[:, 1],
+        z=coords[:, 2],
+        mode='lines',
+        line=dict(color=color_values, colorscale=colorscale, cmin=0, cmax=last, width=2),
+        connectgaps=False,
+        hoverinfo='skip',
+        showlegend=False
+    )]
+    for i in selected:
+        traces.append(go.Scatter3d(
+            x=[None], y=[None], z=[None],
+            mode='lines',
+            line=dict(color=hex_colors[i], width=2),
+            name=f"Sentence {i+1}",
+            showlegend=True
+        ))
     return traces
 
 def run(sentences, source="manual"):
@@ -109,27 +171,31 @@ def run(sentences, source="manual"):
             st.error("❌ No valid words found.")
             return
 
-        model = Word2Vec(tokenized_sentences, vector_size=100, window=5, min_count=1, workers=4)
-        word_vectors = np.array([model.wv[word] for word in model.wv.index_to_key])
+        # 相同句子已訓練過時從 model store 以 mmap 載入
+        kv, _ = get_or_train_keyed_vectors(tokenized_sentences, VIEW_3D_PARAMS, source=source)
+        word_vectors = np.asarray(kv.vectors)
 
         if word_vectors.shape[0] < 3 or word_vectors.shape[1] < 3:
             st.error("❌ Not enough data to perform PCA.")
             return
 
-        reduced_vectors = PCA(n_components=3).fit_transform(word_vectors)
+        # 投影座標依模型快取：只換選取的句子時不會重新 fit PCA
+        reduced_vectors = get_projection(kv)
         cmap = plt.get_cmap('tab20', len(tokenized_sentences))
         hex_colors = ['#%02x%02x%02x' % (int(r*255), int(g*255), int(b*255)) for r, g, b, a in [cmap(i) for i in range(len(tokenized_sentences))]]
 
-        word_colors = []
-        for word in model.wv.index_to_key:
-            for i, sentence in enumerate(tokenized_sentences):
-                if word in sentence:
-                    word_colors.append(hex_colors[i])
-                    break
+        sentence_indices = _sentence_index_arrays(kv, tokenized_sentences)
+        word_colors = _word_colors(len(kv.index_to_key), sentence_indices, hex_colors)
+        words = np.array(kv.index_to_key, dtype=object)
+
+        selected = st.session_state["selected_indices_3d"]
+        highlighted = np.unique(np.concatenate(
+            [sentence_indices[i] for i in selected if i < len(sentence_indices)] or [np.empty(0, dtype=np.int64)]
+        ))
 
         fig = go.Figure()
-        fig.add_trace(_draw_scatter(reduced_vectors, model, word_colors))
-        fig.add_traces(_draw_lines(reduced_vectors, model, tokenized_sentences, hex_colors))
+        fig.add_traces(_draw_scatter(reduced_vectors, words, word_colors, highlighted))
+        fig.add_traces(_draw_lines(reduced_vectors, sentence_indices, selected, hex_colors))
 
         fig.update_layout(
             scene=dict(xaxis_title="X", yaxis_title="Y", zaxis_title="Z"),
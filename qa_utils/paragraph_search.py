@@ -0,0 +1,205 @@
+# 報告段落語意搜尋：上傳 PDF 時建立一次 index，之後每個問題只是一次矩陣 × 向量（不呼叫 LLM）
+# - 每頁切成不超過 PASSAGE_MAX_CHARS 的段落（依句尾標點合併句子）
+# - 以報告本身訓練 Word2Vec（經過 model store：同一份報告只訓練一次，也會登記在 embedding registry）
+# - 段落向量 = 段落內詞向量的 IDF 加權總和（正規化後即 IDF 加權平均的方向），存成連續的 float32 矩陣
+# - 單一報告訓練的詞向量彼此很接近（所有段落的相似度都在 0.9 以上），因此去掉段落向量的第一主成分（SIF 的做法）
+# - 問題以同樣方式轉成向量，cosine similarity 取 top-k
+# Benchmark：python test/bench_paragraph_search.py --pages 300
+import re
+import time
+
+import numpy as np
+
+from db_utils.content_store import content_hash
+from tools.job_queue import submit_job
+from qa_utils.Word2vec.model_store import get_or_train_keyed_vectors
+
+PASSAGE_MAX_CHARS = 400
+SEARCH_TOP_K = 3
+COMMON_COMPONENT_MIN_PASSAGES = 10  # 段落太少時第一主成分就是內容本身，不去除
+# min_count=1：只出現一次的詞也保留向量，問題與段落用到同一個罕見詞時仍然對得上（接近字面比對）
+SEARCH_PARAMS = {"vector_size": 100, "window": 5, "min_count": 1, "sg": 1, "epochs": 10}
+
+_sentence_end_re = re.compile(r"(?<=[.!?;。！？；])\s+|(?<=[。！？；])")
+_en_word_re = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+_han_run_re = re.compile(r"[\u4e00-\u9fff]+")
+
+_stopwords = None
+
+def _get_stopwords():
+    """sklearn 內建的英文停用詞（不依賴 NLTK 資料）"""
+    global _stopwords
+    if _stopwords is None:
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        _stopwords = frozenset(ENGLISH_STOP_WORDS)
+    return _stopwords
+
+def tokenize_for_search(text):
+    """
+    搜尋用的斷詞（段落與問題共用，兩邊一定一致）：
+    英文小寫單字與數字（去除停用詞）；中文以連續漢字的 bigram 代替斷詞（不需要載入 CKIP）
+
+    Returns:
+        list[str]
+    """
+    text = text.lower()
+    stopwords = _get_stopwords()
+    tokens = [w for w in _en_word_re.findall(text) if len(w) > 1 and w not in stopwords]
+    for run in _han_run_re.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def _split_long(sentence, max_chars):
+    """超過 max_chars 的句子（例如表格）盡量在空白處切開"""
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(" ", 0, max_chars)
+        if cut <= max_chars // 2:
+            cut = max_chars
+        yield sentence[:cut].strip()
+        sentence = sentence[cut:].strip()
+    if sentence:
+        yield sentence
+
+def split_passages(pdf_pages, max_chars=PASSAGE_MAX_CHARS):
+    """
+    Args:
+        pdf_pages (list[dict]): st.session_state["pdf_text"] 的格式 [{"page": int, "content": str}, ...]
+
+    Returns:
+        list[dict]: [{"page": int, "text": str}, ...]
+    """
+    passages = []
+    for page in pdf_pages:
+        content = page.get("content")
+        if not content or content in ("None", "none"):
+            continue
+        current = ""
+        for sentence in _sentence_end_re.split(content):
+            for piece in _split_long(sentence.strip(), max_chars):
+                if current and len(current) + len(piece) + 1 > max_chars:
+                    passages.append({"page": page["page"], "text": current})
+                    current = ""
+                current = f"{current} {piece}" if current else piece
+        if current:
+            passages.append({"page": page["page"], "text": current})
+    return passages
+
+class PassageIndex:
+    """
+    段落向量 index（請用 build_passage_index 建立）
+
+    Attributes:
+        passages (list[dict]): [{"page", "text"}]，順序同 matrix 的列
+        matrix (np.ndarray): (passages, dim) C-contiguous float32，每列已 L2 正規化（沒有任何已知詞的段落為 0 向量）
+        term_vectors (np.ndarray): (vocab, dim) 正規化詞向量 × IDF（已去掉共同成分）
+        key_to_index (dict): 詞 → term_vectors 的列
+    """
+
+    def __init__(self, passages, matrix, term_vectors, key_to_index):
+        self.passages = passages
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.term_vectors = np.ascontiguousarray(term_vectors, dtype=np.float32)
+        self.key_to_index = key_to_index
+
+    def __len__(self):
+        return len(self.passages)
+
+    def embed(self, text):
+        """問題 → 正規化的 IDF 加權平均向量；沒有任何已知詞時回傳 None"""
+        indices = [self.key_to_index[token] for token in tokenize_for_search(text) if token in self.key_to_index]
+        if not indices:
+            return None
+        vector = self.term_vectors[indices].sum(axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+
+    def search(self, question, top_k=SEARCH_TOP_K):
+        """
+        Returns:
+            list[tuple[float, dict]]: [(cosine similarity, {"page", "text"}), ...]，相似度高的在前
+        """
+        vector = self.embed(question)
+        if vector is None or not len(self.passages):
+            return []
+        scores = self.matrix @ vector
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.passages[i]) for i in top if scores[i] > 0]
+
+def build_passage_index(pdf_pages, workers=4, progress=None):
+    """
+    Args:
+        pdf_pages (list[dict]): [{"page": int, "content": str}, ...]
+        progress (callable): progress(fraction, message)
+
+    Returns:
+        PassageIndex
+    """
+    progress = progress or (lambda fraction, message: None)
+    start = time.perf_counter()
+
+    progress(0.0, "Splitting pages into passages...")
+    # 報告中重複出現的段落（頁首、同一段指引）只保留第一次出現的頁面
+    passages, tokenized, seen = [], [], set()
+    for passage in split_passages(pdf_pages):
+        tokens = tokenize_for_search(passage["text"])
+        if tokens and passage["text"] not in seen:
+            seen.add(passage["text"])
+            passages.append(passage)
+            tokenized.append(tokens)
+    if not passages:
+        raise ValueError("No searchable text was found in the PDF.")
+
+    progress(0.2, f"Training word vectors on {len(passages)} passages...")
+    kv, _ = get_or_train_keyed_vectors(tokenized, SEARCH_PARAMS, workers=workers, source="pdf_search")
+
+    progress(0.9, "Building passage vectors...")
+    lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.int64, count=len(tokenized))
+    token_ids = np.fromiter(
+        (kv.key_to_index[token] for tokens in tokenized for token in tokens),
+        dtype=np.int64, count=int(lengths.sum())
+    )
+    passage_ids = np.repeat(np.arange(len(tokenized)), lengths)
+
+    # IDF：log((1 + N) / (1 + df)) + 1（同 sklearn smooth_idf），df 以「出現在幾個段落」計算
+    unique_pairs = np.unique(passage_ids * len(kv) + token_ids)
+    df = np.bincount(unique_pairs % len(kv), minlength=len(kv))
+    idf = np.log((1 + len(tokenized)) / (1 + df)) + 1
+
+    vectors = np.asarray(kv.vectors, dtype=np.float32)
+    normed = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    term_vectors = (normed * idf[:, None]).astype(np.float32)
+
+    # 每個段落的詞都是連續的一段：reduceat 一次算出所有段落的加權總和
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    matrix = np.add.reduceat(term_vectors[token_ids], offsets, axis=0)
+
+    # 共同成分：段落向量的第一個右奇異向量；從詞向量中投影掉，問題向量也就自動去掉同一個成分
+    if len(matrix) >= COMMON_COMPONENT_MIN_PASSAGES:
+        common = np.linalg.svd(matrix, full_matrices=False)[2][0]
+        term_vectors -= np.outer(term_vectors @ common, common)
+        matrix -= np.outer(matrix @ common, common)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    index = PassageIndex(passages, matrix, term_vectors, dict(kv.key_to_index))
+    print(f"🔎 Passage index: {len(passages)} passages × {kv.vector_size} dims in {time.perf_counter() - start:.1f}s")
+    return index
+
+def run_passage_index_build(context, pdf_pages):
+    """背景工作：建立段落搜尋 index"""
+    return build_passage_index(pdf_pages, progress=lambda fraction, message: context.report(fraction, message, force=True))
+
+def submit_passage_index(pdf_pages):
+    """上傳 PDF 後送出 index 建立工作；同一份內容不會重複建立"""
+    digest = content_hash("\n\n".join(page.get("content") or "" for page in pdf_pages))
+    return submit_job(
+        "passage_index",
+        run_passage_index_build,
+        kwargs={"pdf_pages": pdf_pages},
+        dedup_payload={"pdf": digest, "params": SEARCH_PARAMS, "max_chars": PASSAGE_MAX_CHARS},
+        label="🔎 Paragraph search index"
+    )
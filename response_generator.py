@@ -1,19 +1,37 @@
 import re
 import streamlit as st
 from pdf_context import get_pdf_context
-from qa_utils.Word2vec import view_2d, view_3d, cbow_skipgram
-from esg_analysis import analyze_esg_from_pdf
+from esg_analysis import submit_esg_analysis
+from lib.session_resources import load_session_value
 
-# 匯入 Gemini Agent，並確認 key 是否存在
+# Gemini Agent（autogen）在第一次對話時才 import；這裡只確認 key 是否存在
 try:
-    from agents.gemini_agent import chat_with_gemini, chat_with_gemini_agent
-    from agents.two_agents import chat_with_two_gemini_agents
     GEMINI_ENABLED = bool(st.secrets.get("GEMINI_API_KEY", None))
     # print(f"GEMINI_ENABLED: {GEMINI_ENABLED}")
 except Exception as e:
     GEMINI_ENABLED = False
-    print(f"❌ Failed to import Gemini agent: {e}")
-    st.warning(f"Gemini Agent not available: {e}")
+    print(f"❌ Failed to read Gemini API key: {e}")
+
+def search_pdf_passages(question):
+    """以上傳時建立的段落向量 index 回答（一次矩陣 × 向量，不呼叫 LLM）"""
+    if "pdf_text" not in st.session_state:
+        return "📂 Please upload a PDF file to get context."
+    index = load_session_value("passage_index")
+    if index is None:
+        if st.session_state.get("passage_index_job_id"):
+            return "⏳ The paragraph search index is still being built. Please try again in a moment."
+        return "⚠️ Paragraph search is not available for this PDF. Please clear it and upload it again."
+    if not question:
+        return "⚠️ Please add a question, e.g., `Search scope 3 emissions target`."
+
+    results = index.search(question)
+    if not results:
+        return f"🔍 No passages in the report match **{question}**. Try different keywords."
+    lines = [f"🔎 Most relevant passages for **{question}**:\n"]
+    for rank, (score, passage) in enumerate(results, start=1):
+        text = " ".join(passage["text"].split())
+        lines.append(f"**{rank}. [Page {passage['page']}]** (similarity {score:.2f})\n> {text}\n")
+    return "\n".join(lines)
 
 def generate_response(prompt):
     pdf_context = get_pdf_context()
@@ -22,10 +40,11 @@ def generate_response(prompt):
 
     # 可執行 Word2Vec 子模組對應表
     vector_semantics_tasks = {
-        "view2d": (view_2d.run, "🧭 2D Word Embedding Visualization is ready to run. Please provide your input sentences in the UI."),
-        "view3d": (view_3d.run, "📡 3D Word Embedding Visualization is ready to run."),
-        "cbow": (cbow_skipgram.run, "📘 CBOW model is ready to run."),
-        "skipgram": (cbow_skipgram.run, "⚙️ Skip-gram model is ready to run."),
+        "view2d": ("view_2d", "🧭 2D Word Embedding Visualization is ready to run. Please provide your input sentences in the UI."),
+        "view3d": ("view_3d", "📡 3D Word Embedding Visualization is ready to run."),
+        "cbow": ("cbow_skipgram", "📘 CBOW model is ready to run."),
+        "skipgram": ("cbow_skipgram", "⚙️ Skip-gram model is ready to run."),
+        "negative sampling": ("negative_sampling", "🎯 Skip-gram with Negative Sampling (NumPy) is ready to run."),
     }
 
     prompt_lists = [
@@ -56,6 +75,10 @@ def generate_response(prompt):
             st.error(f"❌ Unable to show ESG report table: {e}")
             return "❌ Error: ESG report table function not found."
 
+    # 段落語意搜尋：Search <question>
+    if prompt == "search" or prompt.startswith("search "):
+        return search_pdf_passages(original_prompt.strip()[len("search"):].strip())
+
     # 指令：PDF / Word2Vec / 分析模組
     if prompt in prompt_lists or "show pdf page" in prompt:
         if pdf_context:
@@ -78,8 +101,12 @@ def generate_response(prompt):
                 return f"📊 Working on clustering analysis..."
 
             elif prompt == "esg analysis":
-                # return f"🌱 Working on ESG analysis..."
-                return analyze_esg_from_pdf()
+                # Gemini 分析在背景執行，完成後由 render_chat_jobs 把結果加進對話
+                job_id = submit_esg_analysis()
+                chat_jobs = st.session_state.setdefault("chat_jobs", [])
+                if job_id not in chat_jobs:
+                    chat_jobs.append(job_id)
+                return "🌱 Working on ESG analysis in the background... The result will appear here when it's ready."
 
         else:
             if prompt == "vector semantics - word2vec":
@@ -103,6 +130,14 @@ def generate_response(prompt):
 
     # 非內建指令：使用 Gemini（如果啟用）
     elif GEMINI_ENABLED:
+        try:
+            from agents.gemini_agent import chat_with_gemini, chat_with_gemini_agent
+            from agents.two_agents import chat_with_two_gemini_agents
+        except Exception as e:
+            print(f"❌ Failed to import Gemini agent: {e}")
+            st.warning(f"Gemini Agent not available: {e}")
+            return f"⚠️ Gemini Agent not available: {e}"
+
         with st.spinner("🤖 Gemini is thinking..."):
             if st.session_state["chat_mode"] == "Direct Prompting":
                 return chat_with_gemini(original_prompt)
@@ -115,6 +150,9 @@ def generate_response(prompt):
 
     else:
         print(GEMINI_ENABLED)
+        # 沒有 LLM 時，一般問題以段落搜尋回答
+        if "passage_index" in st.session_state:
+            return search_pdf_passages(original_prompt.strip())
 
     # fallback 提示
     return (
@@ -122,6 +160,7 @@ def generate_response(prompt):
         "💡 Try entering prompts like:\n"
         "- `Show content`\n"
         "- `Show pdf page <num>`\n"
+        "- `Search <question>`\n"
         "- `Vector Semantics - Word2vec`\n"
         "- `Clustering analysis`\n"
         "- `ESG analysis`\n\n"
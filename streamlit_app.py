@@ -1,30 +1,22 @@
 import json
 import streamlit as st
-import requests
-from openai import OpenAI
 from db_utils.profile_db_utils import *
-from qa_utils.Word2vec import view_2d, view_3d, cbow_skipgram
+from db_utils.esg_report_db_utils import init_esg_report_db
+from qa_utils.Word2vec.vector_tasks import get_vector_task, BROWN_DEFAULT_TASKS
 from ui_utils.pdf_upload_section import render_pdf_upload_section
 from ui_utils.chat_section import *
 from ui_utils.profile_section import render_profile_section
 from ui_utils.ui_utils import *
-from pdf_context import *
-from esg_analysis import *
-from ui_utils.esg_reports_section import show_esg_report_table
+from pdf_context import get_pdf_context
+# 較重的模組（Word2Vec / 文字雲 / ESG 報表頁 / Gemini agent）在第一次使用時才 import
+# 啟動時間可用 `python test/profile_startup.py` 檢查
+from ui_utils.session_memory_section import render_session_memory_page
+from lib.session_resources import load_session_value, enforce_session_budget
+from tools.avatar_service import DEFAULT_AVATAR_URL, get_avatar_image
 
 import os
 os.environ["STREAMLIT_WATCHER_TYPE"] = "none"  # 🔧 關掉 watcher，避免觸發 torch.classes bug
 
-def is_valid_image_url(url):
-    try:
-        response = requests.get(url, timeout=2)
-        if response.status_code == 200 and 'image' in response.headers["Content-Type"]:
-            return True
-        else:
-            return False
-    except:
-        return False
-
 def load_example_from_json(json_path, key):
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -34,16 +26,18 @@ def render_sidebar(chat_container):
     with st.sidebar:
         st_c_1 = st.container(border=True)
         with st_c_1:
-            user_image = st.session_state.get("user_image", "https://www.w3schools.com/howto/img_avatar.png")
-            if user_image and is_valid_image_url(user_image):
-                st.image(user_image)
+            # 頭像從本機快取讀取（儲存 profile 時已驗證並下載），rerun 不會發 HTTP request
+            user_image = st.session_state.get("user_image", DEFAULT_AVATAR_URL)
+            avatar = get_avatar_image(user_image)
+            if avatar:
+                st.image(avatar)
             else:
                 show_dismissible_alert(
                     "avatar_warning",
                     "⚠️ Invalid avatar URL.<br>Showing default image.<br>Image Ref: <a href='https://unsplash.com/' target='_blank'>https://www.unsplash.com/",
                     alert_type="warning"
                 )
-                st.image("https://www.w3schools.com/howto/img_avatar.png")
+                st.image(DEFAULT_AVATAR_URL)
 
         st.markdown("---")
 
@@ -58,13 +52,20 @@ def render_sidebar(chat_container):
         with st.expander("📦 Vector Semantics - Word2vec", expanded=False):
             if st.button("🧭 Vector space - 2D View"):
                 clear_vector_session_state()
-                st.session_state["vector_task_function"] = view_2d.run
+                st.session_state["vector_task"] = "view_2d"
             if st.button("🧭 Vector space - 3D View"):
                 clear_vector_session_state()
-                st.session_state["vector_task_function"] = view_3d.run
+                st.session_state["vector_task"] = "view_3d"
             if st.button("🧭 Cbow / Skip Gram"):
                 clear_vector_session_state()
-                st.session_state["vector_task_function"] = cbow_skipgram.run
+                st.session_state["vector_task"] = "cbow_skipgram"
+            if st.button("🎯 Negative Sampling"):
+                clear_vector_session_state()
+                st.session_state["vector_task"] = "negative_sampling"
+
+        with st.expander("🛠️ Debug", expanded=False):
+            if st.button("🧮 Session Memory"):
+                st.session_state["show_session_memory"] = True
 
         st.markdown("---")
         selected_lang = st.selectbox("🌐 Language", ["English", "繁體中文"], index=0)
@@ -72,7 +73,7 @@ def render_sidebar(chat_container):
         render_profile_section()
 
 def render_vector_task_section():
-    if "vector_task_function" not in st.session_state:
+    if "vector_task" not in st.session_state:
         return
 
     st.markdown("## 🧠 Provide your own sentences for Word2Vec")
@@ -93,7 +94,7 @@ def render_vector_task_section():
     )
     st.session_state["user_input_text"] = user_input_text
 
-    if st.session_state.get("vector_task_function") == cbow_skipgram.run:
+    if st.session_state.get("vector_task") in BROWN_DEFAULT_TASKS:
         with st.container():
             st.info("ℹ️ You can manually input sentences, or leave empty to use the default Brown corpus.")
 
@@ -104,8 +105,8 @@ def render_vector_task_section():
                 input_sentences = [line.strip() for line in user_input_text.splitlines() if line.strip()]
                 st.session_state["input_sentences"] = input_sentences
                 st.session_state["input_sentences_source"] = "manual"
-            elif st.session_state.get("vector_task_function") == cbow_skipgram.run:
-                # Special case: cbow_skipgram allows no input
+            elif st.session_state.get("vector_task") in BROWN_DEFAULT_TASKS:
+                # Special case: cbow_skipgram / negative_sampling allow no input
                 st.session_state["input_sentences"] = []
                 st.session_state["input_sentences_source"] = "manual"
             else:
@@ -122,10 +123,11 @@ def render_vector_task_section():
                 st.warning("⚠️ No PDF loaded. Please upload a PDF first.")
 
     # --- 核心 --- 執行 vector function
-    if st.session_state.get("input_sentences") is not None:
-        if len(st.session_state["input_sentences"]) > 0 or st.session_state["vector_task_function"] == cbow_skipgram.run:
-            st.session_state["vector_task_function"](
-                sentences=st.session_state["input_sentences"],
+    input_sentences = load_session_value("input_sentences")
+    if input_sentences is not None:
+        if len(input_sentences) > 0 or st.session_state["vector_task"] in BROWN_DEFAULT_TASKS:
+            get_vector_task(st.session_state["vector_task"])(
+                sentences=input_sentences,
                 source=st.session_state.get("input_sentences_source", "manual")
             )
 
@@ -157,10 +159,11 @@ def main():
     )
 
     init_db()
+    init_esg_report_db() # 自動套用 esg_reports.db schema migrations
 
     profile = get_user_profile()
     st.session_state.setdefault("user_name", profile.get("user_name", "Brian") if profile else "Brian")
-    st.session_state.setdefault("user_image", profile.get("user_image", "https://www.w3schools.com/howto/img_avatar.png"))
+    st.session_state.setdefault("user_image", profile.get("user_image", DEFAULT_AVATAR_URL) if profile else DEFAULT_AVATAR_URL)
 
     st.title(f"💬 {st.session_state['user_name']}'s Chatbot")
     render_pdf_upload_section()
@@ -171,16 +174,24 @@ def main():
 
     render_vector_task_section()
     if "pending_vector_task" in st.session_state:
-        st.session_state["vector_task_function"] = st.session_state["pending_vector_task"]
+        st.session_state["vector_task"] = st.session_state["pending_vector_task"]
         del st.session_state["pending_vector_task"]
         st.rerun()
 
     # 判斷是否要顯示 Word Cloud
     if st.session_state.get("show_wordcloud_trigger", False):
+        from esg_analysis import show_wordcloud
         show_wordcloud()
         # st.session_state["show_wordcloud_trigger"] = False  # 清除觸發
 
     if st.session_state.get("show_esg_table", False):
+        from ui_utils.esg_reports_section import show_esg_report_table
         show_esg_report_table()
+
+    if st.session_state.get("show_session_memory", False):
+        render_session_memory_page()
+
+    # 超過 session 記憶體預算時，把最久沒用的大型物件寫到磁碟
+    enforce_session_budget()
 if __name__ == "__main__":
     main()
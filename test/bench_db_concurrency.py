@@ -0,0 +1,147 @@
+# 模擬多個 Streamlit session 同時讀寫 esg_reports.db 的併發 benchmark
+# 用法：python test/bench_db_concurrency.py --readers 8 --writers 2 --ops 200
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_utils import esg_report_db_utils as db
+from db_utils.content_store import compress_content, make_preview
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+READ_SQL = """
+    SELECT Industry.industry_name_zh, Industry.industry_name_en
+    FROM Company JOIN Industry ON Company.industry_id = Industry.industry_id
+    WHERE Company.company_name_en = ?
+"""
+
+# --- 舊寫法：每個操作各自 sqlite3.connect（rollback journal） ---
+def legacy_read(db_path, company_name):
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        conn.execute(READ_SQL, (company_name,)).fetchone()
+
+def legacy_write(db_path, company_id, report_year, content):
+    with sqlite3.connect(db_path, timeout=30) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM ESG_Report WHERE company_id = ? AND report_year = ?", (company_id, report_year))
+        if not cursor.fetchone():
+            # 全文在 ESG_Report_Content（migration 4）；舊寫法不壓縮，以 raw codec 存放
+            codec, blob, digest = compress_content(content, codec="raw")
+            cursor.execute(
+                "INSERT INTO ESG_Report (company_id, report_year, preview, content_size) VALUES (?, ?, ?, ?)",
+                (company_id, report_year, make_preview(content), len(content))
+            )
+            cursor.execute(
+                "INSERT INTO ESG_Report_Content (report_id, codec, content, content_hash) VALUES (?, ?, ?, ?)",
+                (cursor.lastrowid, codec, blob, digest)
+            )
+        conn.commit()
+
+# --- 新寫法：共用連線池 + WAL ---
+def pooled_read(db_path, company_name):
+    with db.get_esg_db_pool().connection() as conn:
+        conn.execute(READ_SQL, (company_name,)).fetchone()
+
+def pooled_write(db_path, company_id, report_year, content):
+    db.insert_esg_report_by_id(company_id, report_year, content)
+
+def seed(num_companies):
+    db.init_esg_report_db()
+    for i in range(num_companies):
+        db.insert_company(
+            company_name_zh=f"公司{i}",
+            industry_name_zh=f"產業{i % 20}",
+            company_name_en=f"Company {i}",
+            industry_name_en=f"Industry {i % 20}"
+        )
+
+def run_workload(label, read_fn, write_fn, db_path, readers, writers, ops, num_companies):
+    latencies = {"read": [], "write": []}
+    errors = []
+    lock = threading.Lock()
+    content = "ESG " * 2000
+
+    def reader(worker_id):
+        local = []
+        for i in range(ops):
+            start = time.perf_counter()
+            try:
+                read_fn(db_path, f"Company {(worker_id * ops + i) % num_companies}")
+            except Exception as e:
+                errors.append(e)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies["read"].extend(local)
+
+    def writer(worker_id):
+        local = []
+        for i in range(ops):
+            start = time.perf_counter()
+            try:
+                write_fn(db_path, (i % num_companies) + 1, 1000 + worker_id * ops + i, content)
+            except Exception as e:
+                errors.append(e)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies["write"].extend(local)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    total_ops = len(latencies["read"]) + len(latencies["write"])
+    print(f"\n📊 {label}")
+    print(f"   total: {total_ops} ops in {elapsed:.2f}s → {total_ops / elapsed:,.0f} ops/s, errors: {len(errors)}")
+    for kind in ["read", "write"]:
+        values = latencies[kind]
+        if values:
+            print(
+                f"   {kind:5s}: p50 {percentile(values, 50) * 1000:.2f} ms | "
+                f"p95 {percentile(values, 95) * 1000:.2f} ms | "
+                f"max {max(values) * 1000:.2f} ms"
+            )
+    if errors:
+        print(f"   first error: {errors[0]!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="esg_reports.db concurrency benchmark")
+    parser.add_argument("--readers", type=int, default=8, help="Number of concurrent reader sessions")
+    parser.add_argument("--writers", type=int, default=2, help="Number of concurrent writer sessions")
+    parser.add_argument("--ops", type=int, default=200, help="Operations per session")
+    parser.add_argument("--companies", type=int, default=500, help="Number of seeded companies")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for label, read_fn, write_fn in [
+            ("Legacy: sqlite3.connect per call", legacy_read, legacy_write),
+            ("Pooled: shared WAL connection pool", pooled_read, pooled_write),
+        ]:
+            db_path = os.path.join(tmp_dir, f"{read_fn.__name__}.db")
+            db.ESG_DB_PATH = db_path
+            seed(args.companies)
+            if read_fn is legacy_read:
+                # 舊寫法不使用 WAL，改回預設 rollback journal 以重現原本的行為
+                db.get_esg_db_pool().close_all()
+                with sqlite3.connect(db_path) as conn:
+                    conn.execute("PRAGMA journal_mode=DELETE")
+            run_workload(label, read_fn, write_fn, db_path, args.readers, args.writers, args.ops, args.companies)
+            db.get_esg_db_pool().close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# 段落語意搜尋（qa_utils/paragraph_search.py）的 benchmark：index 建立時間與每個問題的查詢延遲
+# 用法：python test/bench_paragraph_search.py --pdf db/esg_report_templates/TCFD/2021-TCFD-Implementing_Guidance.pdf
+#      python test/bench_paragraph_search.py --pages 300   （合成的 300 頁報告）
+#      python test/bench_paragraph_search.py --pdf <PDF> --question "How are climate risks governed?"
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from qa_utils.paragraph_search import build_passage_index
+
+TOPICS = {
+    "emissions": "scope emissions carbon greenhouse gas reduction target baseline tonnes intensity",
+    "energy": "renewable energy electricity solar consumption efficiency power purchase",
+    "water": "water withdrawal recycling wastewater discharge scarcity usage",
+    "governance": "board directors oversight audit committee ethics compliance independence",
+    "employees": "employees training diversity safety injury turnover talent wellbeing",
+    "supply": "suppliers supply chain procurement audit conflict minerals assessment",
+}
+FILLER = "the company continues to improve its performance and reports progress annually to stakeholders".split()
+
+def synthetic_pages(pages, seed=0):
+    """每段落以一個主題的詞為主，混入共同的填充詞"""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    result = []
+    for page in range(1, pages + 1):
+        paragraphs = []
+        for _ in range(8):
+            words = TOPICS[rng.choice(topics)].split()
+            sentence = [rng.choice(words if rng.random() < 0.5 else FILLER) for _ in range(14)]
+            paragraphs.append(" ".join(sentence) + ".")
+        result.append({"page": page, "content": " ".join(paragraphs)})
+    return result
+
+def pdf_pages(path, pages=None):
+    import fitz  # PyMuPDF
+    from lib.pdf_text import extract_page_content
+    doc = fitz.open(path)
+    result = [{"page": i + 1, "content": extract_page_content(page)} for i, page in enumerate(doc)]
+    if pages:
+        result = (result * (pages // len(result) + 1))[:pages]  # 重複頁面模擬較長的報告
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Paragraph search build / query latency benchmark")
+    parser.add_argument("--pdf", default=None, help="PDF to index (default: synthetic report)")
+    parser.add_argument("--pages", type=int, default=None, help="Synthetic pages (default 300), or pages to reach by repeating the PDF")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed queries")
+    parser.add_argument("--question", action="append", default=[], help="Print the top passages for this question")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    pages = pdf_pages(args.pdf, args.pages) if args.pdf else synthetic_pages(args.pages or 300)
+    print(f"📄 {len(pages)} pages, {sum(len(p['content']) for p in pages):,} characters")
+
+    start = time.perf_counter()
+    index = build_passage_index(pages, workers=args.workers)
+    print(f"🧱 Index built in {time.perf_counter() - start:.1f}s (cached word vectors are reused on later runs)")
+    print(f"📐 Matrix {index.matrix.shape} float32, {index.matrix.nbytes / 1e6:.1f} MB, C-contiguous={index.matrix.flags.c_contiguous}")
+
+    rng = random.Random(1)
+    questions = [" ".join(rng.sample(rng.choice(list(TOPICS.values())).split(), 3)) for _ in range(args.queries)]
+    timings = []
+    for question in questions:
+        start = time.perf_counter()
+        index.search(question)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    print(f"⚡ search() p50 {np.percentile(timings, 50):.2f} ms | p99 {np.percentile(timings, 99):.2f} ms")
+
+    if not args.pdf:
+        hits = 0
+        for topic, words in TOPICS.items():
+            results = index.search(" ".join(words.split()[:3]), top_k=5)
+            hits += np.mean([sum(w in words.split() for w in p["text"].split()) > 3 for _, p in results]) if results else 0
+        print(f"🎯 Synthetic precision@5 (passage dominated by the asked topic): {hits / len(TOPICS):.2f}")
+
+    for question in args.question:
+        print(f"\n❓ {question}")
+        for score, passage in index.search(question):
+            print(f"  [{score:.3f}] page {passage['page']}: {passage['text'][:160]}...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# ESG 報告全文檢索（FTS5）延遲 benchmark：在暫存 DB 建立大量報告後量測查詢時間
+# 用法：python test/bench_report_search.py --reports 2000 --pages 20
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_utils import esg_report_db_utils as db
+
+EN_WORDS = [
+    "carbon", "emission", "governance", "board", "water", "energy", "diversity",
+    "supply", "chain", "safety", "renewable", "scope", "waste", "climate", "ethics"
+]
+ZH_SENTENCES = [
+    "本公司致力於減少溫室氣體排放並推動再生能源使用",
+    "董事會定期檢視永續發展策略與風險管理",
+    "供應鏈管理納入人權與勞動條件評估",
+]
+QUERIES = ["renewable", "carbon emission", "溫室氣體", "供應鏈", "風險管理 board", "nonexistentterm"]
+
+def main():
+    parser = argparse.ArgumentParser(description="ESG report full-text search benchmark")
+    parser.add_argument("--reports", type=int, default=2000, help="Number of synthetic reports")
+    parser.add_argument("--pages", type=int, default=20, help="Pages per report")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetitions per query")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.ESG_DB_PATH = os.path.join(tmp_dir, "esg_reports.db")
+        company_id = db.insert_or_get_company_id("Benchmark Co", "Benchmark Industry", "en")
+
+        start = time.perf_counter()
+        for year in range(args.reports):
+            pages = []
+            for _ in range(args.pages):
+                page = " ".join(random.choice(EN_WORDS) for _ in range(200))
+                pages.append(page + " " + random.choice(ZH_SENTENCES))
+            db.insert_esg_report_by_id(company_id, year, "\n\n".join(pages))
+        print(f"📥 Indexed {args.reports} reports × {args.pages} pages in {time.perf_counter() - start:.1f}s")
+
+        for query in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                results = db.search_esg_reports(query, limit=20)
+                timings.append(time.perf_counter() - start)
+            timings.sort()
+            print(
+                f"🔎 {query!r:24s} → {len(results):2d} hits | "
+                f"p50 {timings[len(timings) // 2] * 1000:.1f} ms | max {timings[-1] * 1000:.1f} ms"
+            )
+
+        db.get_esg_db_pool().close_all()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# NumPy SGNS（qa_utils/Word2vec/negative_sampling.py）vs gensim Skip-gram 的 benchmark：
+# 在 Brown corpus 上比較訓練時間，以及兩個模型對高頻詞的 top-10 近鄰重疊率（同樣的語料與參數）
+# 用法：python test/bench_sgns.py --sentences 20000 --epochs 3 --workers 1
+#      python test/bench_sgns.py --synthetic   （沒有 NLTK brown 時使用合成語料）
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from gensim.models import Word2Vec
+
+from lib.nltk_resources import ensure_nltk_resources
+from qa_utils.Word2vec.negative_sampling import train_sgns
+
+def synthetic_corpus(sentences, topics=50, words_per_topic=40, length=12, seed=0):
+    """每句只取自同一個主題的詞：同主題的詞應該互為近鄰"""
+    rng = random.Random(seed)
+    vocab = [[f"t{t}w{i}" for i in range(words_per_topic)] for t in range(topics)]
+    return [rng.sample(vocab[rng.randrange(topics)], length) for _ in range(sentences)]
+
+def neighbour_overlap(kv_a, kv_b, words, topn=10):
+    overlaps = []
+    for word in words:
+        a = {w for w, _ in kv_a.most_similar(word, topn=topn)}
+        b = {w for w, _ in kv_b.most_similar(word, topn=topn)}
+        overlaps.append(len(a & b) / topn)
+    return float(np.mean(overlaps))
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy SGNS vs gensim Skip-gram benchmark")
+    parser.add_argument("--sentences", type=int, default=20000, help="Number of sentences to use (0 = all)")
+    parser.add_argument("--synthetic", action="store_true", help="Use a synthetic topic corpus instead of Brown")
+    parser.add_argument("--vector-size", type=int, default=100)
+    parser.add_argument("--window", type=int, default=5)
+    parser.add_argument("--negative", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--min-count", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="Hogwild processes / gensim threads")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        corpus = synthetic_corpus(args.sentences or 20000)
+        name = "synthetic"
+    else:
+        if ensure_nltk_resources("brown", "stopwords"):
+            parser.error("NLTK brown / stopwords not available; run `python lib/nltk_resources.py brown stopwords --download` or pass --synthetic")
+        from qa_utils.Word2vec.pretrained import BrownCorpus
+        corpus = list(BrownCorpus())  # 同一份 token list 給兩個 trainer，斷詞時間不列入比較
+        if args.sentences:
+            corpus = corpus[:args.sentences]
+        name = "Brown"
+    tokens = sum(len(s) for s in corpus)
+    print(f"📚 {name}: {len(corpus)} sentences, {tokens} tokens")
+
+    params = dict(vector_size=args.vector_size, window=args.window, negative=args.negative,
+                  epochs=args.epochs, min_count=args.min_count)
+
+    start = time.perf_counter()
+    gensim_model = Word2Vec(corpus, sg=1, hs=0, workers=args.workers, seed=1, **params)
+    gensim_seconds = time.perf_counter() - start
+    print(f"🐍 gensim (C)      {gensim_seconds:6.1f}s | {tokens * args.epochs / gensim_seconds:10,.0f} words/s")
+
+    result = train_sgns(corpus, workers=args.workers, batch_size=args.batch_size, **params)
+    print(
+        f"🧮 NumPy SGNS      {result['seconds']:6.1f}s | {tokens * args.epochs / result['seconds']:10,.0f} words/s | "
+        f"{result['pairs'] / result['seconds']:,.0f} pairs/s | loss/epoch {np.round(result['losses'], 3).tolist()}"
+    )
+
+    frequent = gensim_model.wv.index_to_key[:100]
+    overlap = neighbour_overlap(result["kv"], gensim_model.wv, frequent)
+    print(f"🤝 Top-10 neighbour overlap with gensim on the 100 most frequent words: {overlap:.2f}")
+    if args.synthetic:
+        topic_hits = np.mean([
+            np.mean([w.split("w")[0] == word.split("w")[0] for w, _ in result["kv"].most_similar(word, topn=10)])
+            for word in frequent
+        ])
+        print(f"🎯 NumPy SGNS same-topic precision@10: {topic_hits:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# 詞向量相似度查詢 benchmark：gensim most_similar（brute-force）vs SimilarityIndex 精確搜尋 / batch / LSH，
+# 並計算 LSH 相對於精確搜尋的 recall@k
+# 用法：python test/bench_similarity.py --vocab 200000 --dim 200
+#      python test/bench_similarity.py --kv models/word2vec/esg/versions/v0001/vectors.kv
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from gensim.models import KeyedVectors
+
+from qa_utils.Word2vec.similarity import SimilarityIndex
+
+def synthetic_keyed_vectors(vocab, dim, clusters=500, seed=0):
+    """有群聚結構的隨機向量（純隨機向量之間的相似度都差不多，無法反映真實的 recall）"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, vocab)] + 0.6 * rng.standard_normal((vocab, dim)).astype(np.float32)
+    kv = KeyedVectors(vector_size=dim)
+    kv.add_vectors([f"w{i}" for i in range(vocab)], vectors)
+    return kv
+
+def timed(fn, queries):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return results, timings[len(timings) // 2] * 1000, sum(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Word similarity latency / recall benchmark")
+    parser.add_argument("--kv", default=None, help="Saved KeyedVectors to benchmark (default: synthetic)")
+    parser.add_argument("--vocab", type=int, default=200000, help="Synthetic vocabulary size")
+    parser.add_argument("--dim", type=int, default=200, help="Synthetic vector size")
+    parser.add_argument("--queries", type=int, default=200, help="Number of query words")
+    parser.add_argument("--topn", type=int, default=10, help="Neighbours per query")
+    args = parser.parse_args()
+
+    if args.kv:
+        kv = KeyedVectors.load(args.kv, mmap="r")
+    else:
+        kv = synthetic_keyed_vectors(args.vocab, args.dim)
+    rng = np.random.default_rng(1)
+    queries = [kv.index_to_key[i] for i in rng.choice(len(kv), size=min(args.queries, len(kv)), replace=False)]
+    print(f"📐 {len(kv)} words × {kv.vector_size} dims, {len(queries)} queries, top {args.topn}")
+
+    start = time.perf_counter()
+    exact_index = SimilarityIndex(kv, use_ann=False)
+    print(f"🧱 Normalized matrix built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    ann_index = SimilarityIndex(kv, use_ann=True)
+    print(f"🧱 Normalized matrix + LSH built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    _, p50, total = timed(lambda q: kv.most_similar(q, topn=args.topn), queries)
+    print(f"🐢 gensim most_similar      p50 {p50:7.2f} ms | total {total:8.0f} ms")
+
+    exact, p50, total = timed(lambda q: exact_index.most_similar(q, topn=args.topn), queries)
+    print(f"🎯 exact (normalized)       p50 {p50:7.2f} ms | total {total:8.0f} ms")
+
+    exact_index._cache.clear()
+    start = time.perf_counter()
+    for offset in range(0, len(queries), 64):
+        exact_index.most_similar_batch(queries[offset:offset + 64], topn=args.topn)
+    print(f"📦 exact batched (64/call)  total {(time.perf_counter() - start) * 1000:8.0f} ms")
+
+    _, p50, total = timed(lambda q: exact_index.most_similar(q, topn=args.topn), queries)
+    print(f"♻️ cached repeat            p50 {p50:7.3f} ms | total {total:8.1f} ms")
+
+    exact_sets = [{word for word, _ in hits} for hits in exact]
+    for probes in (0, 1):
+        ann, p50, total = timed(lambda q: ann_index.most_similar(q, topn=args.topn, probes=probes), queries)
+        recall = np.mean([len(truth & {word for word, _ in hits}) / max(len(truth), 1) for truth, hits in zip(exact_sets, ann)])
+        print(f"⚡ LSH probes={probes}           p50 {p50:7.2f} ms | total {total:8.0f} ms | recall@{args.topn} {recall:.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# 檢查 esg_reports.db 主要查詢的 EXPLAIN QUERY PLAN，確認都走 index 而不是全表掃描
+# 用法：python test/explain_esg_queries.py（在暫存 DB 上建立最新 schema 後檢查，失敗時 exit code 1）
+import os
+import sys
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from db_utils import esg_report_db_utils as db
+
+# (說明, SQL, 參數, query plan 中必須出現的 index 名稱)
+QUERY_PLAN_CHECKS = [
+    (
+        "Report dedupe lookup by (company_id, report_year)",
+        "SELECT 1 FROM ESG_Report WHERE company_id = ? AND report_year = ?",
+        (1, 2024),
+        "idx_esg_report_company_year",
+    ),
+    (
+        "Company lookup by English name",
+        "SELECT company_id FROM Company WHERE company_name_en = ?",
+        ("TSMC",),
+        "idx_company_name_en",
+    ),
+    (
+        "Case-insensitive company lookup by English name",
+        "SELECT company_id FROM Company WHERE company_name_en = ? COLLATE NOCASE",
+        ("tsmc",),
+        "idx_company_name_en_nocase",
+    ),
+    (
+        "Industry lookup by English name",
+        "SELECT industry_id FROM Industry WHERE industry_name_en = ?",
+        ("Semiconductor",),
+        "idx_industry_name_en",
+    ),
+    (
+        "Companies of one industry",
+        "SELECT company_name_en, company_name_zh FROM Company WHERE industry_id = ?",
+        (1,),
+        "idx_company_industry",
+    ),
+    (
+        "Company → industry JOIN lookup (find_industry_by_company)",
+        """
+            SELECT Industry.industry_name_zh, Industry.industry_name_en
+            FROM Company
+            JOIN Industry ON Company.industry_id = Industry.industry_id
+            WHERE Company.company_id = COALESCE(
+                (SELECT company_id FROM Company WHERE company_name_zh = ?),
+                (SELECT MIN(company_id) FROM Company WHERE company_name_en = ? COLLATE NOCASE)
+            )
+        """,
+        ("台積電", "tsmc"),
+        "idx_company_name_en_nocase",
+    ),
+    (
+        "Paged report listing (query_esg_reports)",
+        """
+            SELECT ESG_Report.report_id, ESG_Report.report_year, ESG_Report.preview
+            FROM ESG_Report
+            JOIN Company ON ESG_Report.company_id = Company.company_id
+            JOIN Industry ON Company.industry_id = Industry.industry_id
+            ORDER BY ESG_Report.report_year DESC, ESG_Report.report_id DESC
+            LIMIT ? OFFSET ?
+        """,
+        (20, 0),
+        "idx_esg_report_year",
+    ),
+]
+
+def explain(conn, sql, params):
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[-1] for row in rows]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.ESG_DB_PATH = os.path.join(tmp_dir, "esg_reports.db")
+        version = db.init_esg_report_db()
+        print(f"📦 Schema version: {version}")
+
+        with db.get_esg_db_pool().connection() as conn:
+            for description, sql, params, expected_index in QUERY_PLAN_CHECKS:
+                plan = explain(conn, sql, params)
+                ok = any(expected_index in step for step in plan)
+                failures += 0 if ok else 1
+                print(f"\n{'✅' if ok else '❌'} {description}")
+                for step in plan:
+                    print(f"   {step}")
+
+        db.get_esg_db_pool().close_all()
+
+    if failures:
+        print(f"\n❌ {failures} query plan check(s) failed.")
+        sys.exit(1)
+    print("\n✅ All query plans use the expected indexes.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# App 冷啟動 import 時間 profiler：在乾淨的 subprocess 以 `python -X importtime` import streamlit_app，
+# 列出最花時間的模組，並檢查（1）總時間不超過預算（2）重量級套件沒有在啟動時被載入
+# 用法：python test/profile_startup.py --top 25 --budget 2.5
+# 超過預算或載入了重量級套件時 exit code 為 1（可放進 CI 當作啟動時間的回歸檢查）
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+STARTUP_IMPORT_BUDGET = float(os.environ.get("STARTUP_IMPORT_BUDGET", 2.5))  # 秒
+
+# 只應在使用到對應功能時才載入的套件
+LAZY_MODULES = [
+    "openai", "autogen", "nltk", "gensim", "sklearn", "wordcloud", "matplotlib",
+    "ckip_transformers", "transformers", "torch", "fitz", "pymupdf",
+    "agents.gemini_agent", "agents.two_agents",
+    "qa_utils.Word2vec.view_2d", "qa_utils.Word2vec.view_3d", "qa_utils.Word2vec.cbow_skipgram",
+    "ui_utils.esg_reports_section", "tools.twse_webscraper",
+]
+
+_CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 的輸出
+
+    Returns:
+        list[dict]: {"module", "self_ms", "cumulative_ms", "depth"}
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": depth
+        })
+    return rows
+
+def profile_import(module="streamlit_app"):
+    """在新的 python process import module（不共用已載入的模組），回傳 import 時間與已載入模組"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE.format(module=module)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    payload = json.loads(result.stdout.strip().splitlines()[-1])
+    return payload["elapsed"], set(payload["modules"]), parse_importtime(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit app cold-start import profiler")
+    parser.add_argument("--module", default="streamlit_app", help="Module to import")
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest imports to show")
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_BUDGET, help="Cold-start budget in seconds")
+    parser.add_argument("--runs", type=int, default=3, help="Take the best of N runs (less noise)")
+    args = parser.parse_args()
+
+    runs = [profile_import(args.module) for _ in range(max(args.runs, 1))]
+    elapsed, modules, rows = min(runs, key=lambda run: run[0])
+
+    print(f"⏱️ import {args.module}: {elapsed:.3f}s (best of {len(runs)}, budget {args.budget:.2f}s)\n")
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for row in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {'  ' * row['depth']}{row['module']}")
+
+    # 專案內模組（直接 import 的第三方套件算在各自的 cumulative 裡）
+    print("\n📦 Project modules:")
+    project_modules = {
+        name.removesuffix(".py") for name in os.listdir(REPO_ROOT)
+        if name.endswith(".py") or os.path.isdir(os.path.join(REPO_ROOT, name))
+    }
+    for row in sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True):
+        if row["module"].split(".")[0] in project_modules:
+            print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {row['module']}")
+
+    failures = []
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        failures.append(f"loaded at startup (should be lazy): {', '.join(eager)}")
+    if elapsed > args.budget:
+        failures.append(f"cold start {elapsed:.3f}s exceeds budget {args.budget:.2f}s")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Cold start within budget and heavy modules are loaded lazily.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# TWSE 爬蟲的 replay 測試：以 http.server 在本機提供 test/fixtures/twse/ 的產業別頁面（Big5，與 TWSE 相同的表格結構），
+# 不連網驗證頁面解析、ETag / 304，以及 refresh_twse_data 的增量更新（新增 / 更名 / 下市 / 未變動略過 / 部分失敗）
+# - v1/、v2/：同一組產業在兩個時間點的頁面，v2 有一家更名、一家新上市、一家下市
+# - 資料寫到暫存的 esg_reports.db，不影響 db/ 內的資料
+# 用法：python test/replay_twse_fixtures.py
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db_utils.esg_report_db_utils as esg_db
+import tools.twse_webscraper as twse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "twse")
+INDUSTRY_CODES = ["01", "02"]
+PATH_LANGS = {"/isin/class_main.jsp": "zh", "/isin/e_class_main.jsp": "en"}
+
+class TwseFixtureHandler(BaseHTTPRequestHandler):
+    """以 server.fixture_set 目錄下的 <lang>_<industry_code>.html 回應；server.failures 中的頁面回 404"""
+
+    def do_POST(self):
+        lang = PATH_LANGS.get(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        industry_code = parse_qs(self.rfile.read(length).decode("ascii")).get("industry_code", [""])[0]
+        self.server.requests.append((industry_code, lang))
+
+        path = os.path.join(FIXTURE_DIR, self.server.fixture_set, f"{lang}_{industry_code}.html")
+        if lang is None or (industry_code, lang) in self.server.failures or not os.path.exists(path):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=big5")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TwseFixtureHandler)
+    server.fixture_set = "v1"
+    server.failures = set()
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    twse.TWSE_ZH_URL = f"{base_url}/isin/class_main.jsp"
+    twse.TWSE_EN_URL = f"{base_url}/isin/e_class_main.jsp"
+    return server
+
+def company_names():
+    with esg_db.get_esg_db_pool().connection() as conn:
+        rows = conn.execute("SELECT stock_code, company_name_zh FROM Company WHERE stock_code IS NOT NULL").fetchall()
+    return dict(rows)
+
+failures = []
+
+def check(condition, message):
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        failures.append(message)
+
+def refresh(server, fixture_set, full=False):
+    server.fixture_set = fixture_set
+    server.requests.clear()
+    return twse.refresh_twse_data(full=full, min_interval=0, industry_codes=INDUSTRY_CODES)
+
+def main():
+    tmp_dir = tempfile.mkdtemp(prefix="twse_replay_")
+    esg_db.ESG_DB_PATH = os.path.join(tmp_dir, "esg_reports.db")
+    server = start_fixture_server()
+    try:
+        # 1. 解析與 ETag
+        session = twse.create_twse_session()
+        snapshot = twse.fetch_twse_industry_snapshot(session, twse.TWSE_ZH_URL, "01")
+        check(
+            snapshot["rows"] == [
+                {"stock_code": "1101", "company_name": "台泥", "industry": "水泥工業"},
+                {"stock_code": "1102", "company_name": "亞泥", "industry": "水泥工業"}
+            ],
+            "Big5 zh page is parsed into stock code / name / industry rows"
+        )
+        english = twse.fetch_twse_industry_snapshot(session, twse.TWSE_EN_URL, "02")
+        check([row["company_name"] for row in english["rows"]] == ["WEI-CHUAN", "VE WONG"], "en page is parsed")
+        again = twse.fetch_twse_industry_snapshot(session, twse.TWSE_ZH_URL, "01", etag=snapshot["etag"])
+        check(again["rows"] is None and again["etag"] == snapshot["etag"], "matching ETag returns 304 without re-parsing")
+
+        # 2. 第一次完整更新
+        stats = refresh(server, "v1", full=True)
+        check(stats["inserted"] == 4 and stats["refreshed_industries"] == 2, f"full refresh inserts 4 companies ({stats})")
+        check(company_names() == {"1101": "台泥", "1102": "亞泥", "1201": "味全", "1203": "味王"}, "companies stored by stock code")
+
+        # 3. 頁面沒變：全部 304，略過所有產業
+        stats = refresh(server, "v1")
+        check(
+            stats["skipped_industries"] == 2 and stats["inserted"] == stats["updated"] == stats["removed"] == 0,
+            f"unchanged pages are skipped ({stats})"
+        )
+
+        # 4. 部分失敗：01 的中文頁面已更新（台泥 → 台灣水泥）但英文頁面失敗，這個產業不能寫入也不能記下新狀態
+        server.failures = {("01", "en")}
+        stats = refresh(server, "v2")
+        server.failures = set()
+        check(stats["failed_industries"] == 1, f"industry with a failed language is reported as failed ({stats})")
+        check(company_names()["1101"] == "台泥", "failed industry is not upserted")
+        fetch_states = esg_db.get_twse_fetch_states()
+        check(
+            fetch_states[("01", "zh")]["content_hash"] != twse.fetch_twse_industry_snapshot(session, twse.TWSE_ZH_URL, "01")["content_hash"],
+            "failed industry keeps its previous fetch state"
+        )
+        # 02 已在這次更新（1203 下市），重設資料讓下一步以完整的 v1 → v2 差異驗證
+        refresh(server, "v1", full=True)
+
+        # 5. 更名 / 新上市 / 下市（部分失敗後的下一次更新仍會補上 01 的更名）
+        stats = refresh(server, "v2")
+        check(
+            (stats["inserted"], stats["updated"], stats["removed"]) == (1, 1, 1),
+            f"v2 diff is 1 added, 1 renamed, 1 removed ({stats})"
+        )
+        check(company_names() == {"1101": "台灣水泥", "1102": "亞泥", "1108": "幸福", "1201": "味全"}, "v2 companies stored")
+        changes = esg_db.get_company_change_log(limit=10)
+        check(
+            sorted(changes["change_type"].head(3)) == ["added", "removed", "updated"],
+            "Company_Change_Log records the added / updated / removed companies"
+        )
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\n✅ All TWSE replay checks passed")
+
+if __name__ == "__main__":
+    main()
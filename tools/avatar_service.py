@@ -0,0 +1,122 @@
+# 頭像圖片服務：儲存 profile 時驗證 URL 並下載一次，之後從本機快取（TTL）提供圖片，
+# sidebar 每次 rerun 不再對外發 HTTP request
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+DEFAULT_AVATAR_URL = "https://www.w3schools.com/howto/img_avatar.png"
+AVATAR_CACHE_DIR = os.path.join("db", "avatar_cache")
+AVATAR_CACHE_TTL_SECONDS = 24 * 60 * 60
+AVATAR_RETRY_SECONDS = 10 * 60  # 下載失敗後多久內不再重試
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+AVATAR_FETCH_TIMEOUT = 5
+
+_memory_cache = {}  # url → {"image": bytes | None, "checked_at": float}
+_cache_lock = threading.Lock()
+
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(AVATAR_CACHE_DIR, f"{key}.img"), os.path.join(AVATAR_CACHE_DIR, f"{key}.json")
+
+def fetch_avatar(url, timeout=AVATAR_FETCH_TIMEOUT):
+    """
+    下載圖片並確認是 image/*
+
+    Returns:
+        bytes: 圖片內容
+
+    Raises:
+        ValueError: URL 無法取得或不是圖片
+    """
+    if not url or not url.startswith(("http://", "https://")):
+        raise ValueError("Avatar URL must start with http:// or https://")
+    try:
+        response = requests.get(url, timeout=timeout, stream=True)
+    except requests.RequestException as e:
+        raise ValueError(f"Unable to fetch avatar: {e}") from e
+
+    with response:
+        if response.status_code != 200:
+            raise ValueError(f"Avatar URL returned HTTP {response.status_code}")
+        content_type = response.headers.get("Content-Type", "")
+        if "image" not in content_type:
+            raise ValueError(f"Avatar URL is not an image (Content-Type: {content_type or 'unknown'})")
+        image = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            image.extend(chunk)
+            if len(image) > AVATAR_MAX_BYTES:
+                raise ValueError(f"Avatar image is larger than {AVATAR_MAX_BYTES // (1024 * 1024)} MB")
+    return bytes(image)
+
+def _write_cache(url, image):
+    os.makedirs(AVATAR_CACHE_DIR, exist_ok=True)
+    image_path, meta_path = _cache_paths(url)
+    with open(image_path, "wb") as f:
+        f.write(image)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"url": url, "fetched_at": time.time(), "size": len(image)}, f)
+
+def _read_cache(url):
+    """Returns: (bytes | None, fetched_at | None)"""
+    image_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(image_path, "rb") as f:
+            return f.read(), meta["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def validate_avatar_url(url):
+    """
+    儲存 profile 前呼叫：下載並快取圖片
+
+    Returns:
+        tuple[bool, str]: (是否可用, 錯誤訊息)
+    """
+    try:
+        image = fetch_avatar(url)
+    except ValueError as e:
+        return False, str(e)
+    _write_cache(url, image)
+    with _cache_lock:
+        _memory_cache[url] = {"image": image, "checked_at": time.time()}
+    return True, ""
+
+def get_avatar_image(url):
+    """
+    sidebar 用：回傳快取的圖片 bytes（快取過期才重新下載；下載失敗時沿用舊圖，並在 AVATAR_RETRY_SECONDS 內不再重試）
+
+    Returns:
+        bytes | None: 無法取得時為 None
+    """
+    if not url:
+        return None
+    now = time.time()
+    with _cache_lock:
+        cached = _memory_cache.get(url)
+    if cached and now - cached["checked_at"] < (AVATAR_CACHE_TTL_SECONDS if cached["image"] else AVATAR_RETRY_SECONDS):
+        return cached["image"]
+
+    image, fetched_at = _read_cache(url)
+    if image is None or now - fetched_at >= AVATAR_CACHE_TTL_SECONDS:
+        try:
+            image = fetch_avatar(url)
+            _write_cache(url, image)
+        except ValueError as e:
+            print(f"⚠️ Avatar refresh failed for {url}: {e}")
+            # 舊的快取仍可使用；只是在 AVATAR_RETRY_SECONDS 後再試一次
+            with _cache_lock:
+                _memory_cache[url] = {
+                    "image": image,
+                    "checked_at": now - AVATAR_CACHE_TTL_SECONDS + AVATAR_RETRY_SECONDS if image else now
+                }
+            return image
+        fetched_at = now
+
+    with _cache_lock:
+        _memory_cache[url] = {"image": image, "checked_at": fetched_at}
+    return image
@@ -0,0 +1,278 @@
+# 批次匯入 ESG 報告 PDF：多 process 平行解析（PyMuPDF）→ 語言偵測 / metadata 擷取 → 分批寫入 esg_reports.db
+# CLI 入口見 db_utils/ingest_esg_pdfs.py
+import csv
+import hashlib
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+from lib.pdf_text import detect_text_language, sample_pdf_text, extract_page_content
+from db_utils.esg_report_db_utils import (
+    init_esg_report_db,
+    get_all_companies,
+    get_industry_by_company,
+    get_ingested_file_hashes,
+    ingest_esg_report_batch
+)
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_INDUSTRY = "Unclassified"
+METADATA_SAMPLE_PAGES = 3
+
+_year_re = re.compile(r"(?<!\d)(19[89]\d|20\d{2})(?!\d)")
+_roc_year_re = re.compile(r"(?:民國|中華民國)?\s*(1[01]\d)\s*年")
+_locale_suffix_re = re.compile(r"[_-][a-z]{2}(?:[_-][a-z]{2})?$", re.IGNORECASE)
+
+def file_sha256(path, chunk_size=1 << 20):
+    """PDF 檔案本身的 SHA-256（判斷檔案是否已處理過，不需要先解析）"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def find_pdf_files(directory, recursive=True):
+    pattern = "**/*.pdf" if recursive else "*.pdf"
+    return sorted(str(path) for path in Path(directory).glob(pattern) if path.is_file())
+
+def parse_pdf_file(path, include_tables=True):
+    """
+    在 worker process 中解析一份 PDF（不碰 DB、不用 Streamlit）
+
+    Returns:
+        dict: source_path, pages, page_texts, language, content, sample_text, pdf_metadata, parse_seconds；失敗時帶 error
+    """
+    start = time.perf_counter()
+    try:
+        with fitz.open(path) as doc:
+            pages = []
+            for page in doc:
+                try:
+                    pages.append(extract_page_content(page, include_tables=include_tables))
+                except Exception as e:
+                    print(f"(parse_pdf_file) Error processing page {page.number + 1} of {path}: {e}")
+                    pages.append("")
+            sample_text = sample_pdf_text(doc, max_pages=10)
+            return {
+                "source_path": path,
+                "pages": len(pages),
+                # 與上傳頁面相同：各頁以 "\n\n" 串接；全文檢索的頁碼以 page_texts 為準（空白頁也保留）
+                "content": "\n\n".join(pages),
+                "page_texts": pages,
+                "language": detect_text_language(sample_text),
+                "sample_text": sample_pdf_text(doc, max_pages=METADATA_SAMPLE_PAGES),
+                "pdf_metadata": doc.metadata or {},
+                "parse_seconds": time.perf_counter() - start
+            }
+    except Exception as e:
+        return {"source_path": path, "pages": 0, "error": f"{type(e).__name__}: {e}", "parse_seconds": time.perf_counter() - start}
+
+def load_manifest(path):
+    """
+    讀取 metadata manifest（CSV，欄位：file, company_name, industry, report_year；file 可為檔名或路徑）
+
+    Returns:
+        dict: {檔名: {"company_name": ..., "industry": ..., "report_year": ...}}
+    """
+    manifest = {}
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            manifest[os.path.basename(row["file"])] = {
+                key: (row.get(key) or "").strip() or None
+                for key in ["company_name", "industry", "report_year"]
+            }
+    return manifest
+
+def guess_report_year(source_path, sample_text, pdf_metadata):
+    """檔名中的年份 → 前幾頁出現最多次的年份（含民國年）→ PDF 建立日期"""
+    match = _year_re.search(os.path.basename(source_path))
+    if match:
+        return int(match.group(1))
+
+    years = Counter(int(year) for year in _year_re.findall(sample_text))
+    years.update(int(year) + 1911 for year in _roc_year_re.findall(sample_text))
+    if years:
+        return years.most_common(1)[0][0]
+
+    match = _year_re.search(pdf_metadata.get("creationDate") or "")
+    return int(match.group(1)) if match else None
+
+def guess_company(sample_text, language, companies):
+    """在前幾頁找出已知公司名稱（取最長的符合名稱，避免「台泥」比對到「台泥綠能」之類的情況）"""
+    column = "company_name_zh" if language == "chinese" else "company_name_en"
+    names = [name for name in companies[column].dropna().tolist() if len(name) >= 2]
+    haystack = sample_text if language == "chinese" else sample_text.lower()
+    matched = [name for name in names if (name if language == "chinese" else name.lower()) in haystack]
+    return max(matched, key=len) if matched else None
+
+def company_from_filename(source_path):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    stem = _locale_suffix_re.sub("", stem)
+    stem = _year_re.sub("", stem)
+    words = [word for word in re.split(r"[\s_\-]+", stem) if word]
+    return " ".join(word if not word.islower() else word.capitalize() for word in words) or stem
+
+def resolve_report_metadata(parsed, manifest=None, defaults=None, companies=None):
+    """
+    決定公司 / 產業 / 年份：manifest → CLI 預設值 → 從內容比對已知公司與年份 → 檔名
+
+    Returns:
+        dict: company_name, industry, report_year, language ('zh' / 'en')
+    """
+    defaults = defaults or {}
+    entry = (manifest or {}).get(os.path.basename(parsed["source_path"]), {})
+    language = "zh" if parsed["language"] == "chinese" else "en"
+
+    company_name = entry.get("company_name") or defaults.get("company_name")
+    if not company_name and companies is not None:
+        company_name = guess_company(parsed["sample_text"], parsed["language"], companies)
+    if not company_name:
+        company_name = company_from_filename(parsed["source_path"])
+
+    industry = entry.get("industry") or defaults.get("industry")
+    if not industry:
+        matched = get_industry_by_company(company_name)
+        if matched:
+            industry = matched["industry_name_zh"] if language == "zh" else matched["industry_name_en"]
+    industry = industry or DEFAULT_INDUSTRY
+
+    report_year = entry.get("report_year") or defaults.get("report_year")
+    if not report_year:
+        report_year = guess_report_year(parsed["source_path"], parsed["sample_text"], parsed["pdf_metadata"])
+    report_year = int(report_year) if report_year else None
+    if report_year and report_year < 1900:
+        report_year += 1911
+
+    return {"company_name": company_name, "industry": industry, "report_year": report_year, "language": language}
+
+def _print_stage(label, count, unit, seconds, extra=""):
+    rate = count / seconds if seconds > 0 else 0.0
+    print(f"   {label:6s}: {count} {unit} in {seconds:.2f}s → {rate:,.1f} {unit}/s{extra}")
+
+def ingest_pdf_directory(directory, workers=None, batch_size=DEFAULT_BATCH_SIZE, manifest_path=None,
+                         defaults=None, include_tables=True, recursive=True, force=False, progress_callback=None,
+                         mp_context=None):
+    """
+    將資料夾中的 PDF 批次匯入 esg_reports.db。
+    已處理過的檔案（PDF_Ingest_Log 以檔案 hash 記錄）會直接跳過，中斷後重跑即可續傳（失敗的檔案會重試）；
+    內容 hash 與既有報告相同的檔案會記為 duplicate 而不重複寫入。
+
+    Args:
+        directory (str): PDF 資料夾
+        workers (int): 解析用的 process 數；None 時為 CPU 數
+        batch_size (int): 每個寫入交易包含的報告數
+        manifest_path (str): metadata manifest CSV（見 load_manifest）
+        defaults (dict): 沒有 manifest 時使用的 company_name / industry / report_year
+        include_tables (bool): 是否以 PyMuPDF 擷取表格（較慢，但與上傳頁面內容一致）
+        recursive (bool): 是否包含子資料夾
+        force (bool): 忽略 PDF_Ingest_Log 重新解析所有檔案（內容已存在的仍會記為 duplicate）
+        progress_callback (callable): progress_callback(done, total, file_name)，每解析完一個檔案呼叫一次
+        mp_context: 解析用 process pool 的 multiprocessing context（None 時使用平台預設）
+
+    Returns:
+        dict: 各階段的數量與耗時
+    """
+    init_esg_report_db()
+    manifest = load_manifest(manifest_path) if manifest_path else {}
+    companies = get_all_companies()
+    stats = {"files": 0, "skipped": 0, "ingested": 0, "duplicate": 0, "failed": 0, "pages": 0, "bytes": 0}
+    timings = {"hash": 0.0, "parse": 0.0, "write": 0.0}
+    total_start = time.perf_counter()
+
+    # Stage 1: 以檔案 hash 找出還沒處理過的 PDF
+    start = time.perf_counter()
+    done_hashes = set() if force else get_ingested_file_hashes()
+    pending = []
+    for path in find_pdf_files(directory, recursive=recursive):
+        file_hash = file_sha256(path)
+        stats["files"] += 1
+        stats["bytes"] += os.path.getsize(path)
+        if file_hash in done_hashes:
+            stats["skipped"] += 1
+            continue
+        pending.append((path, file_hash))
+    timings["hash"] = time.perf_counter() - start
+    print(f"📂 {stats['files']} PDF files found, {stats['skipped']} already ingested, {len(pending)} to process.")
+
+    # Stage 2 + 3: 平行解析，每累積 batch_size 份就在一個交易中寫入（中斷時已寫入的批次會保留）
+    file_hashes = dict(pending)
+    batch = []
+
+    def flush():
+        write_start = time.perf_counter()
+        result = ingest_esg_report_batch(batch)
+        timings["write"] += time.perf_counter() - write_start
+        for key in ["ingested", "duplicate", "failed"]:
+            stats[key] += result[key]
+        print(f"💾 Batch written: {result['ingested']} ingested, {result['duplicate']} duplicate, {result['failed']} failed.")
+        batch.clear()
+
+    if pending:
+        parse_start = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=mp_context)
+        try:
+            paths = [path for path, _ in pending]
+            for done, parsed in enumerate(executor.map(parse_pdf_file, paths, [include_tables] * len(paths)), start=1):
+                item = {"file_hash": file_hashes[parsed["source_path"]], "source_path": parsed["source_path"]}
+                stats["pages"] += parsed["pages"]
+
+                if parsed.get("error"):
+                    item["error"] = parsed["error"]
+                else:
+                    metadata = resolve_report_metadata(parsed, manifest, defaults, companies)
+                    if metadata["report_year"] is None:
+                        item["error"] = "Report year could not be determined"
+                    else:
+                        item.update(metadata, content=parsed["content"], page_texts=parsed["page_texts"])
+                        print(
+                            f"📄 {os.path.basename(parsed['source_path'])}: {parsed['pages']} pages, "
+                            f"{parsed['language']} | {metadata['company_name']} / {metadata['industry']} / {metadata['report_year']}"
+                        )
+                if item.get("error"):
+                    print(f"❌ {parsed['source_path']}: {item['error']}")
+
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    flush()
+                if progress_callback:
+                    progress_callback(done, len(pending), os.path.basename(parsed["source_path"]))
+            if batch:
+                flush()
+        except BaseException:
+            # 中斷（例如背景工作被取消）：不再等待尚未開始的檔案，已寫入的批次會保留，重跑即可續傳
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        else:
+            executor.shutdown()
+        # 解析與寫入重疊進行，parse 時間扣除主 process 寫入所花的時間
+        timings["parse"] = time.perf_counter() - parse_start - timings["write"]
+
+    elapsed = time.perf_counter() - total_start
+    print(f"\n📊 Ingestion finished in {elapsed:.2f}s")
+    _print_stage("hash", stats["files"], "files", timings["hash"], f" ({stats['bytes'] / 1e6 / max(timings['hash'], 1e-9):,.1f} MB/s)")
+    _print_stage("parse", stats["pages"], "pages", timings["parse"])
+    _print_stage("write", stats["ingested"] + stats["duplicate"] + stats["failed"], "reports", timings["write"])
+    print(
+        f"   result: {stats['ingested']} ingested, {stats['duplicate']} duplicate, "
+        f"{stats['failed']} failed, {stats['skipped']} skipped"
+    )
+
+    stats.update({f"{stage}_seconds": seconds for stage, seconds in timings.items()})
+    stats["total_seconds"] = elapsed
+    return stats
+
+def run_pdf_ingest_job(context, directory, **options):
+    """背景工作：批次匯入 PDF，以已處理的檔案數回報進度；取消時停止（已寫入的批次保留）"""
+    context.report(0.0, f"Scanning {directory}...", force=True)
+
+    def report(done, total, file_name):
+        context.report(done / total, f"Parsed {done}/{total}: {file_name}")
+
+    # Streamlit server 是多執行緒 process，fork 出 worker 不安全，改用 spawn
+    return ingest_pdf_directory(directory, progress_callback=report, mp_context=multiprocessing.get_context("spawn"), **options)
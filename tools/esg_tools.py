@@ -3,7 +3,7 @@ from typing import Annotated
 from pdf_context import get_pdf_context
 
 def show_pdf_content():
-    pdf_content = st.session_state.get("pdf_text", "")
+    pdf_content = get_pdf_context()
     content = f"""
             🤖 Here's what I found from the uploaded PDF:\n
             {pdf_content}
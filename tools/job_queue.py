@@ -0,0 +1,173 @@
+# 長時間工作的背景執行（Gemini 分析、文字雲、Word2Vec 訓練、PDF 批次匯入）
+# - 以 process 內共用的 thread pool 執行，Streamlit script thread 只負責送出工作與輪詢狀態
+# - 狀態 / 進度 / 取消旗標寫在 db/jobs.db（見 db_utils/job_db_utils.py），結果物件留在記憶體
+# - 相同 job_key 的工作在執行中或結果仍在記憶體時不會重複執行
+import hashlib
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from db_utils.job_db_utils import (
+    ACTIVE_STATUSES,
+    insert_job,
+    find_jobs_by_key,
+    mark_job_running,
+    update_job_progress,
+    finish_job,
+    request_job_cancel,
+    get_job_row,
+    list_jobs
+)
+
+DEFAULT_MAX_WORKERS = 2
+RESULT_TTL_SECONDS = 60 * 60
+PROGRESS_MIN_INTERVAL = 0.5  # 進度寫入 DB 的最小間隔（秒）
+
+class JobCancelled(Exception):
+    """工作被使用者取消"""
+
+class JobContext:
+    """傳給工作函式的第一個參數：回報進度、檢查是否已被取消"""
+
+    def __init__(self, job_id, cancel_event):
+        self.job_id = job_id
+        self._cancel_event = cancel_event
+        self._last_report = 0.0
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def report(self, progress, message=None, force=False):
+        """progress 為 0~1；過於頻繁的更新會被略過，避免每一步都寫 DB"""
+        self.check_cancelled()
+        now = time.monotonic()
+        if force or progress >= 1.0 or now - self._last_report >= PROGRESS_MIN_INTERVAL:
+            self._last_report = now
+            update_job_progress(self.job_id, min(max(progress, 0.0), 1.0), message)
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}  # job_id -> {"future", "cancel_event", "result", "finished_at"}
+_jobs_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="job")
+        return _executor
+
+def make_job_key(job_type, payload):
+    """以工作類型 + 參數計算去重用的 key（大段文字只取 hash）"""
+    raw = json.dumps({"type": job_type, "payload": payload}, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _prune_results():
+    now = time.time()
+    with _jobs_lock:
+        expired = [
+            job_id for job_id, job in _jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > RESULT_TTL_SECONDS
+        ]
+        for job_id in expired:
+            del _jobs[job_id]
+
+def _run_job(job_id, fn, kwargs):
+    job = _jobs[job_id]
+    if not mark_job_running(job_id):
+        job["finished_at"] = time.time()
+        return
+
+    context = JobContext(job_id, job["cancel_event"])
+    try:
+        result = fn(context, **kwargs)
+        context.check_cancelled()
+    except JobCancelled:
+        finish_job(job_id, "cancelled", message="Cancelled")
+    except Exception as e:
+        print(f"❌ Job {job_id} failed: {e}")
+        finish_job(job_id, "failed", error=f"{type(e).__name__}: {e}\n\n{traceback.format_exc()}")
+    else:
+        job["result"] = result
+        finish_job(job_id, "succeeded", message="Done")
+    finally:
+        job["finished_at"] = time.time()
+
+def submit_job(job_type, fn, kwargs=None, dedup_payload=None, label=None, reuse_result=True):
+    """
+    送出背景工作；相同工作正在執行、或已完成且結果仍在記憶體時，直接回傳既有的 job_id
+
+    Args:
+        job_type (str): 工作類型（例如 "esg_analysis"）
+        fn (callable): fn(context: JobContext, **kwargs)，回傳值即為工作結果
+        kwargs (dict): 傳給 fn 的參數
+        dedup_payload: 判斷「相同工作」用的參數摘要；None 時使用 kwargs
+        label (str): 顯示在 UI 的說明
+        reuse_result (bool): False 時只合併執行中的相同工作，已完成的會重新執行
+
+    Returns:
+        str: job_id
+    """
+    kwargs = kwargs or {}
+    job_key = make_job_key(job_type, kwargs if dedup_payload is None else dedup_payload)
+    _prune_results()
+
+    with _jobs_lock:
+        statuses = ACTIVE_STATUSES + (("succeeded",) if reuse_result else ())
+        for existing in find_jobs_by_key(job_key, statuses):
+            job = _jobs.get(existing["job_id"])
+            if job is None:
+                continue  # 其他 process 或已過期的結果
+            if existing["status"] != "succeeded" or "result" in job:
+                return existing["job_id"]
+
+        job_id = uuid.uuid4().hex
+        insert_job(job_id, job_type, job_key, label)
+        _jobs[job_id] = {"cancel_event": threading.Event(), "finished_at": None}
+        _jobs[job_id]["future"] = _get_executor().submit(_run_job, job_id, fn, kwargs)
+    return job_id
+
+def get_job(job_id):
+    """工作狀態（DB）；完成且結果仍在記憶體時附上 result"""
+    row = get_job_row(job_id)
+    if row is None:
+        return None
+    job = _jobs.get(job_id)
+    row["has_result"] = bool(job and "result" in job)
+    if row["has_result"]:
+        row["result"] = job["result"]
+    return row
+
+def get_job_result(job_id, default=None):
+    job = _jobs.get(job_id)
+    return job.get("result", default) if job else default
+
+def cancel_job(job_id):
+    """
+    取消工作：排隊中的直接移除；執行中的會在下一次回報進度時停止
+
+    Returns:
+        bool: 取消請求是否有效
+    """
+    accepted = request_job_cancel(job_id)
+    job = _jobs.get(job_id)
+    if job:
+        job["cancel_event"].set()
+        if job.get("future") and job["future"].cancel():
+            # 還沒開始執行：_run_job 不會被呼叫，由這裡結束工作並移除
+            finish_job(job_id, "cancelled", message="Cancelled")
+            job["finished_at"] = time.time()
+            with _jobs_lock:
+                _jobs.pop(job_id, None)
+    return accepted
+
+def get_recent_jobs(limit=20, active_only=False):
+    return list_jobs(limit=limit, active_only=active_only)
@@ -1,100 +1,257 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import pandas as pd
-from time import sleep
-from db_utils.esg_report_db_utils import init_esg_report_db, insert_company
-import sqlite3
+from db_utils.esg_report_db_utils import (
+    init_esg_report_db,
+    get_twse_fetch_states,
+    upsert_twse_companies,
+    invalidate_dimension_cache
+)
 
-def fetch_twse_company_list(url, lang="zh"):
-    headers = {
+TWSE_ZH_URL = "https://isin.twse.com.tw/isin/class_main.jsp"
+TWSE_EN_URL = "https://isin.twse.com.tw/isin/e_class_main.jsp"
+TWSE_INDUSTRY_CODES = [f"{code:02d}" for code in range(1, 39)]
+TWSE_REFRESH_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db_utils", "init_twse_data.py")
+TWSE_REFRESH_LOG_PATH = "db/twse_refresh.log"
+
+_refresh_process = None
+_refresh_process_lock = threading.Lock()
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MIN_INTERVAL = 0.25  # 兩次請求之間至少間隔（秒），所有 thread 共用
+
+class RateLimiter:
+    """跨 thread 共用的簡單節流器：保證相鄰兩次請求的開始時間至少相隔 min_interval 秒"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = max(0.0, self._next_time - now)
+            self._next_time = max(now, self._next_time) + self.min_interval
+        if wait_time:
+            time.sleep(wait_time)
+
+def create_twse_session(pool_size=DEFAULT_MAX_WORKERS):
+    """建立共用連線的 requests.Session（keep-alive + 失敗重試）"""
+    session = requests.Session()
+    session.headers.update({
         "User-Agent": "Mozilla/5.0",
         "Content-Type": "application/x-www-form-urlencoded"
-    }
+    })
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=None)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def parse_twse_company_rows(html):
+    """解析 TWSE 產業別頁面的公司列表"""
+    soup = BeautifulSoup(html, "html.parser")
+    tables = soup.find_all("table")
+    if len(tables) < 2:
+        return []
 
     result = []
+    rows = tables[1].find_all("tr")[1:]
+    for row in rows:
+        cols = [td.get_text(strip=True) for td in row.find_all("td")]
+        if len(cols) >= 8:
+            result.append({
+                "stock_code": cols[2],
+                "company_name": cols[3],
+                "industry": cols[6]
+            })
+    return result
 
-    for code in range(1, 39):
-        payload = {
-            "market": "1",  # TWSE Listed
-            "industry_code": f"{code:02d}",
-            "Page": "1",
-            "chklike": "Y"
-        }
+def fetch_twse_industry_snapshot(session, url, industry_code, rate_limiter=None, etag=None, timeout=30):
+    """
+    抓取單一產業別頁面並解析
 
-        res = requests.post(url, headers=headers, data=payload)
-        res.encoding = "big5"
+    Args:
+        etag (str): 上次的 ETag；伺服器回 304 Not Modified 時不重新解析
 
-        soup = BeautifulSoup(res.text, "html.parser")
-        tables = soup.find_all("table")
-        if len(tables) < 2:
-            continue
-        rows = tables[1].find_all("tr")[1:]
-        for row in rows:
-            cols = [td.get_text(strip=True) for td in row.find_all("td")]
-            if len(cols) >= 8:
-                result.append({
-                    "company_name": cols[3],
-                    "industry": cols[6]
-                })
-        sleep(0.5)
-
-    return pd.DataFrame(result)
-
-def get_bilingual_twse_company_industry():
-    zh_url = "https://isin.twse.com.tw/isin/class_main.jsp"
-    en_url = "https://isin.twse.com.tw/isin/e_class_main.jsp"
-
-    zh_df = fetch_twse_company_list(zh_url, lang="zh")
-    en_df = fetch_twse_company_list(en_url, lang="en")
-
-    merged = pd.DataFrame({
-        "產業別中文": zh_df["industry"],
-        "產業別英文": en_df["industry"],
-        "公司名稱中文": zh_df["company_name"],
-        "公司名稱英文": en_df["company_name"]
-    })
+    Returns:
+        dict: {"rows": list | None（304 時為 None）, "content_hash": str | None, "etag": str | None}
+    """
+    payload = {
+        "market": "1",  # TWSE Listed
+        "industry_code": industry_code,
+        "Page": "1",
+        "chklike": "Y"
+    }
+    headers = {"If-None-Match": etag} if etag else {}
+    if rate_limiter:
+        rate_limiter.wait()
+    res = session.post(url, data=payload, headers=headers, timeout=timeout)
+    if res.status_code == 304:
+        return {"rows": None, "content_hash": None, "etag": etag}
+    res.raise_for_status()
+    res.encoding = "big5"
 
-    return merged
+    rows = parse_twse_company_rows(res.text)
+    # 以解析後的資料計算 hash，避免頁面上的時間戳等雜訊造成誤判
+    content_hash = hashlib.sha256(json.dumps(rows, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return {"rows": rows, "content_hash": content_hash, "etag": res.headers.get("ETag")}
 
-def write_twse_example_to_db():
-    # init_esg_report_db()
+def merge_bilingual_listings(zh_df, en_df):
+    """以股票代號 hash join 中、英文列表（兩邊頁面的筆數或順序不同也不會錯配）"""
+    zh_df = zh_df.drop_duplicates(subset=["stock_code"])
+    en_df = en_df.drop_duplicates(subset=["stock_code"])
+    merged = zh_df.merge(en_df, on="stock_code", how="inner", suffixes=("_zh", "_en"))
 
-    df = get_bilingual_twse_company_industry()
-    df = df.drop_duplicates(subset=["公司名稱中文"]).reset_index(drop=True)
+    missing = len(zh_df) + len(en_df) - 2 * len(merged)
+    if missing:
+        print(f"⚠️ {missing} TWSE row(s) only found in one language were skipped.")
+
+    return pd.DataFrame({
+        "股票代號": merged["stock_code"],
+        "產業別中文": merged["industry_zh"],
+        "產業別英文": merged["industry_en"],
+        "公司名稱中文": merged["company_name_zh"],
+        "公司名稱英文": merged["company_name_en"]
+    })
+
+def refresh_twse_data(full=False, max_workers=DEFAULT_MAX_WORKERS, min_interval=DEFAULT_MIN_INTERVAL, industry_codes=None):
+    """
+    增量更新 TWSE 公司 / 產業資料：
+    1. 依上次的 ETag / 內容 hash 判斷每個產業別頁面是否有變動
+    2. 只處理有變動的產業（中英文以股票代號合併），找出新增 / 更新 / 下市的公司
+    3. 在單一交易中寫入公司異動、Company_Change_Log 與各頁面的抓取狀態
 
-    with sqlite3.connect("db/esg_reports.db") as conn:
-        cursor = conn.cursor()
+    Args:
+        full (bool): True 時忽略上次狀態，重新處理全部產業
+        max_workers (int): 同時進行的請求數上限
+        min_interval (float): 兩次請求之間至少間隔（秒）
+        industry_codes (list): 要檢查的產業代碼；None 時檢查全部
 
-        for _, row in df.iterrows():
-            company_zh = row["公司名稱中文"]
-            company_en = row["公司名稱英文"]
-            industry_zh = row["產業別中文"]
-            industry_en = row["產業別英文"]
+    Returns:
+        dict: inserted / updated / removed / unchanged 公司數，以及 refreshed / skipped / failed 產業數
+    """
+    industry_codes = industry_codes or TWSE_INDUSTRY_CODES
+    previous_states = {} if full else get_twse_fetch_states()
+    session = create_twse_session(max_workers)
+    rate_limiter = RateLimiter(min_interval)
 
+    def fetch(code, lang, url, use_etag=True):
+        etag = previous_states.get((code, lang), {}).get("etag") if use_etag else None
+        return fetch_twse_industry_snapshot(session, url, code, rate_limiter, etag=etag)
+
+    snapshots = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch, code, lang, url): (code, lang)
+            for code in industry_codes
+            for lang, url in [("zh", TWSE_ZH_URL), ("en", TWSE_EN_URL)]
+        }
+        for future in as_completed(futures):
+            code, lang = futures[future]
             try:
-                insert_company(
-                    company_name_zh=company_zh,
-                    industry_name_zh=industry_zh,
-                    company_name_en=company_en,
-                    industry_name_en=industry_en
-                )
+                snapshots[(code, lang)] = future.result()
             except Exception as e:
-                print(f"❌ Failed to insert: {company_zh} - {industry_zh} — {e}")
+                print(f"❌ Failed to fetch TWSE industry {code} ({lang}): {e}")
+
+    refreshed_codes, skipped_codes, failed_codes = [], [], []
+    for code in industry_codes:
+        keys = [(code, "zh"), (code, "en")]
+        if any(key not in snapshots for key in keys):
+            failed_codes.append(code)
+            continue
+
+        unchanged = all(
+            snapshots[key]["rows"] is None
+            or snapshots[key]["content_hash"] == previous_states.get(key, {}).get("content_hash")
+            for key in keys
+        )
+        if unchanged and not full:
+            skipped_codes.append(code)
+            continue
 
+        # 只有一邊回 304 時，補抓完整內容才能合併
+        for key, url in zip(keys, [TWSE_ZH_URL, TWSE_EN_URL]):
+            if snapshots[key]["rows"] is None:
+                snapshots[key] = fetch(code, key[1], url, use_etag=False)
+        refreshed_codes.append(code)
+
+    columns = ["stock_code", "company_name", "industry"]
+    zh_df = pd.DataFrame([row for code in refreshed_codes for row in snapshots[(code, "zh")]["rows"]], columns=columns)
+    en_df = pd.DataFrame([row for code in refreshed_codes for row in snapshots[(code, "en")]["rows"]], columns=columns)
+    df = merge_bilingual_listings(zh_df, en_df)
+    df = df.drop_duplicates(subset=["公司名稱中文"]).reset_index(drop=True)
+
+    rows = list(zip(df["股票代號"], df["公司名稱中文"], df["公司名稱英文"], df["產業別中文"], df["產業別英文"]))
+    # 只記錄已處理（或確認未變動）產業的抓取狀態：失敗的產業保留上次狀態，
+    # 否則成功那一邊的新 hash 會被存下，下次兩邊都看似未變動，這次的異動就永遠不會寫入
+    fetch_states = [
+        (code, lang, snapshot["content_hash"] or previous_states.get((code, lang), {}).get("content_hash"), snapshot["etag"])
+        for code in refreshed_codes + skipped_codes
+        for lang in ("zh", "en")
+        for snapshot in [snapshots[(code, lang)]]
+    ]
+
+    stats = upsert_twse_companies(
+        rows,
+        refreshed_industries=set(zh_df["industry"]),
+        fetch_states=fetch_states
+    )
+    invalidate_dimension_cache()
+
+    stats.update({
+        "refreshed_industries": len(refreshed_codes),
+        "skipped_industries": len(skipped_codes),
+        "failed_industries": len(failed_codes)
+    })
+    print(
+        f"✅ TWSE refresh done: {stats['refreshed_industries']} industries refreshed, "
+        f"{stats['skipped_industries']} unchanged, {stats['failed_industries']} failed | "
+        f"{stats['inserted']} added, {stats['updated']} updated, {stats['removed']} removed companies."
+    )
+    return stats
+
+def write_twse_example_to_db():
+    """完整重新抓取並更新所有產業（等同 refresh_twse_data(full=True)）"""
+    return refresh_twse_data(full=True)
 
-        cursor.execute("""
-            DELETE FROM Company
-            WHERE company_name_zh IS NULL
-               OR company_name_en IS NULL
-               OR industry_id IS NULL
-        """)
+def start_background_refresh(full=False, log_path=TWSE_REFRESH_LOG_PATH):
+    """
+    以獨立 process 執行 db_utils/init_twse_data.py，不佔用 Streamlit session；同一時間只會有一個更新在跑
 
+    Returns:
+        subprocess.Popen: 執行中的更新 process
+    """
+    global _refresh_process
+    with _refresh_process_lock:
+        if _refresh_process is not None and _refresh_process.poll() is None:
+            return _refresh_process
 
-        cursor.execute("""
-            DELETE FROM Industry
-            WHERE industry_name_zh IS NULL
-               OR industry_name_en IS NULL
-        """)
+        command = [sys.executable, TWSE_REFRESH_SCRIPT, "--quiet"]
+        if full:
+            command.append("--full")
+        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            _refresh_process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+        return _refresh_process
 
-        conn.commit()
-        print("✅ TWSE company & industry data updated and cleaned.")
+def get_background_refresh_status():
+    """'idle' / 'running' / 'done' / 'failed'"""
+    with _refresh_process_lock:
+        if _refresh_process is None:
+            return "idle"
+        code = _refresh_process.poll()
+    if code is None:
+        return "running"
+    return "done" if code == 0 else "failed"
@@ -1,6 +1,9 @@
 import streamlit as st
 import time
 from response_generator import generate_response
+from tools.job_queue import get_job
+from ui_utils.job_section import render_job_status
+from lib.session_resources import get_archived_message_count, load_archived_messages
 
 # 逐字 streaming 輸出
 def stream_data(stream_str):
@@ -39,11 +42,43 @@ def chat(prompt: str, chat_container, write=True):
         response = generate_response(prompt)
         st.session_state.messages.append({"role": "assistant", "content": response})
 
+# 背景工作（例如 ESG analysis）完成後，把結果加進對話
+def render_chat_jobs(st_c_chat):
+    chat_jobs = st.session_state.get("chat_jobs", [])
+    for job_id in list(chat_jobs):
+        job = get_job(job_id)
+        if job is None:
+            chat_jobs.remove(job_id)
+            continue
+
+        if job["status"] == "succeeded":
+            content = job["result"] if job.get("has_result") else "⚠️ The result has expired. Please run it again."
+        elif job["status"] == "failed":
+            content = f"❌ {job['label'] or job['job_type']} failed: {(job['error'] or '').splitlines()[0] if job['error'] else ''}"
+        elif job["status"] == "cancelled":
+            content = f"⏹️ {job['label'] or job['job_type']} was cancelled."
+        else:
+            with st_c_chat:
+                render_job_status(job_id, title=job["label"] or "⏳ Working...")
+            continue
+
+        chat_jobs.remove(job_id)
+        st.session_state.messages.append({"role": "assistant", "content": content})
+        st_c_chat.chat_message("assistant").markdown(content)
+
 # 主聊天渲染 + 處理 chat_input
 def render_chat_section(st_c_chat):
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    # 較早的對話已歸檔到磁碟（見 lib/session_resources.py），需要時才載入
+    archived_count = get_archived_message_count()
+    if archived_count:
+        with st_c_chat.expander(f"🗄️ {archived_count} earlier messages", expanded=False):
+            if st.button("📜 Load earlier messages", key="load_archived_messages"):
+                for msg in load_archived_messages():
+                    st.markdown(f"**{msg['role']}**: {msg['content']}")
+
     for msg in st.session_state.messages:
         if msg["role"] == "user":
             st_c_chat.chat_message(
@@ -76,3 +111,5 @@ def render_chat_section(st_c_chat):
         with col2:
             if prompt := st.chat_input(placeholder="Ask me about the ESG report", key="chat_bot"):
                 chat(prompt, chat_container=st_c_chat)
+
+    render_chat_jobs(st_c_chat)
@@ -1,8 +1,92 @@
+import os
 import streamlit as st
 import pandas as pd
-import sqlite3
 from db_utils.esg_report_db_utils import *
-from tools.twse_webscraper import write_twse_example_to_db
+from tools.twse_webscraper import start_background_refresh, get_background_refresh_status
+from tools.esg_pdf_ingest import run_pdf_ingest_job
+from tools.job_queue import submit_job
+from ui_utils.job_section import render_job_status, render_job_list
+
+def render_twse_refresh_controls():
+    """在背景 process 增量更新 TWSE 公司 / 產業資料，並顯示最近的公司異動"""
+    with st.form("update_esg_form", clear_on_submit=False):
+        col_update, col_full = st.columns([0.7, 0.3])
+        with col_full:
+            full_refresh = st.checkbox("Full refresh", value=False, key="twse_full_refresh")
+        with col_update:
+            submitted = st.form_submit_button("📥 Update ESG DB from TWSE")
+        if submitted:
+            start_background_refresh(full=full_refresh)
+            st.session_state["reload_esg_data"] = True
+
+    status = get_background_refresh_status()
+    if status == "running":
+        st.info("⏳ TWSE refresh is running in the background. Reopen this table later to see the changes.")
+    elif status == "done":
+        st.success("✅ TWSE refresh finished.")
+    elif status == "failed":
+        st.error("❌ TWSE refresh failed. See db/twse_refresh.log for details.")
+
+    with st.expander("📝 Recent Company Changes", expanded=False):
+        change_df = get_company_change_log(limit=50)
+        if change_df.empty:
+            st.caption("No company changes recorded yet.")
+        else:
+            st.dataframe(change_df, use_container_width=True, hide_index=True)
+
+def render_pdf_ingest_controls():
+    """在背景批次匯入伺服器上某個資料夾中的 PDF（見 db_utils/ingest_esg_pdfs.py）"""
+    with st.expander("📚 Bulk Ingest PDFs", expanded=False):
+        with st.form("pdf_ingest_form", clear_on_submit=False):
+            directory = st.text_input("PDF directory on the server", value="db/esg_report_templates/SASB")
+            include_tables = st.checkbox("Extract tables (slower)", value=True)
+            if st.form_submit_button("📥 Ingest PDFs"):
+                if os.path.isdir(directory):
+                    # 每次都重新掃描資料夾（新檔案才會被匯入），只避免同時跑兩個相同的匯入
+                    st.session_state["pdf_ingest_job_id"] = submit_job(
+                        "pdf_ingest",
+                        run_pdf_ingest_job,
+                        kwargs={"directory": directory, "include_tables": include_tables},
+                        label=f"📚 Ingest {directory}",
+                        reuse_result=False
+                    )
+                else:
+                    st.error(f"❌ Directory not found: {directory}")
+
+        job_id = st.session_state.get("pdf_ingest_job_id")
+        if job_id:
+            job = render_job_status(job_id, title="📚 Ingesting PDFs...")
+            if job and job["status"] == "succeeded" and job.get("has_result"):
+                stats = job["result"]
+                st.success(
+                    f"✅ {stats['ingested']} ingested, {stats['duplicate']} duplicate, "
+                    f"{stats['failed']} failed, {stats['skipped']} skipped."
+                )
+
+        render_job_list()
+
+def render_esg_report_search():
+    """跨所有已存報告的全文檢索（FTS5），顯示相關頁面片段"""
+    with st.expander("🔎 Search Report Archive", expanded=False):
+        query = st.text_input(
+            "Search terms",
+            placeholder="e.g. 溫室氣體, carbon emission",
+            key="esg_search_query"
+        )
+        if not query.strip():
+            return
+
+        results = search_esg_reports(query, limit=20)
+        if results.empty:
+            st.info("🔍 No matching report pages found.")
+            return
+
+        st.markdown(f"Top **{len(results)}** matching page(s):")
+        for _, row in results.iterrows():
+            st.markdown(
+                f"**{row['company']} ({row['company_zh']})** · {row['year']} · Page {row['page']}\n\n"
+                f"> {row['snippet']}"
+            )
 
 def show_esg_report_table():
     if "selected_company" not in st.session_state:
@@ -29,19 +113,16 @@ def show_esg_report_table():
                     st.session_state["show_esg_table"] = False
                     st.rerun()
 
-            with st.form("update_esg_form", clear_on_submit=False):
-                if st.form_submit_button("📥 Update ESG DB from TWSE"):
-                    write_twse_example_to_db()
-                    st.success("✅ TWSE ESG data inserted.")
-                    st.session_state["reload_esg_data"] = True
-                    st.rerun()
+            render_twse_refresh_controls()
+            render_pdf_ingest_controls()
+
+            render_esg_report_search()
 
-            with sqlite3.connect("db/esg_reports.db") as conn:
-                company_df = get_all_companies()
-                industry_df = get_all_industries()
-                companies = [f"{row['company_name_en']} ({row['company_name_zh']})" for _, row in company_df.iterrows()]
-                industries = [f"{row['industry_name_en']} ({row['industry_name_zh']})" for _, row in industry_df.iterrows()]
-                df = get_all_esg_reports()
+            company_df = get_all_companies()
+            industry_df = get_all_industries()
+            companies = [f"{row['company_name_en']} ({row['company_name_zh']})" for _, row in company_df.iterrows()]
+            industries = [f"{row['industry_name_en']} ({row['industry_name_zh']})" for _, row in industry_df.iterrows()]
+            years = [str(year) for year in get_esg_report_years()]
 
             with st.expander("🔍 Filter Conditions", expanded=True):
                 col1, col2, col3 = st.columns(3)
@@ -50,41 +131,101 @@ def show_esg_report_table():
                 with col2:
                     st.selectbox("Industry", ["All"] + industries, key="selected_industry")
                 with col3:
-                    years = sorted(df["year"].dropna().astype(str).unique())
                     st.selectbox("Report Year", ["All"] + years, key="selected_year")
 
+            # 篩選條件交給 DB（WHERE + LIMIT/OFFSET），每次只載入一頁
+            company_en = None
+            industry_en = None
+            year = None
             if st.session_state["selected_company"] != "All":
                 company_en = st.session_state["selected_company"].split(" (")[0]
-                df = df[df["company"] == company_en]
             if st.session_state["selected_industry"] != "All":
                 industry_en = st.session_state["selected_industry"].split(" (")[0]
-                df = df[df["industry"] == industry_en]
             if st.session_state["selected_year"] != "All":
-                df = df[df["year"].astype(str) == st.session_state["selected_year"]]
+                year = int(st.session_state["selected_year"])
+
+            # 篩選條件改變時回到第一頁
+            filters = (company_en, industry_en, year)
+            if st.session_state.get("esg_table_filters") != filters:
+                st.session_state["esg_table_filters"] = filters
+                st.session_state["esg_table_page"] = 1
+
+            page_size = st.session_state.get("esg_table_page_size", 20)
+            page = st.session_state.get("esg_table_page", 1)
+            df, total = query_esg_reports(
+                company_en=company_en,
+                industry_en=industry_en,
+                year=year,
+                limit=page_size,
+                offset=(page - 1) * page_size
+            )
+            total_pages = max(1, -(-total // page_size))
+            if page > total_pages:
+                st.session_state["esg_table_page"] = total_pages
+                st.rerun()
 
             st.markdown("#### 📄 ESG Report Table")
-            header = st.columns([0.05, 0.25, 0.25, 0.1, 0.35])
+            header = st.columns([0.05, 0.2, 0.2, 0.08, 0.39, 0.08])
             header[0].markdown("**Select**")
             header[1].markdown("**Company**")
             header[2].markdown("**Industry**")
             header[3].markdown("**Year**")
-            header[4].markdown("**Content**")
+            header[4].markdown("**Preview**")
+            header[5].markdown("**Content**")
 
             selected_ids = []
             if df.empty:
                 st.info("🔍 No ESG reports found for the selected filters.")
             else:
                 for _, row in df.iterrows():
-                    cols = st.columns([0.05, 0.25, 0.25, 0.1, 0.35])
+                    cols = st.columns([0.05, 0.2, 0.2, 0.08, 0.39, 0.08])
                     with cols[0]:
                         if st.checkbox("checkbox for record-deletion", label_visibility="collapsed", key=f"select_{row['report_id']}"):
                             selected_ids.append(row["report_id"])
                     cols[1].write(f"{row['company']} ({row['company_zh']})")
                     cols[2].write(f"{row['industry']} ({row['industry_zh']})")
                     cols[3].write(row["year"])
-                    # cols[4].write(row["content"][:100] + "...")
-                    cols[4].text_area("Full ESG Content", row["content"], height=150, label_visibility="collapsed") #textarea
+                    cols[4].caption(row["preview"])
+                    # 全文只在點選時才從 DB 讀取並解壓縮
+                    if cols[5].button("📖", key=f"view_{row['report_id']}", help="Show full content"):
+                        st.session_state["viewing_report_id"] = row["report_id"]
 
+            viewing_report_id = st.session_state.get("viewing_report_id")
+            if viewing_report_id is not None:
+                content = get_esg_report_content(int(viewing_report_id))
+                if content is None:
+                    st.session_state.pop("viewing_report_id", None)
+                else:
+                    col_content, col_hide = st.columns([0.95, 0.05])
+                    with col_content:
+                        st.markdown(f"#### 📖 Full ESG Content (report #{viewing_report_id})")
+                    with col_hide:
+                        if st.button("❌", key="hide_report_content"):
+                            st.session_state.pop("viewing_report_id", None)
+                            st.rerun()
+                    st.text_area("Full ESG Content", content, height=300, label_visibility="collapsed")
+
+            # 分頁控制
+            col_prev, col_info, col_next, col_size = st.columns([0.1, 0.5, 0.1, 0.3])
+            with col_prev:
+                if st.button("⬅️", key="esg_table_prev", disabled=page <= 1):
+                    st.session_state["esg_table_page"] = page - 1
+                    st.rerun()
+            with col_info:
+                st.markdown(f"Page **{page}** of **{total_pages}** · {total} report(s)")
+            with col_next:
+                if st.button("➡️", key="esg_table_next", disabled=page >= total_pages):
+                    st.session_state["esg_table_page"] = page + 1
+                    st.rerun()
+            with col_size:
+                new_page_size = st.selectbox(
+                    "Rows per page", [10, 20, 50], index=[10, 20, 50].index(page_size),
+                    label_visibility="collapsed", key="esg_table_page_size_picker"
+                )
+                if new_page_size != page_size:
+                    st.session_state["esg_table_page_size"] = new_page_size
+                    st.session_state["esg_table_page"] = 1
+                    st.rerun()
 
             if selected_ids and not st.session_state["delete_confirm"]:
                 if st.button("🗑️ Delete Selected"):
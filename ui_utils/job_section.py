@@ -0,0 +1,53 @@
+import streamlit as st
+from db_utils.job_db_utils import ACTIVE_STATUSES
+from tools.job_queue import get_job, cancel_job, get_recent_jobs
+
+JOB_POLL_INTERVAL = 1.0  # 秒
+
+def _render_job_progress(job, title):
+    progress = float(job["progress"] or 0.0)
+    st.progress(progress, text=f"{title} {job['message'] or ''} ({round(progress * 100)}%)")
+    if st.button("⏹️ Cancel", key=f"cancel_job_{job['job_id']}"):
+        cancel_job(job["job_id"])
+        st.rerun()
+
+def _poll_job(job_id, title):
+    job = get_job(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        # 工作結束：重新執行整個 script，讓呼叫端顯示結果
+        st.rerun()
+    _render_job_progress(job, title)
+
+# st.fragment 只重跑這一小段，定時輪詢不會重新執行整個頁面（舊版 Streamlit 改用手動重新整理）
+if hasattr(st, "fragment"):
+    _poll_job = st.fragment(run_every=JOB_POLL_INTERVAL)(_poll_job)
+
+def render_job_status(job_id, title="⏳ Working..."):
+    """
+    顯示背景工作的進度（含取消按鈕）；失敗或取消時顯示訊息
+
+    Returns:
+        dict | None: 最新的工作狀態（見 tools.job_queue.get_job）
+    """
+    job = get_job(job_id)
+    if job is None:
+        return None
+
+    if job["status"] in ACTIVE_STATUSES:
+        _poll_job(job_id, title)
+        if not hasattr(st, "fragment") and st.button("🔄 Refresh", key=f"refresh_job_{job_id}"):
+            st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"❌ {job['label'] or job['job_type']} failed: {(job['error'] or '').splitlines()[0] if job['error'] else ''}")
+    elif job["status"] == "cancelled":
+        st.warning(f"⏹️ {job['label'] or job['job_type']} was cancelled.")
+    return job
+
+def render_job_list(limit=20):
+    """最近的背景工作（debug 用）"""
+    with st.expander("🧵 Background Jobs", expanded=False):
+        jobs_df = get_recent_jobs(limit=limit)
+        if jobs_df.empty:
+            st.caption("No background jobs yet.")
+        else:
+            st.dataframe(jobs_df.drop(columns=["error"]), use_container_width=True, hide_index=True)
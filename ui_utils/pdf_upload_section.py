@@ -1,6 +1,5 @@
 import io # Process byte obj to file obj
 import json
-import fitz  # PyMuPDF
 import streamlit as st
 from pdf_context import *
 from db_utils.esg_report_db_utils import (
@@ -8,6 +7,8 @@ from db_utils.esg_report_db_utils import (
 )
 from lib.esg_info_extractor import extract_esg_info_from_pdf
 from db_utils.esg_report_db_utils import insert_or_get_company_id
+from lib.session_resources import load_session_value, discard_session_value
+from ui_utils.job_section import render_job_status
 
 
 # pdf upload section
@@ -28,6 +29,7 @@ def render_pdf_upload_section():
 
         # 若已解析 pdf 就不要重複執行
         if uploaded_file and "pdf_text" not in st.session_state:
+            import fitz  # PyMuPDF（第一次上傳時才載入）
             doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
 
             extracted = extract_text_by_page(doc, max_pages=len(doc)) # 取全部頁面
@@ -35,9 +37,24 @@ def render_pdf_upload_section():
 
             st.session_state["pdf_text"] = extracted
             st.success("✅ PDF uploaded and parsed successfully!")
+
+            # 段落語意搜尋 index 在背景建立（gensim 在這裡才載入）
+            from qa_utils.paragraph_search import submit_passage_index
+            st.session_state["passage_index_job_id"] = submit_passage_index(extracted)
         elif uploaded_file and "pdf_text" in st.session_state:
             st.warning("📄 A PDF is already loaded. Click 🗑️ Clear PDF to upload a new one.")
 
+        # 段落搜尋 index 完成後存進 session，聊天時直接查詢
+        passage_job_id = st.session_state.get("passage_index_job_id")
+        if passage_job_id:
+            job = render_job_status(passage_job_id, title="🔎 Building paragraph search index...")
+            if job and job["status"] == "succeeded" and job.get("has_result"):
+                st.session_state["passage_index"] = job["result"]
+                st.session_state.pop("passage_index_job_id", None)
+                st.success(f"🔎 Paragraph search is ready ({len(job['result'])} passages). Ask in the chat with `Search <question>`.")
+            elif job is None or job["status"] not in ("queued", "running"):
+                st.session_state.pop("passage_index_job_id", None)
+
         # 匯入 Gemini Agent 以取得 ESG report info
         try:
             GEMINI_ENABLED = bool(st.secrets.get("GEMINI_API_KEY", None))
@@ -53,7 +70,9 @@ def render_pdf_upload_section():
         # Clear button
         if "pdf_text" in st.session_state:
             if st.button("🗑️ Clear PDF"):
-                del st.session_state["pdf_text"]
+                discard_session_value("pdf_text")
+                discard_session_value("passage_index")
+                st.session_state.pop("passage_index_job_id", None)
                 st.session_state.pop("pdf_info", None)
                 st.session_state.pop("pdf_language", None)
                 st.session_state.pop("esg_inserted", None)
@@ -67,10 +86,9 @@ def render_pdf_upload_section():
             report_year = int(st.session_state["pdf_info"]["report_year"])
 
             # text_list = st.session_state["pdf_text"][:3]  # for testing: 前 3 頁內容
-            text_list = st.session_state["pdf_text"]  # 全部頁面
-            content = "\n\n".join(
-                [page["content"] for page in text_list] if isinstance(text_list[0], dict) else text_list
-            )
+            text_list = load_session_value("pdf_text")  # 全部頁面
+            pages = [page["content"] for page in text_list] if isinstance(text_list[0], dict) else text_list
+            content = "\n\n".join(pages)
 
             # 🔍 將 "chinese"/"english" 轉換成 "zh"/"en"
             lang_detected = st.session_state.get("pdf_language", "english")
@@ -79,7 +97,7 @@ def render_pdf_upload_section():
             try:
                 company_id = insert_or_get_company_id(company_name, industry, language)
                 # insert 進 db
-                esg_report_inserted = insert_esg_report_by_id(company_id, report_year, content)
+                esg_report_inserted = insert_esg_report_by_id(company_id, report_year, content, pages=pages)
 
                 st.session_state["esg_inserted"] = esg_report_inserted
                 if esg_report_inserted:
@@ -1,5 +1,6 @@
 import streamlit as st
 from db_utils.profile_db_utils import *
+from tools.avatar_service import validate_avatar_url
 
 CORRECT_PASSWORD = "1234"
 
@@ -31,8 +32,21 @@ def render_profile_section():
                 submitted = st.form_submit_button("💾 Save Profile")
 
                 if submitted:
-                    save_user_profile(new_name, new_image)
+                    # 只有更換頭像時才驗證並下載一次，之後 sidebar 從快取讀取；
+                    # 頭像無法使用時名稱照常儲存、沿用原本的頭像（sidebar 本來就會退回 DEFAULT_AVATAR_URL）
+                    current_image = st.session_state.get("user_image", "")
+                    avatar_ok, avatar_error = True, ""
+                    if new_image != current_image:
+                        with st.spinner("🖼️ Checking avatar image..."):
+                            avatar_ok, avatar_error = validate_avatar_url(new_image)
+                    saved_image = new_image if avatar_ok else current_image
+
+                    save_user_profile(new_name, saved_image)
                     st.session_state["user_name"] = new_name
-                    st.session_state["user_image"] = new_image
-                    st.success("Profile saved! Please refresh to see changes.")
-                    st.rerun()
\ No newline at end of file
+                    st.session_state["user_image"] = saved_image
+                    if avatar_ok:
+                        st.success("Profile saved! Please refresh to see changes.")
+                        st.rerun()
+                    else:
+                        st.success("✅ User name saved.")
+                        st.error(f"❌ Avatar not updated, invalid avatar URL: {avatar_error}")
\ No newline at end of file
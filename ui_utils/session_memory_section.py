@@ -0,0 +1,57 @@
+import streamlit as st
+from lib.session_resources import (
+    SESSION_MEMORY_BUDGET_MB,
+    SPILLABLE_KEYS,
+    get_session_memory_usage,
+    get_shared_resource_stats,
+    get_archived_message_count,
+    spill_session_value,
+    load_session_value
+)
+
+# Debug page：目前 session 每個 key 的估計大小、磁碟暫存狀態，以及 process 共用資源
+def render_session_memory_page():
+    st.markdown("---")
+    col_title, col_close = st.columns([0.95, 0.05])
+    with col_title:
+        st.subheader("🧮 Session Memory")
+    with col_close:
+        if st.button("❌", key="close_session_memory"):
+            st.session_state["show_session_memory"] = False
+            st.rerun()
+
+    usage = get_session_memory_usage()
+    in_memory_mb = usage.loc[usage["status"] == "memory", "size_mb"].sum()
+    spilled_mb = usage.loc[usage["status"] == "spilled", "size_mb"].sum()
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("In memory", f"{in_memory_mb:.1f} MB")
+    col2.metric("Spilled to disk", f"{spilled_mb:.1f} MB")
+    col3.metric("Archived messages", get_archived_message_count())
+    st.progress(min(in_memory_mb / SESSION_MEMORY_BUDGET_MB, 1.0), text=f"Budget: {SESSION_MEMORY_BUDGET_MB:.0f} MB")
+
+    display_df = usage.copy()
+    display_df["size_mb"] = display_df["size_mb"].round(3)
+    st.dataframe(display_df.drop(columns=["last_access"]), use_container_width=True, hide_index=True)
+
+    spillable = [key for key in SPILLABLE_KEYS if key in st.session_state]
+    if spillable:
+        col_key, col_spill, col_load = st.columns([0.5, 0.25, 0.25])
+        with col_key:
+            key = st.selectbox("Session key", spillable, key="session_memory_key")
+        with col_spill:
+            if st.button("💾 Spill to disk", key="session_memory_spill"):
+                spill_session_value(key)
+                st.rerun()
+        with col_load:
+            if st.button("📤 Load into memory", key="session_memory_load"):
+                load_session_value(key)
+                st.rerun()
+
+    st.markdown("#### 🌐 Process-wide shared resources")
+    shared_df = get_shared_resource_stats()
+    if shared_df.empty:
+        st.caption("No shared resources loaded yet.")
+    else:
+        shared_df["size_mb"] = shared_df["size_mb"].round(1)
+        st.dataframe(shared_df, use_container_width=True, hide_index=True)